@@ -11,8 +11,11 @@ from nba_api.stats.static import teams
 from nba_api.stats.endpoints import scoreboardv2
 
 from logic_nba import scrapear_jugador, obtener_jugadores_lesionados, obtener_proximo_partido
+from cliente_sofascore import ClienteSofaScore
+from calendario_nba import proximo_partido
 from config_nba import JUGADORES_DB, TEAM_IDS
 from ml_predictor import predecir
+from indice_stats import IndiceStats
 from translations import texts, t
 
 from curl_cffi import requests
@@ -113,6 +116,31 @@ def calcular_tendencia_reciente(df_jug, metrica, num_partidos_recientes=3):
     else:           return t('tendencia_estable'), pct
 
 
+# Historial del modelo: el último año con el equipo actual (en la nube solo se
+# descargan los ficheros de ese equipo, ver DataManager.cargar_historial)
+DIAS_HISTORIAL_MODELO = 365
+
+
+def historial_para_modelo(jugador, df_reciente):
+    """Partidos archivados de la temporada + los recientes (stats_latest solo guarda 10 por jugador)"""
+    equipo = df_reciente['Equipo'].iloc[-1] if not df_reciente.empty and 'Equipo' in df_reciente.columns else None
+    desde = pd.Timestamp.now() - pd.Timedelta(days=DIAS_HISTORIAL_MODELO)
+    df_hist = dm.cargar_historial(jugador=jugador, equipo=equipo, desde=desde)
+    if df_hist.empty:
+        return df_reciente
+    df_hist = pd.concat([df_hist, df_reciente], ignore_index=True)
+    df_hist = df_hist.drop_duplicates(subset=['Jugador','Timestamp'], keep='last').sort_values('Fecha').reset_index(drop=True)
+    df_hist['Dias_Descanso'] = df_hist['Fecha'].diff().dt.days
+    return df_hist
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def prediccion_cached(version, jugador, metrica, es_local, dias_descanso, _df_reciente):
+    """Features + modelo por versión de los datos: solo se reentrena si hubo run nuevo"""
+    df_modelo = historial_para_modelo(jugador, _df_reciente)
+    return predecir(df_modelo, jugador, target_col=metrica, es_local=es_local, dias_descanso=dias_descanso)
+
+
 # ============================================================================
 # GRÁFICAS
 # ============================================================================
@@ -169,19 +197,19 @@ def crear_grafica_individual_mejorada(df_jug, metrica, linea, nombre_jugador):
 # LESIONES
 # ============================================================================
 
-def calcular_impacto_ausencias(df_equipo, jugadores_ausentes, metrica='Puntos'):
+def calcular_impacto_ausencias(indice, jugadores_ausentes, metrica='Puntos'):
     if not jugadores_ausentes: return {'impacto_total':0,'redistribucion':{}}
     impacto = {'jugadores_out':[],'produccion_perdida':{},'redistribucion_estimada':{},'beneficiarios_principales':[]}
     for jugador_out in jugadores_ausentes:
-        df_jug = df_equipo[df_equipo['Jugador'] == jugador_out]
+        df_jug = indice.jugador(jugador_out)
         if not df_jug.empty:
             sp = {'Puntos':df_jug['Puntos'].mean(),'Rebotes':df_jug['Rebotes'].mean(),'Asistencias':df_jug['Asistencias'].mean(),'Minutos':df_jug['Minutos'].mean()}
             impacto['jugadores_out'].append({'nombre':jugador_out,'stats':sp})
             for stat,val in sp.items(): impacto['produccion_perdida'][stat] = impacto['produccion_perdida'].get(stat,0)+val
     if impacto['jugadores_out']:
         min_disp = impacto['produccion_perdida'].get('Minutos',0)
-        activos  = [j for j in df_equipo['Jugador'].unique() if j not in jugadores_ausentes]
-        top_b    = df_equipo[df_equipo['Jugador'].isin(activos)].groupby('Jugador')['Minutos'].mean().sort_values(ascending=False).head(3)
+        activos  = [j for j in indice.jugadores() if j not in jugadores_ausentes]
+        top_b    = pd.Series({j: indice.jugador(j)['Minutos'].mean() for j in activos}, dtype=float).sort_values(ascending=False).head(3)
         tot_min  = top_b.sum()
         for jugador, min_avg in top_b.items():
             p = min_avg/tot_min if tot_min > 0 else 0
@@ -190,20 +218,20 @@ def calcular_impacto_ausencias(df_equipo, jugadores_ausentes, metrica='Puntos'):
     return impacto
 
 
-def ajustar_prediccion_por_contexto(prediccion_base, jugador_nombre, df_equipo, lesionados_df, metrica='Puntos'):
+def ajustar_prediccion_por_contexto(prediccion_base, jugador_nombre, indice, lesionados_df, metrica='Puntos'):
     ajuste_info = {'prediccion_original':prediccion_base,'ajustes_aplicados':[],'prediccion_final':prediccion_base,'confianza_ajuste':'media'}
     if lesionados_df.empty: return prediccion_base, ajuste_info
-    equipo_jugador = df_equipo[df_equipo['Jugador']==jugador_nombre]['Equipo'].iloc[0]
+    df_jug = indice.jugador(jugador_nombre)
+    equipo_jugador = df_jug['Equipo'].iloc[0]
     jugadores_out  = lesionados_df['Jugador'].tolist()
     jugadores_out_equipo = [j for j in jugadores_out if j in JUGADORES_DB.get(equipo_jugador,{}).keys()]
-    impacto = calcular_impacto_ausencias(df_equipo, jugadores_out_equipo, metrica)
+    impacto = calcular_impacto_ausencias(indice, jugadores_out_equipo, metrica)
     if jugador_nombre in impacto.get('beneficiarios_principales',[]):
         boost = impacto['redistribucion_estimada'][jugador_nombre][metrica]
         prediccion_ajustada = prediccion_base + boost
         ajuste_info['ajustes_aplicados'].append({'tipo':t('beneficiario_ausencias'),'jugadores_out':[j['nombre'] for j in impacto['jugadores_out']],'boost':boost,'razon':f"+{boost:.1f} {metrica}"})
         ajuste_info['confianza_ajuste'] = 'alta'
     else:
-        df_jug = df_equipo[df_equipo['Jugador']==jugador_nombre].sort_values('Fecha')
         if len(df_jug) >= 2:
             dias_gap = (df_jug['Fecha'].iloc[-1] - df_jug['Fecha'].iloc[-2]).days
             if dias_gap > 10:
@@ -217,11 +245,11 @@ def ajustar_prediccion_por_contexto(prediccion_base, jugador_nombre, df_equipo,
     return prediccion_ajustada, ajuste_info
 
 
-def mostrar_analisis_lesiones(df_equipo, lesionados_df, equipo_nombre):
+def mostrar_analisis_lesiones(indice, lesionados_df, equipo_nombre):
     jugadores_out = lesionados_df['Jugador'].tolist()
     jugadores_out_equipo = [j for j in jugadores_out if j in JUGADORES_DB.get(equipo_nombre,{}).keys()]
     if not jugadores_out_equipo: st.info(t('no_lesionados')); return
-    impacto = calcular_impacto_ausencias(df_equipo, jugadores_out_equipo)
+    impacto = calcular_impacto_ausencias(indice, jugadores_out_equipo)
     st.markdown(f"#### {t('impacto_ausencias')}")
     col1, col2 = st.columns(2)
     with col1:
@@ -237,10 +265,10 @@ def mostrar_analisis_lesiones(df_equipo, lesionados_df, equipo_nombre):
                 st.markdown(f"""<div class="alert-success"><b>{b}</b><br>📈 {t('aumento_esperado')}<br>• {t('puntos')}: +{r['Puntos']:.1f}<br>• {t('rebotes')}: +{r['Rebotes']:.1f}<br>• {t('asistencias')}: +{r['Asistencias']:.1f}<br>• {t('minutos')}: +{r['Minutos_extra']:.1f}</div>""", unsafe_allow_html=True)
 
 
-def detectar_regresos_lesion(df_equipo, dias_umbral=10):
+def detectar_regresos_lesion(indice, dias_umbral=10):
     regresos = []
-    for jugador in df_equipo['Jugador'].unique():
-        df_jug = df_equipo[df_equipo['Jugador']==jugador].sort_values('Fecha')
+    for jugador in indice.jugadores():
+        df_jug = indice.jugador(jugador)
         if len(df_jug) >= 2:
             fechas = df_jug['Fecha'].tolist()
             for i in range(1,len(fechas)):
@@ -255,8 +283,8 @@ def detectar_regresos_lesion(df_equipo, dias_umbral=10):
     return regresos
 
 
-def mostrar_regresos_lesion(df_equipo):
-    regresos = detectar_regresos_lesion(df_equipo)
+def mostrar_regresos_lesion(indice):
+    regresos = detectar_regresos_lesion(indice)
     if not regresos: return
     st.markdown(f"#### {t('jugadores_recuperacion')}")
     for reg in regresos:
@@ -281,10 +309,20 @@ def mostrar_importancia_features(metricas_modelo):
 import socket
 socket.setdefaulttimeout(5)
 
+@st.cache_resource(show_spinner=False)
+def obtener_cliente_sofascore():
+    """Una sesión HTTP (keep-alive) por proceso de Streamlit"""
+    return ClienteSofaScore()
+
+
 @st.cache_data(ttl=1800, show_spinner=False)
-def obtener_datos_partido_cached(nombre_equipo):
+def obtener_datos_partido_cached(nombre_equipo, version_datos):
     try:
-        return obtener_proximo_partido(nombre_equipo)
+        # Calendario publicado por el scraper; en vivo solo si el equipo no aparece
+        contexto = proximo_partido(dm.cargar_calendario(), nombre_equipo)
+        if contexto is not None:
+            return contexto
+        return obtener_proximo_partido(nombre_equipo, cliente=obtener_cliente_sofascore())
     except Exception as e:
         return {"hay_juego":False,"rival":None,"rival_display":None,"localia":None,"fecha":None,"_error":str(e)}
 
@@ -340,7 +378,7 @@ with st.sidebar:
     contexto = {"hay_juego":False,"rival":None,"localia":None,"fecha":None}
     try:
         with st.spinner(t('buscando_partido')):
-            contexto = obtener_datos_partido_cached(equipo_sel)
+            contexto = obtener_datos_partido_cached(equipo_sel, dm.version_datos())
     except Exception as e:
         st.caption(f"⚠️ {type(e).__name__}")
 
@@ -371,9 +409,22 @@ with st.sidebar:
 # LÓGICA DE CARGA
 # ============================================================================
 
-if btn_cargar:
+# Run nuevo publicado (metadata.json, ver DataManager.version_datos) → se
+# recargan los equipos ya cargados sin esperar a que caduque ningún cache
+version_datos = dm.version_datos()
+recargar = ("df_equipo" in st.session_state
+            and st.session_state.get('version_datos') != version_datos
+            and st.session_state.get('equipos_cargados', [None])[0] == equipo_sel)
+
+if btn_cargar or recargar:
+    st.session_state.version_datos = version_datos
     with st.spinner(t('cargando_datos')):
-        df_equipo = dm.obtener_stats_equipo(equipo_sel)
+        try:
+            df_equipo = dm.obtener_stats_equipo(equipo_sel)
+        except Exception as e:
+            # Partición o delta sin descargar: mejor sin datos que un equipo a medias
+            st.caption(f"⚠️ {e}")
+            df_equipo = pd.DataFrame()
         if df_equipo.empty:
             st.error(t('no_hay_datos', equipo=equipo_sel))
             st.info(t('ejecuta_scraper'))
@@ -384,7 +435,11 @@ if btn_cargar:
             equipos_cargados = [equipo_sel]
             if st.session_state.get('incluir_rival',False) and st.session_state.get('rival_nombre'):
                 rival    = st.session_state.rival_nombre
-                df_rival = dm.obtener_stats_equipo(rival)
+                try:
+                    df_rival = dm.obtener_stats_equipo(rival)
+                except Exception as e:
+                    st.caption(f"⚠️ {e}")
+                    df_rival = pd.DataFrame()
                 if not df_rival.empty:
                     df_rival = df_rival.sort_values(['Jugador','Fecha'])
                     df_rival['Dias_Descanso'] = df_rival.groupby('Jugador')['Fecha'].diff().dt.days
@@ -397,9 +452,11 @@ if btn_cargar:
             else:
                 df_final = df_equipo
             st.session_state.df_equipo        = df_final
+            st.session_state.indice_stats     = IndiceStats(df_final)   # slices por jugador sin re-escanear
             st.session_state.equipos_cargados = equipos_cargados
             st.success(t('registros_jugadores', regs=len(df_final), jugs=len(df_final['Jugador'].unique())))
-            st.balloons()
+            if btn_cargar:
+                st.balloons()
             st.rerun()
 
 
@@ -409,6 +466,9 @@ if btn_cargar:
 
 if "df_equipo" in st.session_state:
     df               = st.session_state.df_equipo
+    if st.session_state.get('indice_stats') is None:
+        st.session_state.indice_stats = IndiceStats(df)
+    indice           = st.session_state.indice_stats
     num_viz          = st.session_state.get('num_partidos_viz', 7)
     equipos_cargados = st.session_state.get('equipos_cargados', [equipo_sel])
     titulo_header    = f"{equipos_cargados[0]} vs {equipos_cargados[1]}" if len(equipos_cargados) > 1 else equipos_cargados[0]
@@ -460,7 +520,7 @@ if "df_equipo" in st.session_state:
         with col_sel3:
             linea_over = st.number_input(t('linea_ou'), value=15.5, step=0.5, key="linea_t2")
 
-        df_jug_completo = df[df["Jugador"]==jugador_analisis].copy().sort_values("Fecha")
+        df_jug_completo = indice.jugador(jugador_analisis).copy()
         df_jug          = df_jug_completo.tail(num_viz)
 
         if not df_jug.empty:
@@ -491,7 +551,8 @@ if "df_equipo" in st.session_state:
             d_descanso  = df_jug_completo['Dias_Descanso'].iloc[-1]
             d_descanso  = d_descanso if pd.notna(d_descanso) else 2
             with st.spinner("..."):
-                resultado_ml = predecir(df, jugador_analisis, target_col=metrica_focus, es_local=es_loc_bool, dias_descanso=d_descanso)
+                resultado_ml = prediccion_cached(st.session_state.get('version_datos'), jugador_analisis, metrica_focus,
+                                                 es_loc_bool, float(d_descanso), df_jug_completo)
 
             with col_ml1:
                 if resultado_ml:
@@ -512,7 +573,7 @@ if "df_equipo" in st.session_state:
                 if resultado_ml:
                     pred_base     = resultado_ml['prediccion']
                     lesionados_eq = st.session_state.get('lesionados_equipo', pd.DataFrame())
-                    pred_ajustada, ajuste_info = ajustar_prediccion_por_contexto(pred_base, jugador_analisis, df, lesionados_eq, metrica_focus)
+                    pred_ajustada, ajuste_info = ajustar_prediccion_por_contexto(pred_base, jugador_analisis, indice, lesionados_eq, metrica_focus)
                     hay_ajuste    = abs(pred_ajustada - pred_base) > 0.5
                     label_proy    = f"{t('proyeccion_ia')} {'⚠️ '+t('ajustada') if hay_ajuste else ''}"
                     st.markdown(f"""<div style='text-align:center;padding:20px;background:linear-gradient(135deg,#00D9FF,#00FFA3);border-radius:12px;box-shadow:0 4px 15px rgba(0,0,0,0.3);'><p style='margin:0;font-size:14px;color:#05161A;font-weight:bold;'>{label_proy}</p><h1 style='margin:5px 0;color:#05161A;font-size:48px;'>{pred_ajustada:.1f}</h1><p style='margin:0;font-size:12px;color:#05161A;'>Línea: {linea_over}</p>{f'<p style="margin:5px 0;font-size:11px;color:#05161A;">{t("base")}: {pred_base:.1f} → {t("ajuste")}: {pred_ajustada-pred_base:+.1f}</p>' if hay_ajuste else ''}</div>""", unsafe_allow_html=True)
@@ -535,7 +596,7 @@ if "df_equipo" in st.session_state:
                 st.divider()
                 st.markdown(f"#### {t('analisis_rival')}")
                 from logic_nba import calcular_stats_defensivas_rival
-                stats_rival = calcular_stats_defensivas_rival(df, rival_nombre, metrica_focus)
+                stats_rival = calcular_stats_defensivas_rival(df, rival_nombre, metrica_focus, consultas=dm.consultas())
                 if stats_rival['disponible']:
                     col_r1, col_r2, col_r3 = st.columns(3)
                     with col_r1:
@@ -562,17 +623,18 @@ if "df_equipo" in st.session_state:
             with col_ctx1:
                 lesionados_equipo = st.session_state.get('lesionados_equipo', pd.DataFrame())
                 if not lesionados_equipo.empty:
-                    mostrar_analisis_lesiones(df, lesionados_equipo, df_jug.iloc[0]["Equipo"])
+                    mostrar_analisis_lesiones(indice, lesionados_equipo, df_jug.iloc[0]["Equipo"])
                 else:
                     st.info(t('no_lesiones'))
             with col_ctx2:
-                mostrar_regresos_lesion(df)
+                mostrar_regresos_lesion(indice)
 
     # ── TAB 3 ─────────────────────────────────────────────────────────────────
     with tab3:
         st.markdown(f"### 🏆 {t('top3')}")
-        df_top    = df.groupby('Jugador').head(num_viz)
-        promedios = df_top.groupby('Jugador').agg({'Puntos':'mean','Rebotes':'mean','Asistencias':'mean','Equipo':'first'}).reset_index()
+        # Medias de los últimos num_viz partidos calculadas en SQLite (ver consultas_stats.py)
+        equipos_top = st.session_state.get('equipos_cargados', [equipo_sel])
+        promedios = dm.consultas().promedios(equipos_top, ('Puntos','Rebotes','Asistencias'), ultimos=num_viz)
         rival_nombre       = st.session_state.get('rival_nombre')
         hay_rival_en_datos = rival_nombre and rival_nombre in df['Equipo'].unique()
 
@@ -0,0 +1,137 @@
+# benchmark_scraper.py
+# Throughput del scraper contra servidor_stub.py (sin tocar la API real)
+#
+# Ejecuta ScraperOptimizado.scrapear_todo() en cada modo contra el mismo
+# servidor local y compara peticiones/s, tiempo total y filas/s. Cada modo
+# corre en un directorio temporal propio (data/ y checkpoint aislados) y con
+# el cache HTTP apagado, así que ningún modo se beneficia del anterior.
+#
+# Uso:
+#   python benchmark_scraper.py
+#   python benchmark_scraper.py --modos async hilos --equipos 30 --latencia 0.1 --429 0.02
+#   python benchmark_scraper.py --json resultados.json
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from servidor_stub import ServidorStub
+
+
+def ejecutar_modo(modo: str, servidor: ServidorStub, args) -> dict:
+    """Un run completo de scrapear_todo() en `modo`; métricas vistas desde el servidor"""
+    from cache_http import configurar_cache
+    from config_nba import JUGADORES_DB
+    from scraper_automatico import ScraperOptimizado
+
+    os.chdir(tempfile.mkdtemp(prefix=f"{modo}_", dir=args.directorio))
+    configurar_cache('off')
+
+    scraper = ScraperOptimizado(modo=modo, incremental=False, por_evento=not args.por_jugador)
+    scraper.config.update({
+        'partidos_por_jugador': args.partidos,
+        'requests_por_segundo': args.rps,
+        'rps_secuencial': args.rps,
+        'rps_max': args.rps,
+        'concurrencia': args.concurrencia,
+        'hilos': args.hilos,
+        'planificar': False,   # mismo volumen de trabajo en todos los modos
+    })
+    if not args.con_delays:
+        scraper.config.update({'delay_jugadores': 0, 'delay_equipos': 0})
+
+    equipos = list(JUGADORES_DB.keys())[:args.equipos]
+    peticiones_antes = servidor.peticiones
+    t0 = time.perf_counter()
+    resultado = scraper.scrapear_todo(equipos)
+    segundos = time.perf_counter() - t0
+    peticiones = servidor.peticiones - peticiones_antes
+
+    return {
+        'modo': modo + (' (por jugador)' if modo == 'async' and args.por_jugador else ''),
+        'equipos': resultado['equipos_procesados'],
+        'peticiones': peticiones,
+        'filas': resultado['registros'],
+        'errores': resultado['errores'],
+        'segundos': round(segundos, 2),
+        'peticiones_por_segundo': round(peticiones / segundos, 1),
+        'filas_por_segundo': round(resultado['registros'] / segundos, 1),
+    }
+
+
+def imprimir_tabla(resultados: list):
+    columnas = [('modo', 'Modo'), ('equipos', 'Equipos'), ('peticiones', 'Peticiones'),
+                ('filas', 'Filas'), ('errores', 'Errores'), ('segundos', 'Tiempo (s)'),
+                ('peticiones_por_segundo', 'Req/s'), ('filas_por_segundo', 'Filas/s')]
+    anchos = [max(len(titulo), *(len(str(r[clave])) for r in resultados)) for clave, titulo in columnas]
+
+    print("\n" + "=" * 60)
+    print("📊 BENCHMARK DEL SCRAPER")
+    print("=" * 60)
+    print("  ".join(titulo.ljust(ancho) for (_, titulo), ancho in zip(columnas, anchos)))
+    print("  ".join("-" * ancho for ancho in anchos))
+    for r in resultados:
+        print("  ".join(str(r[clave]).ljust(ancho) for (clave, _), ancho in zip(columnas, anchos)))
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de los modos del scraper contra servidor_stub")
+    parser.add_argument('--modos', nargs='+', default=['secuencial', 'hilos', 'async'],
+                        choices=['secuencial', 'hilos', 'async'])
+    parser.add_argument('--equipos', type=int, default=4, help="Primeros N equipos de JUGADORES_DB")
+    parser.add_argument('--partidos', type=int, default=10, help="Partidos por jugador")
+    parser.add_argument('--rps', type=float, default=20.0,
+                        help="Tasa inicial y máxima (req/s) para todos los modos")
+    parser.add_argument('--concurrencia', type=int, default=8, help="Modo async")
+    parser.add_argument('--hilos', type=int, default=4, help="Modo hilos")
+    parser.add_argument('--por-jugador', action='store_true', help="Modo async sin box scores por evento")
+    parser.add_argument('--con-delays', action='store_true',
+                        help="Mantiene delay_jugadores/delay_equipos (por defecto a 0)")
+    # Servidor
+    parser.add_argument('--latencia', type=float, default=0.05)
+    parser.add_argument('--errores', type=float, default=0.0, help="Fracción de respuestas 500")
+    parser.add_argument('--429', dest='tasa_429', type=float, default=0.0, help="Fracción de respuestas 429")
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--semilla', type=int, default=0)
+    # Salida
+    parser.add_argument('--json', default=None, help="Guarda los resultados en este archivo")
+    parser.add_argument('--verbose', action='store_true', help="Muestra el log completo del scraper")
+    args = parser.parse_args()
+
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    with ServidorStub(latencia=args.latencia, tasa_error=args.errores, tasa_429=args.tasa_429,
+                      retry_after=args.retry_after, semilla=args.semilla) as servidor:
+        # Antes de importar el scraper: los módulos leen la URL base al importarse
+        os.environ['HOOPS_SOFASCORE_API'] = servidor.url_base
+        args.directorio = tempfile.mkdtemp(prefix='hoops_benchmark_')
+        os.chdir(args.directorio)
+
+        import scraper_automatico  # noqa: F401  (configura logging → scraper.log del directorio temporal)
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+
+        print(f"🏀 Stub en {servidor.url_base} | latencia {args.latencia}s | "
+              f"errores {args.errores:.0%} | 429 {args.tasa_429:.0%}")
+        resultados = []
+        for modo in args.modos:
+            print(f"⏳ {modo}...")
+            resultados.append(ejecutar_modo(modo, servidor, args))
+
+    imprimir_tabla(resultados)
+    print(f"📁 Datos y logs en {args.directorio}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'servidor': {'latencia': args.latencia, 'errores': args.errores, 'tasa_429': args.tasa_429},
+                'equipos': args.equipos,
+                'rps': args.rps,
+                'resultados': resultados
+            }, f, indent=2)
+        print(f"💾 Resultados en {args.json}")
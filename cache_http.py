@@ -0,0 +1,275 @@
+# cache_http.py
+# Cache en disco de respuestas JSON de SofaScore (direccionada por contenido)
+#
+# Modos:
+#   normal  → lee del disco si la entrada no ha caducado; si no, red + guarda
+#   replay  → solo disco (sin red, sin TTL); lo no grabado lanza RespuestaNoGrabada
+#   off     → sin cache
+#
+# Se configura con HOOPS_CACHE_MODO / HOOPS_CACHE_DIR o con configurar_cache().
+#
+# CacheDescargas (más abajo) es otro cache, el de los ficheros de data/ que la
+# app descarga de GitHub: GET condicional con ETag/Last-Modified.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+PARA_SIEMPRE = float('inf')
+
+# TTL por endpoint (segundos). Primera coincidencia gana.
+TTL_POR_ENDPOINT = [
+    (re.compile(r'/event/\d+/player/\d+/statistics$'), PARA_SIEMPRE),  # partido terminado → inmutable
+    (re.compile(r'/team/\d+/events/next/'),            10 * 60),
+    (re.compile(r'/player/\d+/events/last/'),          30 * 60),
+    (re.compile(r'/event/\d+/lineups$'),               30 * 60),
+]
+TTL_DEFECTO = 10 * 60
+
+MODOS = ('normal', 'replay', 'off')
+
+# La misma URL de event/{id}/lineups es la alineación previa (lesionados, sin
+# statistics) y, terminado el partido, el box score. Cada entrada guarda si su
+# contenido es definitivo; un ttl PARA_SIEMPRE solo se respeta con entradas
+# definitivas, el resto caduca con el TTL del endpoint y se sobreescribe.
+_LINEUPS = re.compile(r'/event/\d+/lineups$')
+
+
+class RespuestaNoGrabada(Exception):
+    """Modo replay y la URL no está en el cache."""
+
+
+def ttl_para(url: str) -> float:
+    for patron, ttl in TTL_POR_ENDPOINT:
+        if patron.search(url):
+            return ttl
+    return TTL_DEFECTO
+
+
+def es_definitiva(url: str, data) -> bool:
+    """True si la respuesta ya no puede cambiar (partido terminado)"""
+    if not isinstance(data, dict):
+        return False
+    if _LINEUPS.search(url):
+        return any(p.get('statistics')
+                   for lado in ('home', 'away')
+                   for p in (data.get(lado) or {}).get('players', []))
+    return ttl_para(url) == PARA_SIEMPRE and bool(data.get('statistics'))
+
+
+class CacheRespuestas:
+    def __init__(self, directorio: str = os.path.join('.cache', 'sofascore'), modo: str = 'normal'):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de cache desconocido: {modo}")
+        self.directorio = directorio
+        self.modo = modo
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _ruta(self, url: str) -> str:
+        clave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directorio, clave[:2], f"{clave}.json")
+
+    def leer(self, url: str, ttl: float = None):
+        """
+        JSON cacheado de `url` o None si no hay entrada válida.
+        `ttl` (segundos) sobreescribe el TTL del endpoint; PARA_SIEMPRE solo
+        vale para entradas definitivas (ver es_definitiva).
+        """
+        if self.modo == 'off':
+            return None
+
+        ruta = self._ruta(url)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+        except (OSError, ValueError):
+            entrada = None
+
+        if entrada is None:
+            if self.modo == 'replay':
+                raise RespuestaNoGrabada(url)
+            self.fallos += 1
+            return None
+
+        ttl = ttl_para(url) if ttl is None else ttl
+        if ttl == PARA_SIEMPRE:
+            definitiva = entrada.get('definitiva')
+            if definitiva is None:
+                # Entrada anterior al flag: se decide por el contenido
+                definitiva = es_definitiva(url, entrada['data'])
+            if not definitiva:
+                ttl = ttl_para(url)
+                if ttl == PARA_SIEMPRE:
+                    ttl = TTL_DEFECTO
+        if self.modo != 'replay' and time.time() - entrada['ts'] > ttl:
+            self.fallos += 1
+            return None
+
+        self.aciertos += 1
+        return entrada['data']
+
+    def escribir(self, url: str, data):
+        if self.modo != 'normal':
+            return
+        ruta = self._ruta(url)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'ts': time.time(), 'definitiva': es_definitiva(url, data),
+                       'data': data}, f)
+        os.replace(tmp, ruta)
+
+    def estadisticas(self) -> dict:
+        return {'modo': self.modo, 'aciertos': self.aciertos, 'fallos': self.fallos}
+
+
+_cache = None
+
+
+def obtener_cache() -> CacheRespuestas:
+    global _cache
+    if _cache is None:
+        _cache = CacheRespuestas(
+            directorio=os.environ.get('HOOPS_CACHE_DIR', os.path.join('.cache', 'sofascore')),
+            modo=os.environ.get('HOOPS_CACHE_MODO', 'normal')
+        )
+    return _cache
+
+
+def configurar_cache(modo: str = 'normal', directorio: str = None) -> CacheRespuestas:
+    global _cache
+    _cache = CacheRespuestas(
+        directorio=directorio or os.environ.get('HOOPS_CACHE_DIR', os.path.join('.cache', 'sofascore')),
+        modo=modo
+    )
+    return _cache
+
+
+# ============================================================================
+# DESCARGAS CONDICIONALES (data/ de GitHub en la app)
+# ============================================================================
+# La app bajaba stats_latest.parquet entero cada 30 min por proceso y en cada
+# arranque. Ahora cada fichero se guarda en disco con su ETag/Last-Modified:
+#
+#   - refresco → GET con If-None-Match/If-Modified-Since; un 304 (sin cuerpo)
+#     sirve la copia del disco
+#   - URL versionada (?v=<huella>, particiones y archivo) con la misma versión
+#     en disco → sin red: el contenido de una huella no cambia
+#   - la red falla → la copia del disco, aunque sea vieja
+#
+# Una entrada por ruta (sin query): una versión nueva sustituye a la anterior.
+
+class CacheDescargas:
+    def __init__(self, directorio: str = os.path.join('.cache', 'github')):
+        self.directorio = directorio
+        self.descargas = 0
+        self.revalidadas = 0      # 304
+        self.sin_red = 0          # aciertos por versión o por fallo de red
+        self.bytes_descargados = 0
+
+    def _rutas(self, url: str) -> tuple:
+        clave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directorio, clave[:2], clave)
+        return f"{base}.bin", f"{base}.json"
+
+    def obtener(self, url: str, timeout: int = 15) -> bytes:
+        """Contenido de `url` (descargado o del disco). Lanza la excepción de red si no hay copia"""
+        return self._leer(self.obtener_ruta(url, timeout))
+
+    def obtener_ruta(self, url: str, timeout: int = 15) -> str:
+        """
+        Igual que obtener() pero retorna la ruta de la copia en disco, para
+        abrirla sin pasar el contenido por memoria (memory-map, ver data_manager)
+        """
+        import requests
+
+        partes = urlsplit(url)
+        sin_query = urlunsplit(partes._replace(query=''))
+        version = partes.query or None
+        ruta_cuerpo, ruta_meta = self._rutas(sin_query)
+
+        meta = None
+        if os.path.exists(ruta_cuerpo):
+            try:
+                with open(ruta_meta, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = None
+
+        if meta is not None and version is not None and meta.get('version') == version:
+            self.sin_red += 1
+            return ruta_cuerpo
+
+        cabeceras = {}
+        if meta is not None:
+            if meta.get('etag'):
+                cabeceras['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                cabeceras['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = requests.get(url, headers=cabeceras, timeout=timeout)
+            if response.status_code == 304 and meta is not None:
+                self.revalidadas += 1
+                self._guardar_meta(ruta_meta, {**meta, 'version': version, 'ts': time.time()})
+                return ruta_cuerpo
+            response.raise_for_status()
+        except Exception:
+            if meta is None:
+                raise
+            self.sin_red += 1
+            return ruta_cuerpo
+
+        contenido = response.content
+        self.descargas += 1
+        self.bytes_descargados += len(contenido)
+        os.makedirs(os.path.dirname(ruta_cuerpo), exist_ok=True)
+        tmp = f"{ruta_cuerpo}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(contenido)
+        os.replace(tmp, ruta_cuerpo)
+        self._guardar_meta(ruta_meta, {
+            'url': sin_query,
+            'version': version,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'ts': time.time(),
+        })
+        return ruta_cuerpo
+
+    @staticmethod
+    def _leer(ruta: str) -> bytes:
+        with open(ruta, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _guardar_meta(ruta: str, meta: dict):
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, ruta)
+
+    def estadisticas(self) -> dict:
+        return {
+            'descargas': self.descargas,
+            'revalidadas': self.revalidadas,
+            'sin_red': self.sin_red,
+            'mb_descargados': round(self.bytes_descargados / 1024 / 1024, 2),
+        }
+
+
+_cache_descargas = None
+
+
+def obtener_cache_descargas() -> CacheDescargas:
+    global _cache_descargas
+    if _cache_descargas is None:
+        _cache_descargas = CacheDescargas(
+            directorio=os.environ.get('HOOPS_CACHE_DESCARGAS_DIR', os.path.join('.cache', 'github'))
+        )
+    return _cache_descargas
@@ -0,0 +1,83 @@
+# calendario_nba.py
+# Calendario de la liga: events/next de los 30 equipos, una vez por run
+# Lo escribe el scraper (data/calendario_latest.parquet) y lo leen el propio
+# scraper (lesionados) y la app (próximo partido) sin llamadas en vivo.
+
+import time
+
+import pandas as pd
+
+from cliente_sofascore import SOFASCORE_API
+from config_nba import TEAM_IDS
+from logic_nba import RESULTADO_SIN_PARTIDO, _eventos_nba, _partido_desde_evento, _texto_fecha
+
+COLUMNAS = ['Equipo', 'EventId', 'Timestamp', 'Rival', 'RivalDisplay', 'RivalSofascoreId', 'Localia']
+
+# Un partido empezado hace menos de esto se considera "en curso", no pasado
+MARGEN_EN_CURSO = 3 * 3600
+
+
+def descargar_calendario(concurrencia: int = 8, requests_por_segundo: float = 8.0,
+                         telemetria=None, equipos: list = None) -> pd.DataFrame:
+    """
+    Descarga en paralelo los próximos partidos NBA de todos los TEAM_IDS
+    (o solo de `equipos`, p.ej. los de un shard).
+    Una fila por (equipo, partido). Equipos cuya petición falla no aparecen.
+    """
+    from scraper_async import MotorAsync
+
+    ids = {equipo: team_id for equipo, team_id in TEAM_IDS.items() if equipos is None or equipo in equipos}
+    motor = MotorAsync(concurrencia=concurrencia, requests_por_segundo=requests_por_segundo,
+                       telemetria=telemetria)
+    respuestas = motor.descargar([
+        f"{SOFASCORE_API}/team/{team_id}/events/next/0" for team_id in ids.values()
+    ])
+
+    filas = []
+    for (equipo, team_id), data in zip(ids.items(), respuestas):
+        if not data:
+            continue
+        for ev in _eventos_nba(data):
+            partido = _partido_desde_evento(ev, team_id)
+            filas.append({
+                'Equipo':           equipo,
+                'EventId':          partido['event_id'],
+                'Timestamp':        partido['timestamp'],
+                'Rival':            partido['rival'],
+                'RivalDisplay':     partido['rival_display'],
+                'RivalSofascoreId': partido['rival_sofascore_id'],
+                'Localia':          partido['localia'],
+            })
+
+    return pd.DataFrame(filas, columns=COLUMNAS)
+
+
+def proximo_partido(df_cal: pd.DataFrame, equipo: str, ahora: float = None) -> dict:
+    """
+    Mismo formato que logic_nba.obtener_proximo_partido(), resuelto desde el calendario.
+    Retorna None si el equipo no está en el calendario (el llamador decide si
+    consulta en vivo).
+    """
+    if df_cal is None or df_cal.empty:
+        return None
+
+    df_eq = df_cal[df_cal['Equipo'] == equipo]
+    if df_eq.empty:
+        return None
+
+    ahora = ahora or time.time()
+    df_eq = df_eq[df_eq['Timestamp'] >= ahora - MARGEN_EN_CURSO].sort_values('Timestamp')
+    if df_eq.empty:
+        return dict(RESULTADO_SIN_PARTIDO)
+
+    fila = df_eq.iloc[0]
+    rival_id = fila['RivalSofascoreId']
+    return {
+        "hay_juego": True,
+        "rival": fila['Rival'],
+        "rival_display": fila['RivalDisplay'],
+        "rival_sofascore_id": int(rival_id) if pd.notna(rival_id) else None,
+        "localia": fila['Localia'],
+        "fecha": _texto_fecha(int(fila['Timestamp'])),
+        "event_id": int(fila['EventId'])
+    }
@@ -0,0 +1,162 @@
+# cliente_sofascore.py
+# Cliente HTTP compartido para SofaScore
+# Una sola sesión curl_cffi (keep-alive + impersonate) por proceso/run en lugar
+# de una Session nueva por llamada, con el cache en disco delante.
+
+import os
+import random
+import threading
+import time
+
+from curl_cffi import requests
+from curl_cffi.requests.exceptions import RequestException
+
+from cache_http import obtener_cache
+from limitador import ErrorReintentable, STATUS_REINTENTABLES, retry_after
+
+# HOOPS_SOFASCORE_API permite apuntar a otro servidor (p.ej. servidor_stub.py)
+SOFASCORE_API = os.environ.get('HOOPS_SOFASCORE_API', "https://api.sofascore.com/api/v1")
+
+HEADERS_SCRAPING = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': '*/*',
+    'Referer': 'https://www.sofascore.com/',
+}
+
+
+class ClienteSofaScore:
+    """
+    Sesión curl_cffi reutilizable. Thread-safe (Streamlit sirve cada sesión
+    de usuario en su propio hilo): las peticiones se serializan con un lock.
+
+    Con `limitador` (LimitadorAdaptativo) las peticiones se espacian según la
+    tasa adaptativa y los 429/403/5xx/timeouts se reintentan con backoff; sin
+    él (app) se usa la `pausa` fija de cada llamada y no hay reintentos.
+    `telemetria` (telemetria.Telemetria) registra cada petición del scraper.
+    """
+
+    def __init__(self, impersonate: str = "chrome120", limitador=None, telemetria=None):
+        self.impersonate = impersonate
+        self.limitador = limitador
+        self.telemetria = telemetria
+        self._session = None
+        self._lock = threading.Lock()
+        self._ultima_peticion = 0.0
+        # Estadísticas del pool
+        self.sesiones_creadas = 0
+        self.peticiones = 0
+        self.errores = 0
+        self.reintentos = 0
+        self.tiempo_red = 0.0
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = requests.Session(impersonate=self.impersonate)
+            self.sesiones_creadas += 1
+        return self._session
+
+    def get_json(self, url: str, headers: dict = None, timeout: int = 20,
+                 ttl: float = None, pausa: tuple = None) -> dict:
+        """
+        GET JSON pasando por el cache en disco (ver cache_http).
+        Solo se cachean respuestas 200. `pausa` (min, max) = sleep aleatorio
+        antes de ir a la red; los aciertos de cache no esperan.
+        """
+        cache = obtener_cache()
+        data = cache.leer(url, ttl)
+        if data is not None:
+            if self.telemetria:
+                self.telemetria.acierto_cache(url)
+            return data
+
+        if self.limitador is None:
+            if pausa:
+                time.sleep(random.uniform(*pausa))
+            response = self._get(url, headers, timeout)
+        else:
+            response = self._get_adaptativo(url, headers, timeout)
+
+        data = response.json()
+        if response.status_code == 200:
+            cache.escribir(url, data)
+        return data
+
+    def _get(self, url: str, headers: dict, timeout: int):
+        with self._lock:
+            # El espaciado del limitador cuenta desde el inicio de cada petición
+            self._ultima_peticion = time.monotonic()
+            t0 = time.perf_counter()
+            response = None
+            try:
+                response = self.session.get(url, headers=headers or HEADERS_SCRAPING, timeout=timeout)
+                return response
+            except Exception:
+                self.errores += 1
+                raise
+            finally:
+                latencia = time.perf_counter() - t0
+                self.tiempo_red += latencia
+                self.peticiones += 1
+                if self.telemetria:
+                    self.telemetria.peticion(
+                        url, latencia,
+                        len(response.content) if response is not None else 0,
+                        response.status_code if response is not None else None
+                    )
+
+    def _get_adaptativo(self, url: str, headers: dict, timeout: int):
+        limitador = self.limitador
+        for intento in range(limitador.reintentos + 1):
+            espera = self._ultima_peticion + limitador.intervalo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+
+            t0 = time.perf_counter()
+            try:
+                response = self._get(url, headers, timeout)
+                if response.status_code in STATUS_REINTENTABLES:
+                    raise ErrorReintentable(response.status_code, url, retry_after(response.headers))
+            except (ErrorReintentable, RequestException) as error:
+                limitador.fallo()
+                if intento == limitador.reintentos:
+                    raise
+                self.reintentos += 1
+                if self.telemetria:
+                    self.telemetria.reintento(url)
+                time.sleep(limitador.backoff(intento, getattr(error, 'retry_after', None)))
+                continue
+
+            limitador.exito(time.perf_counter() - t0)
+            return response
+
+    def estadisticas(self) -> dict:
+        return {
+            'sesiones_creadas': self.sesiones_creadas,
+            'peticiones': self.peticiones,
+            'errores': self.errores,
+            'reintentos': self.reintentos,
+            'latencia_media_ms': round(self.tiempo_red / self.peticiones * 1000, 1) if self.peticiones else 0.0
+        }
+
+    def cerrar(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+_cliente = None
+
+
+def obtener_cliente() -> ClienteSofaScore:
+    """Cliente por defecto del proceso (para llamadas sin cliente explícito)."""
+    global _cliente
+    if _cliente is None:
+        _cliente = ClienteSofaScore()
+    return _cliente
@@ -0,0 +1,167 @@
+# consultas_stats.py
+# Motor SQL embebido (SQLite en disco) sobre las stats publicadas
+#
+# Las agregaciones de la app (líderes por equipo, promedios por jugador,
+# producción del rival) se resuelven en SQLite y solo vuelve el resultado
+# agregado, no el frame de la liga. La tabla `stats` se escribe ordenada por
+# (Equipo, Jugador, Fecha) con índices sobre esas columnas: un equipo o un
+# jugador es un rango del índice y las ventanas "últimos N partidos" salen del
+# propio orden del índice.
+#
+# Sin servidor: un archivo .sqlite por versión de los datos, construido una
+# vez (tmp + os.replace) y abierto después en solo lectura con immutable=1
+# (sin locks ni journal). DataManager.consultas() lo reconstruye solo cuando
+# cambia la versión; otro proceso con la misma versión reutiliza el archivo.
+
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+METRICAS_PROMEDIO = ('Puntos', 'Rebotes', 'Asistencias', 'Minutos')
+
+
+class ConsultasStats:
+    def __init__(self, ruta: str, version: str = None):
+        self.ruta = ruta
+        self.version = version
+        with closing(self._conectar()) as con:
+            self._columnas = {fila[1] for fila in con.execute("PRAGMA table_info(stats)")}
+
+    @classmethod
+    def abrir(cls, ruta: str, version: str, cargar) -> 'ConsultasStats':
+        """
+        Base de `ruta` para `version`. Si el archivo es de otra versión (o no
+        existe) se reconstruye con cargar() → DataFrame de stats.
+        """
+        if cls._version_archivo(ruta) != version:
+            cls.construir(ruta, cargar(), version)
+        return cls(ruta, version)
+
+    @staticmethod
+    def _version_archivo(ruta: str):
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with closing(sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)) as con:
+                return con.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()[0]
+        except (sqlite3.Error, TypeError):
+            return None
+
+    @staticmethod
+    def construir(ruta: str, df: pd.DataFrame, version: str):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        # Temporal propio del proceso y del hilo: dos sesiones que construyen la
+        # misma versión a la vez no se pisan (gana el último os.replace)
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+        if not df.empty:
+            orden = [c for c in ('Equipo', 'Jugador', 'Fecha') if c in df.columns]
+            df = df.sort_values(orden, kind='stable') if orden else df
+            if 'Fecha' in df.columns:
+                # Texto ISO: ordena igual que la fecha y julianday() lo entiende
+                df = df.assign(Fecha=pd.to_datetime(df['Fecha']).dt.strftime('%Y-%m-%d %H:%M:%S'))
+
+        try:
+            with closing(sqlite3.connect(tmp)) as con:
+                con.execute("PRAGMA journal_mode = OFF")
+                con.execute("PRAGMA synchronous = OFF")
+                if df.empty:
+                    con.execute("CREATE TABLE stats (Equipo TEXT, Jugador TEXT, Fecha TEXT, Timestamp INTEGER)")
+                else:
+                    df.to_sql('stats', con, index=False, chunksize=10_000)
+                con.execute("CREATE INDEX idx_equipo_jugador_fecha ON stats (Equipo, Jugador, Fecha)")
+                con.execute("CREATE INDEX idx_jugador_fecha ON stats (Jugador, Fecha)")
+                con.execute("CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT)")
+                con.execute("INSERT INTO meta VALUES ('version', ?)", (version,))
+                con.execute("ANALYZE")
+                con.commit()
+            os.replace(tmp, ruta)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        print(f"🗃️ Base de consultas: {len(df)} filas → {ruta}")
+
+    def _conectar(self) -> sqlite3.Connection:
+        # Una conexión por consulta: válido desde cualquier hilo de Streamlit
+        return sqlite3.connect(f"file:{self.ruta}?mode=ro&immutable=1", uri=True)
+
+    def _columna(self, nombre: str) -> str:
+        """Nombre de columna validado (va interpolado en el SQL)"""
+        if nombre not in self._columnas:
+            raise ValueError(f"Columna desconocida en stats: '{nombre}'")
+        return f'"{nombre}"'
+
+    def consultar(self, sql: str, parametros=()) -> pd.DataFrame:
+        """SQL libre contra la tabla `stats` (solo lectura)"""
+        with closing(self._conectar()) as con:
+            return pd.read_sql_query(sql, con, params=parametros)
+
+    def _recientes(self, equipos: list, ultimos: int) -> tuple:
+        """CTE `recientes`: filas de `equipos` (todos si None), solo los últimos `ultimos` por jugador"""
+        filtro, parametros = '', []
+        if equipos is not None:
+            filtro = f"WHERE Equipo IN ({', '.join('?' * len(equipos))})"
+            parametros = list(equipos)
+        sql = f"""
+            WITH recientes AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY Equipo, Jugador ORDER BY Fecha DESC) AS n
+                FROM stats {filtro}
+            )"""
+        if ultimos:
+            return sql, parametros, 'WHERE n <= ?', [int(ultimos)]
+        return sql, parametros, '', []
+
+    def promedios(self, equipos: list = None, metricas: tuple = METRICAS_PROMEDIO,
+                  ultimos: int = None) -> pd.DataFrame:
+        """Una fila por (Equipo, Jugador): Partidos y media de cada métrica en sus últimos `ultimos` partidos"""
+        if equipos is not None and not equipos:
+            return pd.DataFrame(columns=['Jugador', 'Equipo', 'Partidos', *metricas])
+        medias = ', '.join(f"AVG({self._columna(m)}) AS {self._columna(m)}" for m in metricas)
+        cte, parametros, donde, extra = self._recientes(equipos, ultimos)
+        sql = f"""{cte}
+            SELECT Jugador, Equipo, COUNT(*) AS Partidos, {medias}
+            FROM recientes {donde}
+            GROUP BY Equipo, Jugador"""
+        return self.consultar(sql, parametros + extra)
+
+    def lideres(self, metrica: str, equipos: list = None, n: int = 3, ultimos: int = None) -> pd.DataFrame:
+        """Top `n` jugadores de `equipos` por media de `metrica` (Jugador, Equipo, Partidos, metrica)"""
+        if equipos is not None and not equipos:
+            return pd.DataFrame(columns=['Jugador', 'Equipo', 'Partidos', metrica])
+        columna = self._columna(metrica)
+        cte, parametros, donde, extra = self._recientes(equipos, ultimos)
+        sql = f"""{cte}
+            SELECT Jugador, Equipo, COUNT(*) AS Partidos, AVG({columna}) AS {columna}
+            FROM recientes {donde}
+            GROUP BY Equipo, Jugador
+            ORDER BY {columna} DESC
+            LIMIT ?"""
+        return self.consultar(sql, parametros + extra + [int(n)])
+
+    def produccion_equipo(self, equipo: str, metrica: str) -> dict:
+        """
+        {'promedios': Serie jugador → media de `metrica`, 'partidos': partidos
+        distintos, 'dias': días entre el primero y el último} o None sin datos
+        """
+        columna = self._columna(metrica)
+        with closing(self._conectar()) as con:
+            fila = con.execute(
+                "SELECT COUNT(DISTINCT Timestamp), "
+                "CAST(julianday(MAX(Fecha)) - julianday(MIN(Fecha)) AS INTEGER) + 1 "
+                "FROM stats WHERE Equipo = ?", (equipo,)).fetchone()
+            if not fila[0]:
+                return None
+            promedios = pd.read_sql_query(
+                f"SELECT Jugador, AVG({columna}) AS media FROM stats WHERE Equipo = ? GROUP BY Jugador",
+                con, params=(equipo,))
+        return {
+            'promedios': promedios.set_index('Jugador')['media'].rename(metrica),
+            'partidos': int(fila[0]),
+            'dias': int(fila[1]),
+        }
@@ -1,64 +1,458 @@
 import pandas as pd
 import json
 from datetime import datetime, timedelta
+import hashlib
 import os
 import time
+import shutil
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+from cache_http import obtener_cache_descargas
+from consultas_stats import ConsultasStats
+from indice_stats import IndiceStats
 
 # ============================================================================
 # CACHE A NIVEL DE MÓDULO
 # ============================================================================
+# Dos niveles: en memoria (tablas Arrow compartidas / st.cache_data) y, debajo,
+# CacheDescargas en disco (cache_http.py): GET condicional con ETag, así un
+# arranque o un refresco sin cambios en GitHub cuesta un 304 en lugar del
+# fichero entero.
+#
+# metadata.json se sondea cada TTL_SONDEO segundos: trae la huella de cada
+# fichero publicado (ver manifiesto_datos) y los demás se piden con
+# ?v=<huella>, así que se recargan en cuanto cambian y nunca antes.
+
+TTL_SONDEO = 60
+TTL_SIN_VERSION = 1800   # URLs sin ?v= (metadata anterior a manifiesto_datos)
+
+
+def _descargar_json(url: str, avisar: bool = True) -> dict:
+    try:
+        return json.loads(obtener_cache_descargas().obtener(url, timeout=10))
+    except Exception as e:
+        if avisar:
+            print(f"❌ Error cargando metadata: {e}")
+        return {}
+
+
 try:
     import streamlit as st
 
-    @st.cache_data(ttl=1800, show_spinner=False)
-    def _cargar_parquet_github(url: str) -> pd.DataFrame:
-        """Cache real: se ejecuta 1 sola vez por sesión (30 min TTL)"""
-        import requests
-        try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            from io import BytesIO
-            return pd.read_parquet(BytesIO(response.content))
-        except Exception as e:
-            print(f"❌ Error cargando {url}: {e}")
-            return pd.DataFrame()
-
-    @st.cache_data(ttl=1800, show_spinner=False)
+    @st.cache_data(ttl=1800, max_entries=64, show_spinner=False)
     def _cargar_metadata_github(url: str) -> dict:
         """Cache para metadata JSON"""
-        import requests
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"❌ Error cargando metadata: {e}")
-            return {}
+        return _descargar_json(url)
+
+    @st.cache_data(ttl=TTL_SONDEO, show_spinner=False)
+    def _sondear_metadata_github(url: str) -> dict:
+        """metadata.json: sondeo corto (un 304 si no hubo run nuevo)"""
+        return _descargar_json(url)
 
     _STREAMLIT_DISPONIBLE = True
 
 except ImportError:
     _STREAMLIT_DISPONIBLE = False
 
-    def _cargar_parquet_github(url: str) -> pd.DataFrame:
-        import requests
+    def _cargar_metadata_github(url: str) -> dict:
+        return _descargar_json(url, avisar=False)
+
+    _sondear_metadata_github = _cargar_metadata_github
+
+
+# ============================================================================
+# TABLAS ARROW (CARGA SIN COPIAS)
+# ============================================================================
+# Cada parquet que lee la app se convierte una vez por versión a Arrow IPC sin
+# comprimir en .cache/arrow/ y se abre con memory-map: las columnas apuntan a
+# las páginas del fichero, que el sistema comparte entre sesiones y procesos.
+# Antes: bytes → BytesIO → read_parquet → copia de st.cache_data por llamada.
+#
+# Las tablas son inmutables: una por versión sirve a todas las sesiones. Los
+# DataFrames que salen de ellas (_a_pandas) no copian las columnas numéricas
+# ni las fechas, y el texto se queda en Arrow (StringDtype pyarrow). Son de
+# solo lectura: .copy() antes de escribir sobre una columna existente.
+
+ARROW_CACHE_DIR = os.environ.get('HOOPS_CACHE_ARROW_DIR', os.path.join('.cache', 'arrow'))
+MAX_TABLAS = 64
+
+_tablas = OrderedDict()      # clave del fichero IPC → pa.Table (LRU)
+_rutas_github = {}           # url → (ts, ruta en CacheDescargas)
+_tablas_lock = threading.Lock()
+
+# pandas ≥ 3: el dtype str por defecto ya es Arrow y no copia (forzar
+# StringDtype('pyarrow') castearía large_string → string)
+_TIPOS_ARROW = None if int(pd.__version__.split('.')[0]) >= 3 else \
+    {pa.string(): pd.StringDtype('pyarrow'), pa.large_string(): pd.StringDtype('pyarrow')}.get
+
+
+def _a_pandas(tabla: pa.Table) -> pd.DataFrame:
+    """DataFrame sobre los buffers de `tabla` (sin consolidar bloques ni copiar)"""
+    return tabla.to_pandas(split_blocks=True, types_mapper=_TIPOS_ARROW)
+
+
+def _tabla_mmap(ruta: str) -> pa.Table:
+    """Tabla de un parquet local, memory-mapped vía su copia IPC (una por versión del fichero)"""
+    info = os.stat(ruta)
+    origen = hashlib.sha1(os.path.abspath(ruta).encode('utf-8')).hexdigest()[:16]
+    clave = f"{origen}-{info.st_mtime_ns}-{info.st_size}"
+
+    with _tablas_lock:
+        if clave in _tablas:
+            _tablas.move_to_end(clave)
+            return _tablas[clave]
+
+    ruta_ipc = os.path.join(ARROW_CACHE_DIR, f"{clave}.arrow")
+    if not os.path.exists(ruta_ipc):
+        # Un solo chunk por columna: con varios (row groups) to_pandas tendría que concatenar
+        tabla = pq.read_table(ruta).combine_chunks()
+        os.makedirs(ARROW_CACHE_DIR, exist_ok=True)
+        tmp = f"{ruta_ipc}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp, 'wb') as destino, pa.ipc.new_file(destino, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        os.replace(tmp, ruta_ipc)
+        # Versiones anteriores del mismo fichero (lo ya mapeado sigue siendo válido)
+        for nombre in os.listdir(ARROW_CACHE_DIR):
+            if nombre.startswith(f"{origen}-") and nombre.endswith('.arrow') and nombre != f"{clave}.arrow":
+                try:
+                    os.remove(os.path.join(ARROW_CACHE_DIR, nombre))
+                except OSError:
+                    pass
+
+    tabla = pa.ipc.open_file(pa.memory_map(ruta_ipc, 'r')).read_all()
+    with _tablas_lock:
+        _tablas[clave] = tabla
+        while len(_tablas) > MAX_TABLAS:
+            _tablas.popitem(last=False)
+    return tabla
+
+
+def _tabla_github(url: str) -> pa.Table:
+    """Tabla de un parquet de GitHub (CacheDescargas + memory-map)"""
+    ahora = time.time()
+    with _tablas_lock:
+        entrada = _rutas_github.get(url)
+    # Con ?v=<huella> la ruta vale para siempre; sin versión se revalida cada TTL_SIN_VERSION
+    if entrada is None or not os.path.exists(entrada[1]) or \
+            ('?v=' not in url and ahora - entrada[0] > TTL_SIN_VERSION):
+        entrada = (ahora, obtener_cache_descargas().obtener_ruta(url, timeout=15))
+        with _tablas_lock:
+            _rutas_github[url] = entrada
+    return _tabla_mmap(entrada[1])
+
+
+def _cargar_parquet_github(url: str) -> pd.DataFrame:
+    try:
+        return _a_pandas(_tabla_github(url))
+    except Exception as e:
+        print(f"❌ Error cargando {url}: {e}")
+        return pd.DataFrame()
+
+
+# Un índice de stats y un reparto de lesionados por versión de los datos,
+# compartidos por todas las sesiones del proceso (solo lectura)
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+# ============================================================================
+# ESCRITURAS ATÓMICAS
+# ============================================================================
+# Todo lo que se escribe en data/ pasa por _escribir_atomico: temporal propio
+# del proceso y del hilo + os.replace, así un lector (la app u otro worker) ve
+# el fichero anterior o el nuevo, nunca uno truncado, y dos escritores no se
+# pisan el temporal. Los read-modify-write (stats, lesionados, logs de
+# segmentos, manifiestos, metadata) van además bajo un BloqueoEscritura: entre
+# hilos (compactación en segundo plano) y entre procesos (varios scrapers y la
+# app sobre el mismo data/) con un lock file. Los manifiestos se escriben
+# siempre después de los ficheros a los que apuntan.
+
+class BloqueoEscritura:
+    """
+    Lock exclusivo y reentrante: RLock entre hilos + lock file entre procesos
+    (fcntl.flock; msvcrt.locking en Windows). El lock del SO se suelta solo
+    al cerrar el descriptor, también si el proceso muere.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.RLock()
+        self._nivel = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._nivel == 0:
+            try:
+                self._fd = self._bloquear()
+            except BaseException:
+                self._lock.release()
+                raise
+        self._nivel += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._nivel -= 1
+        if self._nivel == 0:
+            fd, self._fd = self._fd, None
+            self._desbloquear(fd)
+        self._lock.release()
+
+    def _bloquear(self) -> int:
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
         try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            from io import BytesIO
-            return pd.read_parquet(BytesIO(response.content))
-        except Exception as e:
-            print(f"❌ Error cargando {url}: {e}")
-            return pd.DataFrame()
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)   # reintenta 10 s y lanza OSError
+                        break
+                    except OSError:
+                        continue
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
 
-    def _cargar_metadata_github(url: str) -> dict:
-        import requests
+    @staticmethod
+    def _desbloquear(fd: int):
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {}
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+# Serializa las escrituras de data/ (stats, lesionados, archivo, deltas,
+# metadata) entre guardados completos, la compactación de los logs de
+# segmentos y otros procesos
+_escritura_lock = BloqueoEscritura(os.path.join('data', '.lock'))
+
+
+def _escribir_atomico(ruta: str, escribir):
+    """escribir(tmp) y os.replace(tmp, ruta); si algo falla `ruta` queda como estaba"""
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        escribir(tmp)
+        os.replace(tmp, ruta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class LecturaInconsistente(RuntimeError):
+    """Se leyó a la vez que otro proceso publicaba (ver _leer_consistente)"""
+
+
+def _leer_consistente(leer, intentos: int = 3):
+    """
+    leer() sin lock, repetido si otro proceso publica a mitad de la lectura
+    (borra un segmento o un delta ya fundido, o cambia el snapshot)
+    """
+    for intento in range(intentos):
+        try:
+            return leer()
+        except (FileNotFoundError, LecturaInconsistente):
+            if intento == intentos - 1:
+                raise
+            time.sleep(0.05 * (intento + 1))
+
+
+def _guardar_parquet(df: pd.DataFrame, ruta: str, **kwargs):
+    _escribir_atomico(ruta, lambda tmp: df.to_parquet(tmp, index=False, **kwargs))
+
+
+def _guardar_json(datos: dict, ruta: str):
+    def escribir(tmp):
+        with open(tmp, 'w') as f:
+            json.dump(datos, f, indent=2)
+    _escribir_atomico(ruta, escribir)
+
+
+def _slug_equipo(equipo: str) -> str:
+    return equipo.lower().replace(' ', '_')
+
+
+def _temporada(mes: str, mes_inicio: int) -> str:
+    """'2025-11' → '2025-26' (la temporada empieza en `mes_inicio`)"""
+    anio, numero = (int(x) for x in mes.split('-'))
+    inicio = anio if numero >= mes_inicio else anio - 1
+    return f"{inicio}-{(inicio + 1) % 100:02d}"
+
+
+# ============================================================================
+# ESCRITURA EN STREAMING
+# ============================================================================
+
+class EscritorParquet:
+    """
+    Sink de las stats de un run: cada escribir() es un parquet propio en
+    `directorio` (tmp + os.replace), durable en cuanto retorna. Nada se
+    acumula en memoria ni depende de cerrar un fichero: un run que muere deja
+    sus partes en disco y el siguiente las retoma al abrir el mismo directorio.
+
+    Las partes se numeran en orden de escritura (en duplicados gana la más
+    reciente). Con `clave` (el equipo) una parte sustituye a las anteriores
+    de esa clave: reescribir un equipo reanudado no duplica filas.
+    Thread-safe para el modo hilos.
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+        partes = self.partes()
+        if partes:
+            print(f"♻️ Stream: {len(partes)} parte(s) de un run anterior")
+
+    def partes(self) -> list:
+        """Rutas de las partes en orden de escritura"""
+        return self.partes_de(self.directorio)
+
+    @staticmethod
+    def partes_de(directorio: str) -> list:
+        """Partes de un stream en disco sin abrirlo (p.ej. el de un shard)"""
+        if not os.path.isdir(directorio):
+            return []
+        return [os.path.join(directorio, nombre) for nombre in sorted(os.listdir(directorio))
+                if nombre.endswith('.parquet')]
+
+    def escribir(self, datos, clave: str = None):
+        """`datos`: pd.DataFrame o pa.Table"""
+        if datos is None or len(datos) == 0:
+            return
+        if not isinstance(datos, pa.Table):
+            datos = pa.Table.from_pandas(datos, preserve_index=False)
+        with self._lock:
+            partes = self.partes()
+            siguiente = int(os.path.basename(partes[-1])[:6]) + 1 if partes else 0
+            etiqueta = _slug_equipo(clave) if clave else 'parte'
+            ruta = os.path.join(self.directorio, f"{siguiente:06d}-{etiqueta}.parquet")
+            _escribir_atomico(ruta, lambda tmp: pq.write_table(datos, tmp))
+            # Después de la nueva: la clave nunca se queda sin parte
+            if clave:
+                for anterior in partes:
+                    if os.path.basename(anterior)[7:] == f"{etiqueta}.parquet":
+                        os.remove(anterior)
+
+    def cerrar(self) -> int:
+        """Filas en el stream (las partes ya están en disco: no hay nada que cerrar)"""
+        with self._lock:
+            return sum(pq.read_metadata(ruta).num_rows for ruta in self.partes())
+
+    def borrar(self):
+        with self._lock:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+
+
+# ============================================================================
+# LOG DE SEGMENTOS
+# ============================================================================
+# data/segmentos/<nombre>/manifest.json          → {'siguiente': n, 'segmentos': [{archivo, filas, ...}]}
+# data/segmentos/<nombre>/seg-000042.parquet     → filas de un guardado
+#
+# guardar_stats_jugador / guardar_lesionados_equipo escriben solo sus filas
+# como un segmento nuevo en lugar de leer, combinar y reescribir el parquet
+# entero (O(N²) en un run): el coste es proporcional a las filas nuevas. Al
+# leer, los segmentos se aplican sobre la base en orden de escritura y
+# compactar() los funde en ella. Aplicar un segmento dos veces da lo mismo,
+# así que una compactación cortada entre la base y el manifiesto no pierde ni
+# duplica nada.
+
+class LogSegmentos:
+    """
+    Log append-only sobre un parquet base. Seguro entre hilos y procesos (lock file en su directorio).
+    clave:      upsert por esas columnas (gana la fila del segmento más reciente)
+    reemplazar: cada segmento sustituye todas las filas con sus valores de esa
+                columna (lesionados: el equipo entero)
+    """
+
+    def __init__(self, directorio: str, clave: list = None, reemplazar: str = None):
+        self.directorio = directorio
+        self.manifiesto_file = os.path.join(directorio, 'manifest.json')
+        self.clave = clave
+        self.reemplazar = reemplazar
+        # Propio del log: agregar() no espera a una compactación de _escritura_lock
+        self._lock = BloqueoEscritura(os.path.join(directorio, '.lock'))
+
+    def _leer_manifiesto(self) -> dict:
+        if not os.path.exists(self.manifiesto_file):
+            return {'siguiente': 0, 'segmentos': []}
+        with open(self.manifiesto_file, 'r') as f:
+            return json.load(f)
+
+    def _escribir_manifiesto(self, manifiesto: dict):
+        _guardar_json(manifiesto, self.manifiesto_file)
+
+    def segmentos(self, equipo: str = None) -> list:
+        """Entradas pendientes en orden de escritura (solo las de `equipo` si se indica)"""
+        entradas = self._leer_manifiesto()['segmentos']
+        if equipo is None:
+            return entradas
+        return [s for s in entradas if s.get('equipo') == equipo]
+
+    def agregar(self, df: pd.DataFrame, **etiquetas) -> int:
+        """Escribe `df` como segmento nuevo; retorna cuántos hay pendientes"""
+        with self._lock:
+            os.makedirs(self.directorio, exist_ok=True)
+            manifiesto = self._leer_manifiesto()
+            archivo = f"seg-{manifiesto['siguiente']:06d}.parquet"
+            _guardar_parquet(df, os.path.join(self.directorio, archivo))
+
+            manifiesto['siguiente'] += 1
+            manifiesto['segmentos'].append({'archivo': archivo, 'filas': len(df), **etiquetas})
+            self._escribir_manifiesto(manifiesto)
+            return len(manifiesto['segmentos'])
+
+    def aplicar(self, base: pd.DataFrame, segmentos: list = None) -> pd.DataFrame:
+        """`base` + segmentos (por defecto todos los pendientes)"""
+        if segmentos is None:
+            segmentos = self.segmentos()
+        if not segmentos:
+            return base
+
+        partes = [pd.read_parquet(os.path.join(self.directorio, s['archivo'])) for s in segmentos]
+        if self.reemplazar:
+            for parte in partes:
+                if not base.empty:
+                    base = base[~base[self.reemplazar].isin(parte[self.reemplazar])]
+                base = pd.concat([d for d in (base, parte) if not d.empty], ignore_index=True)
+            return base
+
+        df = pd.concat([d for d in (base, *partes) if not d.empty], ignore_index=True)
+        return df.drop_duplicates(subset=self.clave, keep='last').reset_index(drop=True)
+
+    def vaciar(self, segmentos: list = None):
+        """Quita del log los segmentos ya incorporados a la base (por defecto todos)"""
+        with self._lock:
+            manifiesto = self._leer_manifiesto()
+            quitar = {s['archivo'] for s in (manifiesto['segmentos'] if segmentos is None else segmentos)}
+            if not quitar:
+                return
+            manifiesto['segmentos'] = [s for s in manifiesto['segmentos'] if s['archivo'] not in quitar]
+            # Primero el manifiesto: nunca apunta a un segmento borrado
+            self._escribir_manifiesto(manifiesto)
+            for archivo in quitar:
+                ruta = os.path.join(self.directorio, archivo)
+                if os.path.exists(ruta):
+                    os.remove(ruta)
 
 
 class DataManager:
@@ -68,17 +462,61 @@ class DataManager:
 
     DATA_DIR = 'data'
     STATS_FILE = os.path.join(DATA_DIR, 'stats_latest.parquet')
+    STATS_DIR = os.path.join(DATA_DIR, 'stats')        # dataset particionado por equipo
+    MANIFIESTO_FILE = os.path.join(STATS_DIR, 'manifest.json')
     LESIONADOS_FILE = os.path.join(DATA_DIR, 'lesionados_latest.parquet')
     METADATA_FILE = os.path.join(DATA_DIR, 'metadata.json')
+    CALENDARIO_FILE = os.path.join(DATA_DIR, 'calendario_latest.parquet')
+    STATS_NUEVOS_DIR = os.path.join(DATA_DIR, 'stats_nuevos')   # stream del run en curso (EscritorParquet)
+    METRICAS_FILE = os.path.join(DATA_DIR, 'scraper_metrics.parquet')
+    CHECKPOINT_DIR = os.path.join(DATA_DIR, 'checkpoint')
+    CHECKPOINT_ESTADO = os.path.join(CHECKPOINT_DIR, 'estado.json')
+    SHARDS_DIR = os.path.join(DATA_DIR, 'shards')   # salidas parciales de `--shard i/n`
+    SEGMENTOS_DIR = os.path.join(DATA_DIR, 'segmentos')   # logs de guardados parciales (LogSegmentos)
+    ARCHIVO_DIR = os.path.join(DATA_DIR, 'archivo')       # histórico sin retención (ver archivar_stats)
+    ARCHIVO_MANIFIESTO = os.path.join(ARCHIVO_DIR, 'manifest.json')
+    DELTAS_DIR = os.path.join(DATA_DIR, 'deltas')         # cambios por run sobre stats_latest (snapshot)
+    DELTAS_MANIFIESTO = os.path.join(DELTAS_DIR, 'manifest.json')
+    CONSULTAS_DB = os.path.join('.cache', 'consultas', 'stats.sqlite')   # ver consultas_stats.py
 
     DIAS_RETENER = 15
+    DIAS_RETENER_METRICAS = 90
     PARTIDOS_POR_JUGADOR = 10
+    COMPACTAR_CADA = 64   # segmentos pendientes que disparan una compactación en segundo plano
+    MES_INICIO_TEMPORADA = 9       # septiembre: el corte entre temporadas cae en pleno verano
+    FILAS_POR_GRUPO = 2048         # row groups del archivo: lecturas por jugador sin leer el mes entero
+    DELTAS_MAX = 14                # una semana de runs (2 al día) entre snapshots
+    FRACCION_SNAPSHOT = 0.5        # ...o antes si los deltas suman más de esta fracción del snapshot
 
-    def __init__(self):
+    def __init__(self, shard: tuple = None, nube: bool = None):
         os.makedirs(self.DATA_DIR, exist_ok=True)
         self.is_streamlit = _STREAMLIT_DISPONIBLE
-        # En Streamlit Cloud no tenemos escritura local confiable → siempre GitHub
-        self.is_cloud = self.is_streamlit
+        # En Streamlit Cloud no tenemos escritura local confiable → siempre GitHub.
+        # nube=None lo deduce de si Streamlit se importa; el scraper pasa
+        # nube=False porque en Actions también lo instala requirements.txt
+        self.is_cloud = self.is_streamlit if nube is None else nube
+
+        # Worker de un shard (i, n): lee data/ como siempre pero escribe stream,
+        # checkpoint y salidas en data/shards/<i>-de-<n>/ (ver unir_shards)
+        self.shard = shard
+        if shard:
+            self.SHARD_DIR = os.path.join(self.SHARDS_DIR, f"{shard[0]}-de-{shard[1]}")
+            self.STATS_NUEVOS_DIR = os.path.join(self.SHARD_DIR, 'stats_nuevos')
+            self.CHECKPOINT_DIR = os.path.join(self.SHARD_DIR, 'checkpoint')
+            self.CHECKPOINT_ESTADO = os.path.join(self.CHECKPOINT_DIR, 'estado.json')
+            os.makedirs(self.SHARD_DIR, exist_ok=True)
+
+        self._log_stats = LogSegmentos(os.path.join(self.SEGMENTOS_DIR, 'stats'),
+                                       clave=['Jugador', 'Timestamp'])
+        self._log_lesionados = LogSegmentos(os.path.join(self.SEGMENTOS_DIR, 'lesionados'),
+                                            reemplazar='Equipo')
+        self._compactador = None
+
+    def _salida(self, ruta: str) -> str:
+        """Ruta de escritura de `ruta`: la misma, o su equivalente en el directorio del shard"""
+        if not self.shard:
+            return ruta
+        return os.path.join(self.SHARD_DIR, os.path.basename(ruta))
 
     # ============================================================================
     # MÉTODOS DE CARGA
@@ -86,34 +524,64 @@ class DataManager:
 
     def cargar_stats(self) -> pd.DataFrame:
         """
-        Carga stats desde GitHub con cache de 30 min (Streamlit Cloud)
-        o desde archivo local (scraper).
-        Primera carga: ~1-2s. Siguientes: instantáneo.
+        Carga stats desde GitHub (Streamlit Cloud) o desde archivo local
+        (scraper), sobre la tabla Arrow memory-mapped de la versión actual.
+        Primera carga: ~1-2s. Siguientes: instantáneo y sin copias.
         """
         if self.is_cloud:
-            # Sin timestamp para que el cache funcione correctamente
-            url = f"{self.BASE_RAW_URL}/stats_latest.parquet"
-            return _cargar_parquet_github(url)
+            # Snapshot + deltas, reconstruido una vez por versión publicada
+            rutas = (self.STATS_FILE, self.DELTAS_MANIFIESTO)
+            return self._indice('stats_publicadas', rutas, lambda v: self._stats_nube()).copy(deep=False)
 
-        if os.path.exists(self.STATS_FILE):
-            return pd.read_parquet(self.STATS_FILE)
-        return pd.DataFrame()
+        if self._log_stats.segmentos() or self._leer_manifiesto_deltas().get('deltas'):
+            return self._stats_local()
+        return self._leer_local(self.STATS_FILE)
+
+    @staticmethod
+    def _leer_local(ruta: str) -> pd.DataFrame:
+        """Parquet local vía su tabla Arrow (ver _tabla_mmap); vacío si no existe"""
+        if not os.path.exists(ruta):
+            return pd.DataFrame()
+        return _a_pandas(_tabla_mmap(ruta))
+
+    def _stats_local(self, segmentos: list = None) -> pd.DataFrame:
+        """Stats publicadas (snapshot + deltas) + segmentos pendientes (por defecto todos)"""
+        if segmentos is not None:
+            return self._log_stats.aplicar(self._stats_publicadas(), segmentos)
+        return _leer_consistente(lambda: self._log_stats.aplicar(self._stats_publicadas()))
 
     def cargar_lesionados(self) -> pd.DataFrame:
         """Carga lesionados con cache de 30 min"""
         if self.is_cloud:
-            url = f"{self.BASE_RAW_URL}/lesionados_latest.parquet"
+            return _cargar_parquet_github(self._url('lesionados_latest.parquet'))
+
+        return _leer_consistente(lambda: self._log_lesionados.aplicar(self._leer_local(self.LESIONADOS_FILE)))
+
+    def cargar_calendario(self) -> pd.DataFrame:
+        """Calendario de la liga (próximos partidos de los 30 equipos)"""
+        if self.is_cloud:
+            return _cargar_parquet_github(self._url('calendario_latest.parquet'))
+
+        return self._leer_local(self.CALENDARIO_FILE)
+
+    def cargar_metricas(self) -> pd.DataFrame:
+        """Histórico de telemetría del scraper (una fila por endpoint/equipo y run)"""
+        # Lo lee sobre todo el propio scraper: el fichero local manda sobre GitHub
+        if self.is_cloud and not os.path.exists(self.METRICAS_FILE):
+            url = f"{self.BASE_RAW_URL}/scraper_metrics.parquet"
             return _cargar_parquet_github(url)
 
-        if os.path.exists(self.LESIONADOS_FILE):
-            return pd.read_parquet(self.LESIONADOS_FILE)
+        if os.path.exists(self.METRICAS_FILE):
+            return pd.read_parquet(self.METRICAS_FILE)
         return pd.DataFrame()
 
-    def cargar_metadata(self) -> dict:
-        """Carga metadata con cache"""
-        if self.is_cloud:
-            url = f"{self.BASE_RAW_URL}/metadata.json"
-            return _cargar_metadata_github(url)
+    def cargar_metadata(self, local: bool = False) -> dict:
+        """
+        Carga metadata con cache.
+        local=True: el fichero local aunque haya Streamlit (lo usa el scraper).
+        """
+        if self.is_cloud and not local:
+            return _sondear_metadata_github(f"{self.BASE_RAW_URL}/metadata.json")
 
         if os.path.exists(self.METADATA_FILE):
             with open(self.METADATA_FILE, 'r') as f:
@@ -126,28 +594,177 @@ class DataManager:
             'equipos_procesados': 0
         }
 
-    def obtener_stats_equipo(self, nombre_equipo: str) -> pd.DataFrame:
+    def cargar_manifiesto(self) -> dict:
+        """Manifiesto del dataset data/stats/ ({} si todavía no existe)"""
+        if self.is_cloud:
+            return _cargar_metadata_github(self._url('stats/manifest.json'))
+
+        if os.path.exists(self.MANIFIESTO_FILE):
+            with open(self.MANIFIESTO_FILE, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def version_datos(self) -> str:
         """
-        Filtra el DataFrame global por equipo.
-        Rápido porque cargar_stats() usa cache — no re-descarga.
+        Versión de todo lo publicado (metadata['datos']['version']). Los caches
+        de la app (features, modelos, agregados) van por esta clave.
         """
-        df_all = self.cargar_stats()
-        if df_all.empty:
-            return pd.DataFrame()
+        metadata = self.cargar_metadata()
+        return (metadata.get('datos') or {}).get('version') or metadata.get('ultima_actualizacion', 'Sin datos')
+
+    def _huella_publicada(self, nombre: str) -> str:
+        """Huella de data/<nombre> según el último metadata.json (None si no consta)"""
+        return ((self.cargar_metadata().get('datos') or {}).get('archivos', {}).get(nombre) or {}).get('huella')
+
+    def _url(self, nombre: str) -> str:
+        """URL raw de data/<nombre>, versionada con su huella si metadata.json la publica"""
+        huella = self._huella_publicada(nombre)
+        return f"{self.BASE_RAW_URL}/{nombre}" + (f"?v={huella}" if huella else '')
+
+    def _version(self, *rutas) -> str:
+        """Versión de ficheros de data/: mtime+tamaño en local, su huella publicada en la nube"""
+        if self.is_cloud:
+            huellas = [self._huella_publicada(os.path.relpath(ruta, self.DATA_DIR).replace(os.sep, '/'))
+                       for ruta in rutas]
+            if not any(huellas):
+                return self.version_datos()
+            return '|'.join(h or '-' for h in huellas)
+        versiones = []
+        for ruta in rutas:
+            info = os.stat(ruta) if os.path.exists(ruta) else None
+            versiones.append(f"{info.st_mtime_ns}-{info.st_size}" if info else '-')
+        return '|'.join(versiones)
+
+    def _indice(self, clave: str, rutas: tuple, construir):
+        """construir() una sola vez por versión de `rutas` (base + manifiesto de su log)"""
+        version = self._version(*rutas)
+        with _indices_lock:
+            actual = _indices.get(clave)
+            if actual is not None and actual[0] == version:
+                return actual[1]
+        indice = construir(version)
+        with _indices_lock:
+            _indices[clave] = (version, indice)
+        return indice
+
+    def indice_stats(self) -> IndiceStats:
+        """IndiceStats de la liga (ver indice_stats.py), reconstruido solo cuando cambian los datos"""
+        rutas = (self.STATS_FILE, self.DELTAS_MANIFIESTO, self._log_stats.manifiesto_file)
+        return self._indice('stats', rutas, lambda v: IndiceStats(self.cargar_stats(), version=v))
+
+    def consultas(self) -> ConsultasStats:
+        """Motor SQL sobre las stats (ver consultas_stats.py), reconstruido solo cuando cambian los datos"""
+        rutas = (self.STATS_FILE, self.DELTAS_MANIFIESTO, self._log_stats.manifiesto_file)
+        return self._indice('consultas', rutas,
+                            lambda v: ConsultasStats.abrir(self.CONSULTAS_DB, v, self.cargar_stats))
+
+    def _stats_equipo_local(self, nombre_equipo: str) -> pd.DataFrame:
+        """Partición local del equipo + sus filas de los deltas + sus guardados aún sin compactar"""
+        manifiesto = self.cargar_manifiesto()
+        entrada = manifiesto.get('equipos', {}).get(nombre_equipo)
+        df_equipo = pd.DataFrame()
+        if entrada is not None:
+            df_equipo = self._leer_local(os.path.join(self.STATS_DIR, entrada['archivo']))
+        df_equipo = self._deltas_equipo(df_equipo, nombre_equipo, manifiesto, self._leer_manifiesto_deltas(),
+                                        lambda archivo, seq: pd.read_parquet(os.path.join(self.DATA_DIR, archivo)))
+        return self._log_stats.aplicar(df_equipo, self._log_stats.segmentos(equipo=nombre_equipo))
+
+    def _deltas_equipo(self, df_equipo: pd.DataFrame, nombre_equipo: str, manifiesto: dict,
+                       manifiesto_deltas: dict, leer) -> pd.DataFrame:
+        """
+        Partición de `nombre_equipo` + sus filas de los deltas publicados
+        después de su snapshot. Particiones sin 'seq' (anteriores a los deltas)
+        ya son el estado completo.
+        """
+        seq = manifiesto.get('seq')
+        if seq is None:
+            return df_equipo
+        if (manifiesto_deltas.get('snapshot') or {}).get('seq') != seq:
+            raise LecturaInconsistente(f"Particiones del snapshot {seq} y deltas de otro snapshot")
+        return self._aplicar_deltas(df_equipo, manifiesto_deltas.get('deltas', []), leer, equipo=nombre_equipo)
 
-        df_equipo = df_all[df_all['Equipo'] == nombre_equipo].copy()
+    def obtener_stats_equipo(self, nombre_equipo: str) -> pd.DataFrame:
+        """
+        Stats de un equipo leyendo solo su partición de data/stats/ (ver
+        _guardar_particiones) y sus filas de los deltas: el coste no crece con
+        el resto de la liga. Sin manifiesto (datos de antes del dataset), slice
+        del índice de stats_latest. Si la partición o un delta no se pueden
+        descargar lanza la excepción: nunca retorna un equipo a medias.
+        """
+        manifiesto = self.cargar_manifiesto()
+        if manifiesto.get('equipos') is not None:
+            entrada = manifiesto['equipos'].get(nombre_equipo)
+            if self.is_cloud:
+                df_equipo = pd.DataFrame()
+                if entrada is not None:
+                    # La huella en la URL invalida el cache en cuanto cambia la partición
+                    url = f"{self.BASE_RAW_URL}/stats/{entrada['archivo']}?v={entrada['huella']}"
+                    df_equipo = _a_pandas(_tabla_github(url))
+                # Entre snapshots solo cambian los deltas (compartidos por todos los equipos)
+                df_equipo = self._deltas_equipo(df_equipo, nombre_equipo, manifiesto,
+                                                self.cargar_manifiesto_deltas(), self._delta_github)
+            else:
+                df_equipo = _leer_consistente(lambda: self._stats_equipo_local(nombre_equipo))
+        else:
+            df_equipo = self.indice_stats().equipo(nombre_equipo)
+            if df_equipo.empty:
+                return pd.DataFrame()
 
-        if not df_equipo.empty and 'Fecha' in df_equipo.columns:
-            df_equipo['Fecha'] = pd.to_datetime(df_equipo['Fecha'])
+        # Las particiones ya guardan Fecha como timestamp: sin re-parsear ni copiar
+        if not df_equipo.empty and 'Fecha' in df_equipo.columns \
+                and not pd.api.types.is_datetime64_any_dtype(df_equipo['Fecha']):
+            df_equipo = df_equipo.assign(Fecha=pd.to_datetime(df_equipo['Fecha']))
 
         return df_equipo
 
     def obtener_lesionados_equipo(self, nombre_equipo: str) -> pd.DataFrame:
-        """Filtra lesionados por equipo"""
-        df_lesionados = self.cargar_lesionados()
-        if df_lesionados.empty:
+        """Lesionados de un equipo (repartidos por equipo una vez por versión)"""
+        def construir(version):
+            df_lesionados = self.cargar_lesionados()
+            if df_lesionados.empty or 'Equipo' not in df_lesionados.columns:
+                return {}
+            return {equipo: df.reset_index(drop=True) for equipo, df in df_lesionados.groupby('Equipo')}
+
+        rutas = (self.LESIONADOS_FILE, self._log_lesionados.manifiesto_file)
+        por_equipo = self._indice('lesionados', rutas, construir)
+        if nombre_equipo not in por_equipo:
             return pd.DataFrame()
-        return df_lesionados[df_lesionados['Equipo'] == nombre_equipo].copy()
+        return por_equipo[nombre_equipo].copy()
+
+    def indice_partidos(self) -> dict:
+        """
+        Índice {Jugador: set(Timestamp)} de los partidos ya guardados, en
+        stats_latest o en el archivo de temporada. El scraper lo usa para no
+        volver a pedir box scores que ya tiene.
+        """
+        # El scraper escribe en local: el fichero local manda sobre GitHub
+        if os.path.exists(self.STATS_FILE) or self._log_stats.segmentos():
+            df_all = self._stats_local()
+        else:
+            df_all = self.cargar_stats()
+        partes = []
+        if not df_all.empty and 'Timestamp' in df_all.columns:
+            partes.append(df_all[['Jugador', 'Timestamp']])
+
+        # Partidos fuera de DIAS_RETENER pero aún en la ventana de events/last:
+        # están en el archivo (ver archivar_stats), solo hacen falta las claves
+        meses = {}
+        if os.path.exists(self.ARCHIVO_MANIFIESTO):
+            with open(self.ARCHIVO_MANIFIESTO, 'r') as f:
+                meses = json.load(f).get('meses', {})
+        for entrada in meses.values():
+            for particion in self._particiones_archivo(entrada):
+                ruta = os.path.join(self.ARCHIVO_DIR, particion['archivo'])
+                if os.path.exists(ruta):
+                    partes.append(pq.read_table(ruta, columns=['Jugador', 'Timestamp']).to_pandas())
+
+        if not partes:
+            return {}
+        claves = pd.concat(partes, ignore_index=True)
+        return {
+            jugador: set(ts.astype(int))
+            for jugador, ts in claves.groupby('Jugador')['Timestamp']
+        }
 
     def estadisticas_almacenamiento(self) -> dict:
         stats = {
@@ -158,71 +775,740 @@ class DataManager:
         }
         if stats['stats_exists']:
             stats['stats_size_mb'] = round(os.path.getsize(self.STATS_FILE) / 1024 / 1024, 2)
+        deltas = self._leer_manifiesto_deltas().get('deltas', [])
+        stats['deltas'] = len(deltas)
+        stats['deltas_filas'] = sum(d['filas'] + d['borradas'] for d in deltas)
         if stats['lesionados_exists']:
             stats['lesionados_size_mb'] = round(os.path.getsize(self.LESIONADOS_FILE) / 1024 / 1024, 2)
+        if os.path.exists(self.MANIFIESTO_FILE):
+            particiones = self.cargar_manifiesto().get('equipos', {})
+            stats['particiones'] = len(particiones)
+            stats['particion_max_mb'] = round(
+                max((p['bytes'] for p in particiones.values()), default=0) / 1024 / 1024, 2
+            )
+        if os.path.exists(self.ARCHIVO_MANIFIESTO):
+            archivo = self.cargar_manifiesto_archivo()
+            stats['archivo_meses'] = len(archivo.get('meses', {}))
+            stats['archivo_partidos'] = archivo.get('filas', 0)
+            stats['archivo_mb'] = round(
+                sum(m['bytes'] for m in archivo.get('meses', {}).values()) / 1024 / 1024, 2
+            )
+        stats['segmentos_pendientes'] = len(self._log_stats.segmentos()) + len(self._log_lesionados.segmentos())
         return stats
 
     # ============================================================================
     # MÉTODOS DE GUARDADO
     # ============================================================================
 
-    def guardar_stats(self, df_nuevo: pd.DataFrame) -> int:
-        if df_nuevo.empty:
-            print("⚠️ Intento de guardar DataFrame vacío.")
-            return 0
+    def guardar_stats(self, df_nuevo: pd.DataFrame, combinar: bool = False) -> int:
+        """
+        Guarda stats aplicando la retención (DIAS_RETENER / PARTIDOS_POR_JUGADOR).
+        combinar=True: mezcla con lo ya guardado (scraping incremental);
+        en duplicados Jugador+Timestamp gana la fila nueva.
+        Los segmentos pendientes de guardar_stats_jugador quedan incorporados
+        (combinar=True) o sustituidos por df_nuevo.
+        """
+        with _escritura_lock:
+            segmentos = self._log_stats.segmentos()
+            if combinar:
+                df_existente = self._stats_local(segmentos)
+                if not df_existente.empty:
+                    df_nuevo = pd.concat([df_existente, df_nuevo], ignore_index=True)
+                    df_nuevo = df_nuevo.drop_duplicates(subset=['Jugador', 'Timestamp'], keep='last')
 
-        df_nuevo['Fecha'] = pd.to_datetime(df_nuevo['Fecha'])
-        fecha_limite = datetime.now() - timedelta(days=self.DIAS_RETENER)
-        df_filtrado = df_nuevo[df_nuevo['Fecha'] >= fecha_limite].copy()
+            if df_nuevo.empty:
+                print("⚠️ Intento de guardar DataFrame vacío.")
+                return 0
 
-        if df_filtrado.empty:
-            print(f"⚠️ Todos los datos son anteriores a {self.DIAS_RETENER} días. Guardando datos crudos.")
-            df_final = df_nuevo
-        else:
-            df_final = (
-                df_filtrado
-                .sort_values('Fecha', ascending=False)
-                .groupby('Jugador')
-                .head(self.PARTIDOS_POR_JUGADOR)
-                .reset_index(drop=True)
-            )
+            registros = self._retener_y_escribir(df_nuevo)
+            self._log_stats.vaciar(segmentos)
+            return registros
 
-        df_final.to_parquet(self.STATS_FILE, index=False)
+    def _retener_y_escribir(self, df_nuevo: pd.DataFrame) -> int:
+        """Archivo + retención de guardar_stats + escritura; retorna los registros guardados"""
+        # Al archivo antes de recortar: allí no hay retención
+        self.archivar_stats(df_nuevo)
+        df_final = self._retener(df_nuevo)
+        self._escribir_stats(df_final)
         print(f"✅ Stats guardadas: {len(df_final)} registros")
         return len(df_final)
 
+    def _retener(self, df: pd.DataFrame, avisar: bool = True) -> pd.DataFrame:
+        """Retención de stats_latest: DIAS_RETENER días y PARTIDOS_POR_JUGADOR partidos por jugador"""
+        df['Fecha'] = pd.to_datetime(df['Fecha'])
+        fecha_limite = datetime.now() - timedelta(days=self.DIAS_RETENER)
+        df_filtrado = df[df['Fecha'] >= fecha_limite].copy()
+
+        if df_filtrado.empty:
+            if avisar:
+                print(f"⚠️ Todos los datos son anteriores a {self.DIAS_RETENER} días. Guardando datos crudos.")
+            return df
+        return (
+            df_filtrado
+            .sort_values('Fecha', ascending=False)
+            .groupby('Jugador')
+            .head(self.PARTIDOS_POR_JUGADOR)
+            .reset_index(drop=True)
+        )
+
+    def _escribir_stats(self, df: pd.DataFrame):
+        """Stats de la liga (snapshot o delta, ver _publicar_stats) + dataset particionado por equipo"""
+        self._publicar_stats(df)
+        # Las particiones son el snapshot repartido por equipo: solo se
+        # reescriben con un snapshot nuevo (o si aún no son las de este snapshot)
+        seq = (self._leer_manifiesto_deltas().get('snapshot') or {}).get('seq')
+        if self.cargar_manifiesto().get('seq') != seq or seq is None:
+            self._guardar_particiones(pd.read_parquet(self.STATS_FILE), seq)
+
+    # data/stats/manifest.json                       → {seq, equipos: {equipo: archivo, filas, huella...}}
+    # data/stats/equipo=<equipo>/part-0.parquet      → filas del snapshot de un equipo (Fecha desc)
+
+    def _guardar_particiones(self, df: pd.DataFrame, seq: int = None):
+        """
+        Una partición por equipo + manifiesto, con el `seq` del snapshot del
+        que salen (ver _deltas_equipo). Solo se reescriben las particiones
+        cuya huella (hash del contenido) cambió: menos churn en git y el cache
+        HTTP de las demás sigue valiendo. El manifiesto se escribe al final,
+        así nunca apunta a una partición a medio escribir.
+        """
+        anterior = {}
+        if os.path.exists(self.MANIFIESTO_FILE):
+            with open(self.MANIFIESTO_FILE, 'r') as f:
+                anterior = json.load(f).get('equipos', {})
+
+        equipos = {}
+        for equipo, df_eq in df.groupby('Equipo', sort=True):
+            # Orden determinista → misma huella si las filas no cambian
+            df_eq = df_eq.sort_values(['Fecha', 'Jugador'], ascending=[False, True]).reset_index(drop=True)
+            huella = hashlib.sha1(pd.util.hash_pandas_object(df_eq, index=False).values.tobytes()).hexdigest()[:16]
+            archivo = f"equipo={_slug_equipo(equipo)}/part-0.parquet"
+            ruta = os.path.join(self.STATS_DIR, archivo)
+
+            if anterior.get(equipo, {}).get('huella') != huella or not os.path.exists(ruta):
+                _guardar_parquet(df_eq, ruta)
+
+            equipos[equipo] = {
+                'archivo': archivo,
+                'filas': len(df_eq),
+                'bytes': os.path.getsize(ruta),
+                'huella': huella,
+                'timestamp_min': int(df_eq['Timestamp'].min()),
+                'timestamp_max': int(df_eq['Timestamp'].max()),
+            }
+
+        manifiesto = {
+            'version': 1,
+            'seq': seq,
+            'generado': datetime.now().isoformat(),
+            'particionado_por': ['Equipo'],
+            'filas': sum(e['filas'] for e in equipos.values()),
+            'equipos': equipos,
+        }
+        _guardar_json(manifiesto, self.MANIFIESTO_FILE)
+
+        # Equipos que se quedaron sin filas
+        for equipo, entrada in anterior.items():
+            if equipo not in equipos:
+                shutil.rmtree(os.path.join(self.STATS_DIR, os.path.dirname(entrada['archivo'])),
+                              ignore_errors=True)
+
+    def abrir_stats_streaming(self) -> EscritorParquet:
+        """Sink para las stats nuevas del run (ver guardar_stats_streaming); retoma las partes de un run cortado"""
+        return EscritorParquet(self.STATS_NUEVOS_DIR)
+
+    def guardar_stats_streaming(self, escritor: EscritorParquet, combinar: bool = False) -> int:
+        """
+        Consolida el stream del run en stats_latest, igual que guardar_stats()
+        pero parte a parte: cada parte va al archivo y se funde con lo retenido
+        hasta ahora, recortado otra vez por la retención. En memoria nunca hay
+        más que lo retenido + una parte, no el stream entero (la retención da
+        lo mismo aplicada así que de una vez).
+        Retorna el total de registros guardados (0 si el stream está vacío).
+        En un shard el stream es la salida del worker: se deja en disco para
+        unir_shards() (retorna sus filas).
+        """
+        filas = escritor.cerrar()
+        if self.shard:
+            return filas
+        if not filas:
+            escritor.borrar()
+            return 0
+
+        with _escritura_lock:
+            segmentos = self._log_stats.segmentos()
+            df = pd.DataFrame()
+            if combinar:
+                df = self._stats_local(segmentos)
+                if segmentos:
+                    # Los guardados sin compactar aún no están en el archivo
+                    self.archivar_stats(self._log_stats.aplicar(pd.DataFrame(), segmentos))
+            for ruta in escritor.partes():
+                parte = pd.read_parquet(ruta)
+                self.archivar_stats(parte)
+                df = pd.concat([d for d in (df, parte) if not d.empty], ignore_index=True)
+                if combinar:
+                    df = df.drop_duplicates(subset=['Jugador', 'Timestamp'], keep='last')
+                df = self._retener(df, avisar=False)
+
+            self._escribir_stats(df)
+            self._log_stats.vaciar(segmentos)
+        # Consolidado: el stream ya no hace falta (hasta aquí sobrevive a un corte)
+        escritor.borrar()
+        print(f"✅ Stats guardadas: {len(df)} registros ({filas} filas nuevas del stream)")
+        return len(df)
+
     def guardar_stats_jugador(self, equipo: str, jugador: str, df_stats: pd.DataFrame):
+        """Upsert (Jugador+Timestamp) de las filas de un jugador como segmento del log"""
         if df_stats.empty:
             return
-
-        df_existente = pd.DataFrame()
-        if os.path.exists(self.STATS_FILE):
-            df_existente = pd.read_parquet(self.STATS_FILE)
-
-        df_combinado = pd.concat([df_existente, df_stats], ignore_index=True)
-        df_combinado = df_combinado.drop_duplicates(subset=['Jugador', 'Timestamp'], keep='last')
-        df_combinado.to_parquet(self.STATS_FILE, index=False)
+        pendientes = self._log_stats.agregar(df_stats, equipo=equipo, jugador=jugador)
+        if pendientes >= self.COMPACTAR_CADA:
+            self.compactar(en_segundo_plano=True)
 
     def guardar_lesionados(self, df_lesionados: pd.DataFrame):
         if df_lesionados.empty:
             print("⚠️ No hay datos de lesionados para guardar.")
             return
-        df_lesionados.to_parquet(self.LESIONADOS_FILE, index=False)
+        if self.shard:
+            _guardar_parquet(df_lesionados, self._salida(self.LESIONADOS_FILE))
+        else:
+            # Sustituye también lo pendiente de guardar_lesionados_equipo
+            with _escritura_lock:
+                segmentos = self._log_lesionados.segmentos()
+                _guardar_parquet(df_lesionados, self.LESIONADOS_FILE)
+                self._log_lesionados.vaciar(segmentos)
         print(f"✅ Lesionados guardados: {len(df_lesionados)} registros")
 
     def guardar_lesionados_equipo(self, equipo: str, df_lesionados: pd.DataFrame):
+        """Sustituye los lesionados de `equipo` (segmento del log)"""
         if df_lesionados.empty:
             return
+        pendientes = self._log_lesionados.agregar(df_lesionados, equipo=equipo)
+        if pendientes >= self.COMPACTAR_CADA:
+            self.compactar(en_segundo_plano=True)
 
-        df_existente = pd.DataFrame()
-        if os.path.exists(self.LESIONADOS_FILE):
-            df_existente = pd.read_parquet(self.LESIONADOS_FILE)
+    def compactar(self, en_segundo_plano: bool = False) -> dict:
+        """
+        Funde los segmentos pendientes en stats_latest (+ particiones) y
+        lesionados_latest. en_segundo_plano=True: en un hilo (no daemon: el
+        proceso espera a que termine) salvo que ya haya uno en marcha.
+        Retorna {'stats': segmentos, 'lesionados': segmentos} compactados.
+        """
+        if en_segundo_plano:
+            if self._compactador is None or not self._compactador.is_alive():
+                self._compactador = threading.Thread(target=self.compactar, name='compactador')
+                self._compactador.start()
+            return {}
 
-        if not df_existente.empty:
-            df_existente = df_existente[df_existente['Equipo'] != equipo]
+        with _escritura_lock:
+            compactados = {}
+            for nombre, log, leer, escribir in (
+                ('stats', self._log_stats, self._stats_publicadas,
+                 lambda df: (self.archivar_stats(df), self._escribir_stats(df))),
+                ('lesionados', self._log_lesionados,
+                 lambda: pd.read_parquet(self.LESIONADOS_FILE) if os.path.exists(self.LESIONADOS_FILE) else pd.DataFrame(),
+                 lambda df: _guardar_parquet(df, self.LESIONADOS_FILE)),
+            ):
+                segmentos = log.segmentos()
+                compactados[nombre] = len(segmentos)
+                if not segmentos:
+                    continue
+                escribir(log.aplicar(leer(), segmentos))
+                log.vaciar(segmentos)
 
-        df_combinado = pd.concat([df_existente, df_lesionados], ignore_index=True)
-        df_combinado.to_parquet(self.LESIONADOS_FILE, index=False)
+        if any(compactados.values()):
+            self.actualizar_manifiesto_datos()
+            print(f"🗜️ Compactados {compactados['stats']} segmentos de stats "
+                  f"y {compactados['lesionados']} de lesionados")
+        return compactados
+
+    def guardar_calendario(self, df_calendario: pd.DataFrame):
+        if df_calendario.empty:
+            print("⚠️ Calendario vacío, se conserva el anterior.")
+            return
+        _guardar_parquet(df_calendario, self._salida(self.CALENDARIO_FILE))
+        print(f"✅ Calendario guardado: {df_calendario['Equipo'].nunique()} equipos, {len(df_calendario)} partidos")
+
+    def guardar_metricas(self, df_metricas: pd.DataFrame):
+        """Añade la telemetría del run al histórico (retención DIAS_RETENER_METRICAS)"""
+        if df_metricas.empty:
+            return
+        ruta = self._salida(self.METRICAS_FILE)
+        with _escritura_lock:
+            df = df_metricas
+            if os.path.exists(ruta):
+                df = pd.concat([pd.read_parquet(ruta), df_metricas], ignore_index=True)
+
+            fecha_limite = datetime.now() - timedelta(days=self.DIAS_RETENER_METRICAS)
+            df = df[pd.to_datetime(df['Run']) >= fecha_limite]
+            _guardar_parquet(df, ruta)
+        print(f"✅ Métricas guardadas: {df['Run'].nunique()} runs en histórico")
+
+    # ============================================================================
+    # PUBLICACIÓN POR DELTAS
+    # ============================================================================
+    # stats_latest.parquet es un snapshot y cada run publica solo lo que cambió:
+    #
+    # data/deltas/manifest.json                   → {'seq', 'snapshot': {...}, 'deltas': [...]}
+    # data/deltas/delta-000042.parquet            → filas nuevas o cambiadas del run
+    # data/deltas/delta-000042-borrados.parquet   → claves (Jugador, Timestamp) que salen por retención
+    #
+    # Stats publicadas = snapshot + deltas en orden. Un cliente con el snapshot
+    # en cache (misma huella) solo baja los deltas nuevos y git solo guarda las
+    # filas nuevas de cada run. El snapshot se reescribe (y los deltas se
+    # borran) cada DELTAS_MAX runs o cuando los deltas suman más de
+    # FRACCION_SNAPSHOT de sus filas.
+
+    CLAVE_STATS = ['Jugador', 'Timestamp']
+
+    def _leer_manifiesto_deltas(self) -> dict:
+        if not os.path.exists(self.DELTAS_MANIFIESTO):
+            return {}
+        with open(self.DELTAS_MANIFIESTO, 'r') as f:
+            return json.load(f)
+
+    def cargar_manifiesto_deltas(self) -> dict:
+        """Manifiesto de data/deltas/ ({} si todavía no existe)"""
+        if self.is_cloud:
+            url = self._url('deltas/manifest.json')
+            if not self._huella_publicada('deltas/manifest.json'):
+                return _cargar_metadata_github(url)
+            # Publicado: sin él el snapshot solo sería una liga a medias → la
+            # excepción sube (con ?v=<huella> en disco no hay red)
+            return json.loads(obtener_cache_descargas().obtener(url, timeout=10))
+        return self._leer_manifiesto_deltas()
+
+    def _aplicar_deltas(self, base: pd.DataFrame, deltas: list, leer, equipo: str = None) -> pd.DataFrame:
+        """
+        `base` + `deltas` en orden; leer(archivo, seq) → DataFrame. Con
+        `equipo`, `base` es su partición: se quitan las claves de todo el delta
+        (una clave puede cambiar de equipo) y solo se añaden sus filas.
+        """
+        for delta in deltas:
+            nuevas = leer(delta['archivo'], delta['seq'])
+            claves = [nuevas[self.CLAVE_STATS]]
+            if delta.get('borrados'):
+                claves.append(leer(delta['borrados'], delta['seq']))
+            quitar = pd.MultiIndex.from_frame(pd.concat(claves, ignore_index=True))
+            if equipo is not None:
+                nuevas = nuevas[nuevas['Equipo'] == equipo]
+            if not base.empty:
+                base = base[~pd.MultiIndex.from_frame(base[self.CLAVE_STATS]).isin(quitar)]
+            base = pd.concat([d for d in (base, nuevas) if not d.empty], ignore_index=True)
+        return base
+
+    def _stats_publicadas(self, manifiesto: dict = None) -> pd.DataFrame:
+        """Snapshot local + deltas: exactamente lo que reconstruye un cliente"""
+        if manifiesto is None:
+            return _leer_consistente(lambda: self._stats_publicadas(self._leer_manifiesto_deltas()))
+        base = pd.read_parquet(self.STATS_FILE) if os.path.exists(self.STATS_FILE) else pd.DataFrame()
+        snapshot = manifiesto.get('snapshot')
+        if snapshot and len(base) != snapshot['filas']:
+            raise LecturaInconsistente(f"{self.STATS_FILE} no es el snapshot {snapshot['seq']}")
+        return self._aplicar_deltas(base, manifiesto.get('deltas', []),
+                                    lambda archivo, seq: pd.read_parquet(os.path.join(self.DATA_DIR, archivo)))
+
+    def _delta_github(self, archivo: str, seq: int) -> pd.DataFrame:
+        # Un delta no cambia nunca (seq no se reutiliza): ?v=<seq> → una sola descarga
+        return _a_pandas(_tabla_github(f"{self.BASE_RAW_URL}/{archivo}?v={seq}"))
+
+    def _stats_nube(self) -> pd.DataFrame:
+        """
+        Snapshot + deltas de GitHub. Sin el snapshot o sin algún delta lanza
+        la excepción de la descarga (no se cachea: se reintenta en la próxima
+        llamada) en lugar de servir una liga a medias.
+        """
+        base = _a_pandas(_tabla_github(self._url('stats_latest.parquet')))
+        manifiesto = self.cargar_manifiesto_deltas()
+        snapshot = manifiesto.get('snapshot')
+        if snapshot and len(base) != snapshot['filas']:
+            raise LecturaInconsistente(f"stats_latest.parquet no es el snapshot {snapshot['seq']}")
+        return self._aplicar_deltas(base, manifiesto.get('deltas', []), self._delta_github)
+
+    def _diferencia(self, anterior: pd.DataFrame, df: pd.DataFrame) -> tuple:
+        """
+        (filas de `df` a publicar, claves a borrar) para pasar de `anterior` a
+        `df` con _aplicar_deltas, que sustituye por clave. La clave no es única
+        (un jugador traspasado sale en dos plantillas con el mismo Timestamp):
+        se compara fila a fila y toda clave con alguna fila nueva, cambiada o
+        desaparecida se publica entera.
+        """
+        def huellas(x: pd.DataFrame) -> pd.Series:
+            x = x.assign(Fecha=pd.to_datetime(x['Fecha']).astype('datetime64[ns]'))
+            return pd.util.hash_pandas_object(x, index=False)
+
+        huellas_df = huellas(df)
+        huellas_ant = huellas(anterior[list(df.columns)])
+        tocadas = pd.MultiIndex.from_frame(pd.concat([
+            df.loc[~huellas_df.isin(huellas_ant.values).values, self.CLAVE_STATS],
+            anterior.loc[~huellas_ant.isin(huellas_df.values).values, self.CLAVE_STATS],
+        ], ignore_index=True))
+
+        claves_df = pd.MultiIndex.from_frame(df[self.CLAVE_STATS])
+        claves_ant = pd.MultiIndex.from_frame(anterior[self.CLAVE_STATS])
+        nuevas = df[claves_df.isin(tocadas)]
+        borrados = anterior.loc[claves_ant.isin(tocadas) & ~claves_ant.isin(claves_df), self.CLAVE_STATS]
+        return nuevas.reset_index(drop=True), borrados.drop_duplicates().reset_index(drop=True)
+
+    def _publicar_stats(self, df: pd.DataFrame):
+        """Publica `df` como las nuevas stats de la liga: delta sobre lo publicado o snapshot nuevo"""
+        manifiesto = self._leer_manifiesto_deltas()
+        deltas = manifiesto.get('deltas', [])
+        seq = manifiesto.get('seq', 0) + 1
+
+        nuevas = borrados = None
+        if manifiesto.get('snapshot') and os.path.exists(self.STATS_FILE):
+            anterior = self._stats_publicadas(manifiesto)
+            if set(anterior.columns) == set(df.columns):    # esquema distinto → snapshot
+                nuevas, borrados = self._diferencia(anterior, df)
+                # Filas repetidas enteras no se distinguen por huella: si el
+                # delta no reproduce `df` fila a fila, snapshot
+                quitar = pd.MultiIndex.from_frame(pd.concat(
+                    [nuevas[self.CLAVE_STATS], borrados], ignore_index=True))
+                quedan = (~pd.MultiIndex.from_frame(anterior[self.CLAVE_STATS]).isin(quitar)).sum()
+                if quedan + len(nuevas) != len(df):
+                    nuevas = borrados = None
+
+        if nuevas is not None and nuevas.empty and borrados.empty:
+            return
+        filas_deltas = sum(d['filas'] + d['borradas'] for d in deltas)
+        snapshot = (nuevas is None or len(deltas) >= self.DELTAS_MAX or
+                    filas_deltas + len(nuevas) + len(borrados) > self.FRACCION_SNAPSHOT * len(df))
+        os.makedirs(self.DELTAS_DIR, exist_ok=True)
+
+        if snapshot:
+            _guardar_parquet(df, self.STATS_FILE)
+            manifiesto = {
+                'version': 1,
+                'seq': seq,
+                'snapshot': {'archivo': os.path.basename(self.STATS_FILE), 'seq': seq,
+                             'filas': len(df), 'generado': datetime.now().isoformat()},
+                'deltas': [],
+            }
+        else:
+            entrada = {
+                'seq': seq,
+                'archivo': f"deltas/delta-{seq:06d}.parquet",
+                'filas': len(nuevas),
+                'borradas': len(borrados),
+                'generado': datetime.now().isoformat(),
+            }
+            for clave, datos in (('archivo', nuevas), ('borrados', borrados)):
+                if clave == 'borrados':
+                    if datos.empty:
+                        continue
+                    entrada['borrados'] = f"deltas/delta-{seq:06d}-borrados.parquet"
+                _guardar_parquet(datos, os.path.join(self.DATA_DIR, entrada[clave]))
+            manifiesto = {**manifiesto, 'seq': seq, 'deltas': deltas + [entrada]}
+
+        # El manifiesto al final: nunca apunta a un delta a medio escribir
+        _guardar_json(manifiesto, self.DELTAS_MANIFIESTO)
+
+        if snapshot:
+            for nombre in os.listdir(self.DELTAS_DIR):
+                if nombre.startswith('delta-'):
+                    os.remove(os.path.join(self.DELTAS_DIR, nombre))
+            print(f"📸 Snapshot de stats: {len(df)} filas (seq {seq})")
+        else:
+            print(f"🧾 Delta {seq}: {len(nuevas)} filas nuevas/cambiadas, {len(borrados)} borradas "
+                  f"({len(manifiesto['deltas'])}/{self.DELTAS_MAX} hasta el próximo snapshot)")
+
+    # ============================================================================
+    # HISTÓRICO DE TEMPORADA
+    # ============================================================================
+    # stats_latest solo guarda DIAS_RETENER días y PARTIDOS_POR_JUGADOR
+    # partidos por jugador (lo que lee la app). El archivo conserva todos los
+    # partidos scrapeados, un parquet por mes y equipo ordenado por Jugador y
+    # Timestamp en row groups de FILAS_POR_GRUPO filas: leer un equipo o un
+    # rango de fechas descarta meses y equipos con el manifiesto (en la nube,
+    # sin descargarlos) y, en local, row groups con sus estadísticas.
+    #
+    # data/archivo/manifest.json                                      → {mes: temporada, filas, equipos: {equipo: archivo, huella...}}
+    # data/archivo/temporada=2025-26/mes=2025-11/equipo=boston_celtics.parquet
+    #
+    # Los meses del formato anterior (un parquet por mes, con 'archivo' en su
+    # entrada) se leen igual y archivar_stats los reparte por equipo.
+
+    def cargar_manifiesto_archivo(self) -> dict:
+        """Manifiesto de data/archivo/ ({} si todavía no existe)"""
+        if self.is_cloud:
+            return _cargar_metadata_github(self._url('archivo/manifest.json'))
+
+        if os.path.exists(self.ARCHIVO_MANIFIESTO):
+            with open(self.ARCHIVO_MANIFIESTO, 'r') as f:
+                return json.load(f)
+        return {}
+
+    @staticmethod
+    def _particiones_archivo(entrada: dict, equipo: str = None) -> list:
+        """Ficheros ({archivo, huella...}) de un mes del archivo; solo el de `equipo` si se indica"""
+        if 'archivo' in entrada:   # formato anterior: un parquet por mes
+            return [entrada]
+        equipos = entrada.get('equipos', {})
+        if equipo is not None:
+            return [equipos[equipo]] if equipo in equipos else []
+        return list(equipos.values())
+
+    def archivar_stats(self, df: pd.DataFrame) -> int:
+        """
+        Upsert (Jugador+Timestamp) de `df` en el archivo. Solo se tocan los
+        meses y equipos de `df` y solo se reescriben si su huella cambia.
+        Retorna las particiones (mes, equipo) reescritas.
+        """
+        if df.empty or 'Fecha' not in df.columns:
+            return 0
+
+        with _escritura_lock:
+            meses = {}
+            if os.path.exists(self.ARCHIVO_MANIFIESTO):
+                with open(self.ARCHIVO_MANIFIESTO, 'r') as f:
+                    meses = json.load(f).get('meses', {})
+            df = df.copy()
+            # Mismo dtype que lo ya archivado → misma huella si las filas no cambian
+            df['Fecha'] = pd.to_datetime(df['Fecha']).astype('datetime64[ns]')
+
+            # Meses del formato anterior: sus filas entran como ya archivadas
+            heredados = {mes: e['archivo'] for mes, e in meses.items() if 'archivo' in e}
+            anteriores = []
+            for mes, archivo in heredados.items():
+                ruta = os.path.join(self.ARCHIVO_DIR, archivo)
+                if os.path.exists(ruta):
+                    anteriores.append(pd.read_parquet(ruta).astype({'Fecha': 'datetime64[ns]'}))
+                meses[mes] = {'temporada': meses[mes]['temporada'], 'equipos': {}}
+            if anteriores:
+                df = pd.concat([*anteriores, df], ignore_index=True)
+
+            reescritos = 0
+            for (mes, equipo), df_eq in df.groupby([df['Fecha'].dt.strftime('%Y-%m'), 'Equipo'], sort=True):
+                temporada = _temporada(mes, self.MES_INICIO_TEMPORADA)
+                archivo = f"temporada={temporada}/mes={mes}/equipo={_slug_equipo(equipo)}.parquet"
+                ruta = os.path.join(self.ARCHIVO_DIR, archivo)
+                entrada_mes = meses.setdefault(mes, {'temporada': temporada, 'equipos': {}})
+
+                if os.path.exists(ruta):
+                    existente = pd.read_parquet(ruta)
+                    existente['Fecha'] = existente['Fecha'].astype('datetime64[ns]')
+                    df_eq = pd.concat([existente, df_eq], ignore_index=True)
+                df_eq = df_eq.drop_duplicates(subset=['Jugador', 'Timestamp'], keep='last')
+                df_eq = df_eq.sort_values(['Jugador', 'Timestamp']).reset_index(drop=True)
+                huella = hashlib.sha1(pd.util.hash_pandas_object(df_eq, index=False).values.tobytes()).hexdigest()[:16]
+
+                if entrada_mes['equipos'].get(equipo, {}).get('huella') != huella or not os.path.exists(ruta):
+                    _guardar_parquet(df_eq, ruta, row_group_size=self.FILAS_POR_GRUPO)
+                    reescritos += 1
+
+                entrada_mes['equipos'][equipo] = {
+                    'archivo': archivo,
+                    'filas': len(df_eq),
+                    'jugadores': int(df_eq['Jugador'].nunique()),
+                    'bytes': os.path.getsize(ruta),
+                    'huella': huella,
+                }
+
+            if reescritos or heredados:
+                for entrada_mes in meses.values():
+                    entrada_mes['equipos'] = dict(sorted(entrada_mes['equipos'].items()))
+                    entrada_mes['filas'] = sum(e['filas'] for e in entrada_mes['equipos'].values())
+                    entrada_mes['bytes'] = sum(e['bytes'] for e in entrada_mes['equipos'].values())
+                manifiesto = {
+                    'version': 2,
+                    'generado': datetime.now().isoformat(),
+                    'particionado_por': ['temporada', 'mes', 'equipo'],
+                    'orden': ['Jugador', 'Timestamp'],
+                    'filas': sum(m['filas'] for m in meses.values()),
+                    'meses': dict(sorted(meses.items())),
+                }
+                _guardar_json(manifiesto, self.ARCHIVO_MANIFIESTO)
+                # Después del manifiesto: nunca apunta a un fichero borrado
+                for archivo in heredados.values():
+                    ruta = os.path.join(self.ARCHIVO_DIR, archivo)
+                    if os.path.exists(ruta):
+                        os.remove(ruta)
+                print(f"🗄️ Archivo: {reescritos} partición(es) mes/equipo actualizadas, "
+                      f"{manifiesto['filas']} partidos en total")
+            return reescritos
+
+    def cargar_historial(self, jugador: str = None, equipo: str = None,
+                         desde=None, hasta=None, temporada: str = None) -> pd.DataFrame:
+        """
+        Partidos archivados (sin retención) ordenados por Fecha.
+        `desde`/`hasta`: fechas (str o datetime, inclusivas) sobre la columna Fecha.
+        Solo se leen los meses del rango (con `equipo`, solo sus ficheros) y,
+        en local, los row groups que pueden contener al jugador.
+        """
+        meses = self.cargar_manifiesto_archivo().get('meses', {})
+        desde = pd.Timestamp(desde) if desde is not None else None
+        hasta = pd.Timestamp(hasta) if hasta is not None else None
+
+        filtros = []
+        if jugador is not None:
+            filtros.append(('Jugador', '=', jugador))
+        if equipo is not None:
+            filtros.append(('Equipo', '=', equipo))
+        if desde is not None:
+            filtros.append(('Fecha', '>=', desde))
+        if hasta is not None:
+            filtros.append(('Fecha', '<=', hasta))
+
+        partes = []
+        for mes, entrada in meses.items():
+            if temporada is not None and entrada['temporada'] != temporada:
+                continue
+            if (desde is not None and mes < desde.strftime('%Y-%m')) or \
+               (hasta is not None and mes > hasta.strftime('%Y-%m')):
+                continue
+
+            for particion in self._particiones_archivo(entrada, equipo):
+                if self.is_cloud:
+                    url = f"{self.BASE_RAW_URL}/archivo/{particion['archivo']}?v={particion['huella']}"
+                    df_mes = _cargar_parquet_github(url)
+                    for columna, op, valor in filtros:
+                        if df_mes.empty:
+                            break
+                        serie = df_mes[columna]
+                        df_mes = df_mes[serie == valor if op == '=' else serie >= valor if op == '>=' else serie <= valor]
+                else:
+                    df_mes = pq.read_table(os.path.join(self.ARCHIVO_DIR, particion['archivo']),
+                                           filters=filtros or None).to_pandas()
+                if not df_mes.empty:
+                    partes.append(df_mes)
+
+        if not partes:
+            return pd.DataFrame()
+        df = pd.concat(partes, ignore_index=True)
+        df['Fecha'] = pd.to_datetime(df['Fecha'])
+        return df.sort_values(['Fecha', 'Jugador'], kind='stable').reset_index(drop=True)
+
+    # ============================================================================
+    # CHECKPOINT DEL SCRAPER
+    # ============================================================================
+    # data/checkpoint/estado.json           → {'creado', 'equipos': {equipo: contadores},
+    #                                          'proximos': {equipo: epoch del próximo partido al guardarlo}}
+    # data/checkpoint/stats_<equipo>.parquet
+    # data/checkpoint/lesionados_<equipo>.parquet
+
+    def _ruta_checkpoint(self, tipo: str, equipo: str) -> str:
+        return os.path.join(self.CHECKPOINT_DIR, f"{tipo}_{_slug_equipo(equipo)}.parquet")
+
+    def _leer_estado_checkpoint(self) -> dict:
+        if not os.path.exists(self.CHECKPOINT_ESTADO):
+            return None
+        try:
+            with open(self.CHECKPOINT_ESTADO, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def guardar_checkpoint_equipo(self, equipo: str, contadores: dict,
+                                  tabla_stats: pa.Table, df_lesionados: pd.DataFrame = None,
+                                  proximo: float = None):
+        """
+        Persiste un equipo terminado; el estado se escribe al final (tmp + rename).
+        `proximo`: epoch de su próximo partido (o el que está en curso) según el
+        calendario del run; en cuanto empieza, el checkpoint del equipo caduca.
+        """
+        os.makedirs(self.CHECKPOINT_DIR, exist_ok=True)
+
+        if tabla_stats is not None and tabla_stats.num_rows:
+            _escribir_atomico(self._ruta_checkpoint('stats', equipo),
+                              lambda tmp: pq.write_table(tabla_stats, tmp))
+        if df_lesionados is not None and not df_lesionados.empty:
+            _guardar_parquet(df_lesionados, self._ruta_checkpoint('lesionados', equipo))
+
+        estado = self._leer_estado_checkpoint() or {
+            'creado': datetime.now().isoformat(), 'equipos': {}
+        }
+        estado['equipos'][equipo] = contadores
+        estado.setdefault('proximos', {})[equipo] = proximo
+        _guardar_json(estado, self.CHECKPOINT_ESTADO)
+
+    def cargar_checkpoint(self, max_horas: float = 24, ahora: float = None) -> dict:
+        """
+        Checkpoint de un run interrumpido o None si no hay (o es más viejo que max_horas).
+        {'creado', 'equipos': {equipo: contadores}, 'stats': {equipo: pa.Table}, 'lesionados': {equipo: df}}
+        Los equipos que han jugado desde que se guardaron (su próximo partido ya
+        empezó) se descartan: hay box scores nuevos y se vuelven a scrapear.
+        """
+        estado = self._leer_estado_checkpoint()
+        if not estado or not estado.get('equipos'):
+            return None
+
+        edad_horas = (datetime.now() - datetime.fromisoformat(estado['creado'])).total_seconds() / 3600
+        if edad_horas > max_horas:
+            print(f"⚠️ Checkpoint de hace {edad_horas:.1f}h descartado")
+            self.borrar_checkpoint()
+            return None
+
+        ahora = ahora or time.time()
+        proximos = estado.get('proximos', {})
+        caducados = [e for e in estado['equipos'] if proximos.get(e) is not None and proximos[e] <= ahora]
+        if caducados:
+            print(f"⚠️ Checkpoint: {', '.join(caducados)} han jugado desde entonces, se repiten")
+            for equipo in caducados:
+                del estado['equipos'][equipo]
+                del proximos[equipo]
+                for tipo in ('stats', 'lesionados'):
+                    ruta = self._ruta_checkpoint(tipo, equipo)
+                    if os.path.exists(ruta):
+                        os.remove(ruta)
+            if not estado['equipos']:
+                self.borrar_checkpoint()
+                return None
+            _guardar_json(estado, self.CHECKPOINT_ESTADO)
+
+        ckpt = {'creado': estado['creado'], 'equipos': estado['equipos'], 'stats': {}, 'lesionados': {}}
+        for equipo in estado['equipos']:
+            ruta = self._ruta_checkpoint('stats', equipo)
+            if os.path.exists(ruta):
+                ckpt['stats'][equipo] = pq.read_table(ruta)   # va directo al stream, sin pandas
+            ruta = self._ruta_checkpoint('lesionados', equipo)
+            if os.path.exists(ruta):
+                ckpt['lesionados'][equipo] = pd.read_parquet(ruta)
+        return ckpt
+
+    def borrar_checkpoint(self):
+        if os.path.exists(self.CHECKPOINT_DIR):
+            shutil.rmtree(self.CHECKPOINT_DIR)
+
+    # Ficheros que lee la app (rutas relativas a data/ = sufijo de la URL raw)
+    PUBLICADOS = ('stats_latest.parquet', 'deltas/manifest.json', 'lesionados_latest.parquet',
+                  'calendario_latest.parquet', 'stats/manifest.json', 'archivo/manifest.json')
+
+    def manifiesto_datos(self) -> dict:
+        """
+        {'version', 'archivos': {nombre: huella, bytes, filas, esquema}} de
+        los ficheros publicados. huella = sha1 del contenido; esquema = huella
+        del schema parquet (columnas y tipos). La app solo recarga un fichero
+        cuando cambia su huella.
+        """
+        archivos = {}
+        for nombre in self.PUBLICADOS:
+            ruta = os.path.join(self.DATA_DIR, nombre)
+            if not os.path.exists(ruta):
+                continue
+            with open(ruta, 'rb') as f:
+                huella = hashlib.sha1(f.read()).hexdigest()[:16]
+            entrada = {'huella': huella, 'bytes': os.path.getsize(ruta)}
+            if nombre.endswith('.parquet'):
+                info = pq.read_metadata(ruta)
+                esquema = info.schema.to_arrow_schema().remove_metadata()
+                entrada['filas'] = info.num_rows
+                entrada['esquema'] = hashlib.sha1(str(esquema).encode('utf-8')).hexdigest()[:8]
+            archivos[nombre] = entrada
+
+        version = hashlib.sha1(
+            '|'.join(f"{n}:{a['huella']}" for n, a in sorted(archivos.items())).encode('utf-8')
+        ).hexdigest()[:16]
+        return {'version': version, 'archivos': archivos}
+
+    def actualizar_manifiesto_datos(self):
+        """Recalcula metadata['datos'] tras tocar data/ fuera de un run (p.ej. compactar)"""
+        with _escritura_lock:
+            if not os.path.exists(self.METADATA_FILE):
+                return
+            metadata = self.cargar_metadata(local=True)
+            metadata['datos'] = self.manifiesto_datos()
+            _guardar_json(metadata, self.METADATA_FILE)
 
     def actualizar_metadata(self, stats: dict):
         metadata = {
@@ -231,12 +1517,153 @@ class DataManager:
             'total_registros': stats.get('total_registros', 0),
             'equipos_procesados': stats.get('equipos', 0),
             'duracion_minutos': stats.get('duracion_minutos', 0),
-            'errores': stats.get('errores', 0)
+            'errores': stats.get('errores', 0),
+            'modo': stats.get('modo', 'secuencial')
         }
-        with open(self.METADATA_FILE, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        if stats.get('telemetria'):
+            metadata['telemetria'] = stats['telemetria']
+        if stats.get('plan'):
+            metadata['plan'] = stats['plan']
+        if self.shard:
+            # Lo que unir_shards() necesita para consolidar este worker
+            metadata.update(
+                shard=f"{self.shard[0]}/{self.shard[1]}",
+                equipos_asignados=stats.get('equipos_asignados', []),
+                incremental=stats.get('incremental', True),
+                timeout=stats.get('timeout', False),
+            )
+        if stats.get('shards'):
+            metadata['shards'] = stats['shards']
+        with _escritura_lock:
+            if not self.shard:
+                # Lo último del run: los ficheros de data/ ya están escritos
+                metadata['datos'] = self.manifiesto_datos()
+            _guardar_json(metadata, self._salida(self.METADATA_FILE))
         print(f"✅ Metadata actualizada")
 
+    # ============================================================================
+    # SHARDS
+    # ============================================================================
+    # data/shards/<i>-de-<n>/metadata.json            → resumen del worker
+    # data/shards/<i>-de-<n>/stats_nuevos/            → stats nuevas del worker (partes de EscritorParquet)
+    # data/shards/<i>-de-<n>/lesionados_latest.parquet
+    # data/shards/<i>-de-<n>/calendario_latest.parquet → solo sus equipos
+    # data/shards/<i>-de-<n>/scraper_metrics.parquet
+    # data/shards/<i>-de-<n>/checkpoint/               → si el worker se cortó
+
+    def unir_shards(self) -> dict:
+        """
+        Consolida las salidas de todos los shards en stats_latest,
+        lesionados_latest, calendario_latest, scraper_metrics y metadata.json.
+        Las salidas consumidas se borran; el checkpoint de un shard cortado por
+        timeout se queda para que su próximo run reanude. Retorna la metadata escrita o None si
+        no hay shards que unir. Solo con un DataManager local (nube=False).
+        """
+        from telemetria import unir_resumenes
+
+        if self.is_cloud:
+            raise RuntimeError("unir_shards() reescribe data/: necesita DataManager(nube=False)")
+
+        directorios = []
+        if os.path.isdir(self.SHARDS_DIR):
+            directorios = sorted(
+                os.path.join(self.SHARDS_DIR, d) for d in os.listdir(self.SHARDS_DIR)
+                if os.path.exists(os.path.join(self.SHARDS_DIR, d, 'metadata.json'))
+            )
+        if not directorios:
+            print("⚠️ No hay shards que unir.")
+            return None
+
+        resumenes = []
+        for d in directorios:
+            with open(os.path.join(d, 'metadata.json'), 'r') as f:
+                resumenes.append(json.load(f))
+        print(f"🧩 Uniendo {len(directorios)} shard(s): {', '.join(r['shard'] for r in resumenes)}")
+
+        def parquets(nombre: str) -> list:
+            return [os.path.join(d, nombre) for d in directorios if os.path.exists(os.path.join(d, nombre))]
+
+        # 1. Stats: las partes de cada shard y el mismo consolidado que un run normal
+        escritor = self.abrir_stats_streaming()
+        for d in directorios:
+            for ruta in EscritorParquet.partes_de(os.path.join(d, os.path.basename(self.STATS_NUEVOS_DIR))):
+                escritor.escribir(pq.read_table(ruta))
+        if escritor.cerrar():
+            combinar = any(r.get('incremental', True) for r in resumenes)
+            total_registros = self.guardar_stats_streaming(escritor, combinar=combinar)
+        else:
+            escritor.borrar()
+            total_registros = len(self._stats_publicadas())
+
+        # 2. Lesionados de los equipos de todos los shards
+        lesionados = [pd.read_parquet(r) for r in parquets(os.path.basename(self.LESIONADOS_FILE))]
+        if lesionados:
+            self.guardar_lesionados(pd.concat(lesionados, ignore_index=True))
+
+        # 3. Calendario: cada shard aporta sus equipos; el resto, el guardado
+        calendarios = []
+        for d, resumen in zip(directorios, resumenes):
+            ruta = os.path.join(d, os.path.basename(self.CALENDARIO_FILE))
+            if os.path.exists(ruta):
+                df_cal = pd.read_parquet(ruta)
+                calendarios.append(df_cal[df_cal['Equipo'].isin(resumen['equipos_asignados'])])
+        if calendarios:
+            df_cal = pd.concat(calendarios, ignore_index=True)
+            # El guardado en data/: es el fichero que este mismo proceso reescribe
+            anterior = self._leer_local(self.CALENDARIO_FILE)
+            if not anterior.empty:
+                anterior = anterior[~anterior['Equipo'].isin(df_cal['Equipo'])]
+                df_cal = pd.concat([anterior, df_cal], ignore_index=True)
+            self.guardar_calendario(df_cal)
+
+        # 4. Métricas al histórico
+        metricas = [pd.read_parquet(r) for r in parquets(os.path.basename(self.METRICAS_FILE))]
+        if metricas:
+            self.guardar_metricas(pd.concat(metricas, ignore_index=True))
+
+        # 5. Metadata: totales + un bloque por shard (el planificador de cada
+        #    shard lee el suyo en el próximo run)
+        shards = {
+            r['shard']: {
+                'equipos_asignados': r['equipos_asignados'],
+                'equipos_procesados': r.get('equipos_procesados', 0),
+                'duracion_minutos': r.get('duracion_minutos', 0),
+                'timeout': r.get('timeout', False),
+                'modo': r.get('modo'),
+                'telemetria': {k: v for k, v in r.get('telemetria', {}).items()
+                               if k in ('segundos', 'peticiones', 'peticiones_por_segundo', 'reintentos', 'errores')},
+                'plan': r.get('plan'),
+            }
+            for r in resumenes
+        }
+        self.actualizar_metadata({
+            'total_jugadores': sum(r.get('total_jugadores', 0) for r in resumenes),
+            'total_registros': total_registros,
+            'equipos': sum(r.get('equipos_procesados', 0) for r in resumenes),
+            'errores': sum(r.get('errores', 0) for r in resumenes),
+            'duracion_minutos': max(r.get('duracion_minutos', 0) for r in resumenes),
+            'modo': resumenes[0].get('modo', 'async'),
+            'telemetria': unir_resumenes([r['telemetria'] for r in resumenes if r.get('telemetria')]),
+            'shards': shards,
+        })
+
+        # 6. Salidas consumidas fuera. El checkpoint solo se queda si el shard
+        #    se cortó: en Actions el del run anterior puede venir en el checkout
+        for d, resumen in zip(directorios, resumenes):
+            for nombre in os.listdir(d):
+                ruta = os.path.join(d, nombre)
+                if nombre == os.path.basename(self.STATS_NUEVOS_DIR):
+                    shutil.rmtree(ruta)
+                elif nombre != os.path.basename(self.CHECKPOINT_DIR):
+                    os.remove(ruta)
+                elif not resumen.get('timeout'):
+                    shutil.rmtree(ruta)
+            if not os.listdir(d):
+                os.rmdir(d)
+        if not os.listdir(self.SHARDS_DIR):
+            os.rmdir(self.SHARDS_DIR)
+        return self.cargar_metadata(local=True)
+
 
 # ============================================================================
 # TEST RÁPIDO
@@ -0,0 +1,80 @@
+# indice_stats.py
+# Índice en memoria sobre el frame de stats
+#
+# Ordena una sola vez por (Equipo, Jugador, Fecha) y guarda el rango de filas
+# [inicio, fin) de cada equipo y de cada (equipo, jugador). Un equipo o un
+# jugador pasa a ser un slice posicional: sin comparar strings fila a fila ni
+# copiar el frame en cada consulta. Los rangos se sacan de los códigos
+# categóricos de Equipo/Jugador; las columnas del frame siguen siendo texto
+# (un groupby('Jugador') sobre una categórica devolvería también los jugadores
+# de los demás equipos con observed=False).
+#
+# DataManager.indice_stats() construye uno por versión de los datos; la app
+# construye otro sobre los equipos cargados y se lo pasa a ml_predictor.
+
+import numpy as np
+import pandas as pd
+
+
+class IndiceStats:
+    def __init__(self, df: pd.DataFrame, version: str = None):
+        self.version = version
+        self._equipos = {}       # equipo → (inicio, fin)
+        self._rangos = {}        # (equipo, jugador) → (inicio, fin)
+        self._jugadores = {}     # jugador → [equipo, ...]
+
+        if df is None or df.empty or not {'Equipo', 'Jugador'} <= set(df.columns):
+            self.df = pd.DataFrame() if df is None else df.iloc[0:0]
+            return
+
+        equipos = pd.Categorical(df['Equipo'])
+        jugadores = pd.Categorical(df['Jugador'])
+        claves = [equipos.codes, jugadores.codes]
+        if 'Fecha' in df.columns:
+            claves.append(pd.to_datetime(df['Fecha']).to_numpy())
+        orden = np.lexsort(claves[::-1])   # lexsort: la última clave manda
+
+        self.df = df.iloc[orden].reset_index(drop=True)
+        cod_eq = equipos.codes[orden]
+        cod_jug = jugadores.codes[orden]
+
+        cortes = np.flatnonzero((cod_eq[1:] != cod_eq[:-1]) | (cod_jug[1:] != cod_jug[:-1])) + 1
+        inicios = np.concatenate(([0], cortes))
+        fines = np.concatenate((cortes, [len(self.df)]))
+        for inicio, fin in zip(inicios.tolist(), fines.tolist()):
+            equipo = equipos.categories[cod_eq[inicio]]
+            jugador = jugadores.categories[cod_jug[inicio]]
+            self._rangos[(equipo, jugador)] = (inicio, fin)
+            self._jugadores.setdefault(jugador, []).append(equipo)
+            desde = self._equipos.get(equipo, (inicio, fin))[0]
+            self._equipos[equipo] = (desde, fin)
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def equipos(self) -> list:
+        return list(self._equipos)
+
+    def jugadores(self, equipo: str = None) -> list:
+        if equipo is None:
+            return list(self._jugadores)
+        return [j for (e, j) in self._rangos if e == equipo]
+
+    def equipo(self, nombre: str) -> pd.DataFrame:
+        """Filas del equipo (por Jugador y Fecha). Slice del frame: no modificar sin .copy()"""
+        inicio, fin = self._equipos.get(nombre, (0, 0))
+        return self.df.iloc[inicio:fin]
+
+    def jugador(self, nombre: str, equipo: str = None) -> pd.DataFrame:
+        """
+        Filas del jugador ordenadas por Fecha. Slice del frame salvo que el
+        jugador aparezca en varios equipos y no se indique `equipo`.
+        """
+        equipos = [equipo] if equipo is not None else self._jugadores.get(nombre, [])
+        rangos = [self._rangos[(e, nombre)] for e in equipos if (e, nombre) in self._rangos]
+        if not rangos:
+            return self.df.iloc[0:0]
+        if len(rangos) == 1:
+            return self.df.iloc[rangos[0][0]:rangos[0][1]]
+        partes = pd.concat([self.df.iloc[i:f] for i, f in rangos])
+        return partes.sort_values('Fecha', kind='stable') if 'Fecha' in partes.columns else partes
@@ -0,0 +1,69 @@
+# limitador.py
+# Rate limiting adaptativo para SofaScore (AIMD + backoff exponencial con jitter)
+#
+#   200 rápido          → tasa += paso (hasta tasa_max)
+#   200 lento           → tasa se mantiene
+#   429/403/5xx/timeout → tasa /= 2 (hasta tasa_min) y la petición se reintenta
+#                         tras backoff exponencial con jitter (o Retry-After)
+#
+# Lo usan MotorAsync (ajusta el token bucket de cada host) y ClienteSofaScore
+# (espaciado entre peticiones en modo secuencial).
+
+import random
+
+STATUS_REINTENTABLES = {403, 429, 500, 502, 503, 504}
+
+
+class ErrorReintentable(Exception):
+    """Respuesta 429/403/5xx: el upstream pide frenar."""
+
+    def __init__(self, status: int, url: str, retry_after: float = None):
+        super().__init__(f"HTTP {status} en {url}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def retry_after(headers) -> float:
+    """Segundos de la cabecera Retry-After (solo formato numérico) o None."""
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class LimitadorAdaptativo:
+    def __init__(self, tasa_inicial: float = 8.0, tasa_min: float = 0.5, tasa_max: float = 20.0,
+                 paso: float = 0.25, latencia_objetivo: float = 1.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, reintentos: int = 4):
+        self.tasa = tasa_inicial
+        self.tasa_min = tasa_min
+        self.tasa_max = tasa_max
+        self.paso = paso
+        self.latencia_objetivo = latencia_objetivo
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.reintentos = reintentos
+        # Contadores
+        self.exitos = 0
+        self.frenazos = 0
+
+    @property
+    def intervalo(self) -> float:
+        """Separación mínima entre peticiones (s) a la tasa actual"""
+        return 1.0 / self.tasa
+
+    def exito(self, latencia: float):
+        self.exitos += 1
+        if latencia <= self.latencia_objetivo:
+            self.tasa = min(self.tasa_max, self.tasa + self.paso)
+
+    def fallo(self):
+        self.frenazos += 1
+        self.tasa = max(self.tasa_min, self.tasa / 2)
+
+    def backoff(self, intento: int, retry_after: float = None) -> float:
+        """Espera antes del reintento `intento` (0, 1, 2...)"""
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        espera = min(self.backoff_max, self.backoff_base * 2 ** intento)
+        return espera * random.uniform(0.5, 1.5)
@@ -1,10 +1,13 @@
 import pandas as pd
-import time
-import random
 import numpy as np
-from curl_cffi import requests
 from datetime import datetime, timedelta
 import pytz
+import threading
+from array import array
+
+import pyarrow as pa
+
+from cliente_sofascore import obtener_cliente, SOFASCORE_API, HEADERS_SCRAPING
 
 CONFIG = {
     'TIMEOUT_SCRAPING': 20,
@@ -21,21 +24,67 @@ def obtener_fecha_panama():
 # PRÓXIMO PARTIDO
 # ============================================================================
 
-def obtener_proximo_partido(team_name: str) -> dict:
+RESULTADO_SIN_PARTIDO = {
+    "hay_juego": False,
+    "rival": None,
+    "rival_sofascore_id": None,
+    "localia": None,
+    "fecha": None,
+    "event_id": None
+}
+
+
+def _texto_fecha(ts: int) -> str:
+    """'Hoy 19:30' / 'Mañana 19:30' / 'En curso' / '12/04 19:30' en hora de Panamá."""
+    fecha_utc = datetime.utcfromtimestamp(ts)
+    fecha_panama = fecha_utc - timedelta(hours=CONFIG['HORAS_OFFSET_PANAMA'])
+    ahora_panama = datetime.utcnow() - timedelta(hours=CONFIG['HORAS_OFFSET_PANAMA'])
+
+    dias_diff = (fecha_panama.date() - ahora_panama.date()).days
+    if dias_diff == 0:
+        return f"Hoy {fecha_panama.strftime('%H:%M')}"
+    elif dias_diff == 1:
+        return f"Mañana {fecha_panama.strftime('%H:%M')}"
+    elif dias_diff < 0:
+        return "En curso"
+    return fecha_panama.strftime('%d/%m %H:%M')
+
+
+def _partido_desde_evento(ev: dict, team_id: int) -> dict:
+    """Rival, localía e ids de un evento de events/next, desde el punto de vista de team_id."""
+    home_id = ev.get('homeTeam', {}).get('id')
+    es_local = (home_id == team_id)
+
+    rival_key = 'awayTeam' if es_local else 'homeTeam'
+    rival_info = ev.get(rival_key, {})
+    rival_nombre = rival_info.get('name', 'Desconocido')
+
+    return {
+        "rival": _mapear_nombre_equipo(rival_nombre),
+        "rival_display": rival_nombre,
+        "rival_sofascore_id": rival_info.get('id'),
+        "localia": "Local" if es_local else "Visitante",
+        "timestamp": ev.get('startTimestamp', 0),
+        "event_id": ev.get('id')
+    }
+
+
+def _eventos_nba(data: dict) -> list:
+    return [
+        ev for ev in data.get('events', [])
+        if ev.get('tournament', {}).get('name') == 'NBA'
+    ]
+
+
+def obtener_proximo_partido(team_name: str, cliente=None) -> dict:
     """
     Obtiene el próximo partido del equipo desde SofaScore.
     Más confiable que nba_api en Streamlit Cloud.
+    cliente: ClienteSofaScore compartido (por defecto, el del proceso).
     """
     from config_nba import TEAM_IDS
 
-    resultado_vacio = {
-        "hay_juego": False,
-        "rival": None,
-        "rival_sofascore_id": None,
-        "localia": None,
-        "fecha": None,
-        "event_id": None
-    }
+    resultado_vacio = dict(RESULTADO_SIN_PARTIDO)
 
     team_id = TEAM_IDS.get(team_name)
     if not team_id:
@@ -48,55 +97,23 @@ def obtener_proximo_partido(team_name: str) -> dict:
     }
 
     try:
-        session = requests.Session()
-        url = f"https://api.sofascore.com/api/v1/team/{team_id}/events/next/0"
-        response = session.get(url, headers=headers, impersonate="chrome120", timeout=10)
-        data = response.json()
-
-        eventos = data.get('events', [])
-        nba_eventos = [
-            ev for ev in eventos
-            if ev.get('tournament', {}).get('name') == 'NBA'
-        ]
+        cliente = cliente or obtener_cliente()
+        url = f"{SOFASCORE_API}/team/{team_id}/events/next/0"
+        data = cliente.get_json(url, headers, timeout=10)
 
+        nba_eventos = _eventos_nba(data)
         if not nba_eventos:
             return resultado_vacio
 
-        ev = nba_eventos[0]
-
-        home_id = ev.get('homeTeam', {}).get('id')
-        es_local = (home_id == team_id)
-
-        rival_key = 'awayTeam' if es_local else 'homeTeam'
-        rival_info = ev.get(rival_key, {})
-        rival_nombre = rival_info.get('name', 'Desconocido')
-        rival_sofascore_id = rival_info.get('id')
-
-        rival_nombre_db = _mapear_nombre_equipo(rival_nombre)
-
-        ts = ev.get('startTimestamp', 0)
-        fecha_utc = datetime.utcfromtimestamp(ts)
-        fecha_panama = fecha_utc - timedelta(hours=CONFIG['HORAS_OFFSET_PANAMA'])
-        ahora_panama = datetime.utcnow() - timedelta(hours=CONFIG['HORAS_OFFSET_PANAMA'])
-
-        dias_diff = (fecha_panama.date() - ahora_panama.date()).days
-        if dias_diff == 0:
-            fecha_texto = f"Hoy {fecha_panama.strftime('%H:%M')}"
-        elif dias_diff == 1:
-            fecha_texto = f"Mañana {fecha_panama.strftime('%H:%M')}"
-        elif dias_diff < 0:
-            fecha_texto = "En curso"
-        else:
-            fecha_texto = fecha_panama.strftime('%d/%m %H:%M')
-
+        partido = _partido_desde_evento(nba_eventos[0], team_id)
         return {
             "hay_juego": True,
-            "rival": rival_nombre_db,
-            "rival_display": rival_nombre,
-            "rival_sofascore_id": rival_sofascore_id,
-            "localia": "Local" if es_local else "Visitante",
-            "fecha": fecha_texto,
-            "event_id": ev.get('id')
+            "rival": partido['rival'],
+            "rival_display": partido['rival_display'],
+            "rival_sofascore_id": partido['rival_sofascore_id'],
+            "localia": partido['localia'],
+            "fecha": _texto_fecha(partido['timestamp']),
+            "event_id": partido['event_id']
         }
 
     except Exception as e:
@@ -148,26 +165,35 @@ def _mapear_nombre_equipo(nombre_sofascore: str) -> str:
 # ANÁLISIS DEFENSIVO DEL RIVAL
 # ============================================================================
 
-def calcular_stats_defensivas_rival(df_all: pd.DataFrame, equipo_rival: str, metrica: str = 'Puntos') -> dict:
+def calcular_stats_defensivas_rival(df_all: pd.DataFrame, equipo_rival: str, metrica: str = 'Puntos',
+                                    consultas=None) -> dict:
     """
     Calcula estadísticas del rival como referencia de su nivel.
+    Con `consultas` (ConsultasStats) las agregaciones se hacen en SQL y `df_all` no se usa.
     """
-    df_rival = df_all[df_all['Equipo'] == equipo_rival].copy()
-
-    if df_rival.empty:
+    if consultas is not None:
+        produccion = consultas.produccion_equipo(equipo_rival, metrica)
+    else:
+        df_rival = df_all[df_all['Equipo'] == equipo_rival]
+        produccion = None
+        if not df_rival.empty:
+            fechas = pd.to_datetime(df_rival['Fecha'])
+            produccion = {
+                'promedios': df_rival.groupby('Jugador')[metrica].mean(),
+                'partidos': df_rival['Timestamp'].nunique(),
+                'dias': (fechas.max() - fechas.min()).days + 1,
+            }
+
+    if produccion is None:
         return {
             'disponible': False,
             'mensaje': f'Sin datos del rival ({equipo_rival})'
         }
 
-    promedio_rival = df_rival.groupby('Jugador')[metrica].mean()
+    promedio_rival = produccion['promedios']
     total_equipo = promedio_rival.sum()
     top_jugadores = promedio_rival.nlargest(3)
-
-    fechas = pd.to_datetime(df_rival['Fecha'])
-    dias_rango = (fechas.max() - fechas.min()).days + 1
-    partidos_totales = df_rival['Timestamp'].nunique()
-    pace_aprox = round(partidos_totales / max(dias_rango, 1) * 7, 1)
+    pace_aprox = round(produccion['partidos'] / max(produccion['dias'], 1) * 7, 1)
 
     return {
         'disponible': True,
@@ -198,10 +224,135 @@ def _clasificar_nivel(total: float, metrica: str) -> str:
 # SCRAPER DE JUGADORES — con campos extendidos del mismo JSON
 # ============================================================================
 
-def scrapear_jugador(player_id, nombre_jugador, equipo_sel, cantidad=7):
+def _filtrar_eventos_nba(data: dict, cantidad: int) -> list:
+    """Últimos `cantidad` eventos NBA de la respuesta de events/last (más reciente primero)."""
+    eventos_todos = data.get('events', [])[::-1]
+    return [ev for ev in eventos_todos if ev.get('tournament', {}).get('name') == 'NBA'][:cantidad]
+
+
+# Esquema final de stats_latest.parquet (orden de columnas incluido)
+ESQUEMA_STATS = pa.schema([
+    ('Jugador', pa.string()), ('Equipo', pa.string()), ('Posicion', pa.string()),
+    ('Altura', pa.int64()), ('Fecha', pa.timestamp('ns')), ('Localia', pa.string()),
+    ('Timestamp', pa.int64()),
+    ('Puntos', pa.int64()), ('Rebotes', pa.int64()), ('Asistencias', pa.int64()),
+    ('Minutos', pa.float64()), ('Tiros', pa.int64()), ('Eficiencia', pa.float64()),
+    ('FG_Pct', pa.float64()), ('3P_Pct', pa.float64()), ('Triples', pa.int64()),
+    ('Robos', pa.int64()), ('Tapones', pa.int64()), ('Perdidas', pa.int64()),
+    ('PlusMinus', pa.int64()), ('Reb_Off', pa.int64()), ('Reb_Def', pa.int64()),
+    ('FT_Pct', pa.float64()),
+])
+
+# Contadores que pasan tal cual del JSON de statistics
+CAMPOS_DIRECTOS = [
+    ('Rebotes', 'rebounds'), ('Asistencias', 'assists'), ('Robos', 'steals'),
+    ('Tapones', 'blocks'), ('Perdidas', 'turnovers'), ('PlusMinus', 'plusMinus'),
+    ('Reb_Off', 'offensiveRebounds'), ('Reb_Def', 'defensiveRebounds'),
+]
+
+
+class AcumuladorStats:
+    """
+    Filas de estadísticas guardadas por columnas (array('q') / array('d') /
+    list de str) que se convierten de una vez en una tabla Arrow con
+    ESQUEMA_STATS: sin dict ni pd.to_datetime por partido y sin un DataFrame
+    por jugador que luego haya que concatenar. Fecha se calcula vectorizada
+    desde Timestamp al construir la tabla. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columnas = {}
+        for campo in ESQUEMA_STATS:
+            if campo.name == 'Fecha':
+                continue
+            if pa.types.is_string(campo.type):
+                self._columnas[campo.name] = []
+            else:
+                self._columnas[campo.name] = array('q' if pa.types.is_integer(campo.type) else 'd')
+        self._tabla = None
+
+    def __len__(self) -> int:
+        return len(self._columnas['Timestamp'])
+
+    def agregar(self, ev: dict, s: dict, nombre_jugador: str, equipo_sel: str,
+                posicion: str, altura) -> bool:
+        """
+        Añade el JSON de statistics de un evento como una fila.
+        Retorna False (y no añade nada) si el jugador no disputó minutos.
+        """
+        if not s or s.get('secondsPlayed', 0) <= 0 or ev.get('startTimestamp') is None:
+            return False
+
+        es_local = equipo_sel in ev.get('homeTeam', {}).get('name', '')
+
+        # ── Campos base ───────────────────────────────────────────────────────
+        puntos      = s.get('points', 0)
+        tiros       = s.get('fieldGoalsAttempted', 0)
+        tiros_e     = s.get('fieldGoalsMade', 0)
+        triples_int = s.get('threePointersAttempted', 0)
+        triples_e   = s.get('threePointersMade', 0)
+        tl_int      = s.get('freeThrowsAttempted', 0)
+        tl_e        = s.get('freeThrowsMade', 0)
+
+        with self._lock:
+            c = self._columnas
+            # Identificación
+            c['Jugador'].append(nombre_jugador)
+            c['Equipo'].append(equipo_sel)
+            c['Posicion'].append(posicion)
+            c['Altura'].append(int(altura or 0))
+            c['Localia'].append("Local" if es_local else "Visitante")
+            c['Timestamp'].append(int(ev['startTimestamp']))
+            # Stats base
+            c['Puntos'].append(int(puntos))
+            c['Minutos'].append(round(s.get('secondsPlayed', 0) / 60, 1))
+            c['Tiros'].append(int(tiros))
+            c['Eficiencia'].append(round(puntos / tiros, 2) if tiros > 0 else 0.0)
+            # Stats nuevas — del mismo JSON
+            c['FG_Pct'].append(round(tiros_e / tiros, 3) if tiros > 0 else 0.0)
+            c['3P_Pct'].append(round(triples_e / triples_int, 3) if triples_int > 0 else 0.0)
+            c['FT_Pct'].append(round(tl_e / tl_int, 3) if tl_int > 0 else 0.0)
+            c['Triples'].append(int(triples_e))
+            for columna, clave in CAMPOS_DIRECTOS:
+                c[columna].append(int(s.get(clave, 0)))
+            self._tabla = None
+        return True
+
+    def tabla(self) -> pa.Table:
+        """Tabla Arrow con ESQUEMA_STATS (cacheada hasta el próximo agregar())"""
+        with self._lock:
+            if self._tabla is None:
+                columnas = []
+                for campo in ESQUEMA_STATS:
+                    if campo.name == 'Fecha':
+                        ts = np.array(self._columnas['Timestamp'], dtype=np.int64)
+                        ts -= CONFIG['HORAS_OFFSET_PANAMA'] * 3600
+                        columnas.append(pa.array(ts * 1_000_000_000, type=campo.type))
+                    elif pa.types.is_string(campo.type):
+                        columnas.append(pa.array(self._columnas[campo.name], type=campo.type))
+                    else:
+                        # np.array copia el buffer: el array.array sigue pudiendo crecer
+                        columnas.append(pa.array(np.array(self._columnas[campo.name]), type=campo.type))
+                self._tabla = pa.Table.from_arrays(columnas, schema=ESQUEMA_STATS)
+            return self._tabla
+
+    def to_pandas(self) -> pd.DataFrame:
+        if len(self) == 0:
+            return pd.DataFrame()
+        return self.tabla().to_pandas()
+
+
+def scrapear_jugador(player_id, nombre_jugador, equipo_sel, cantidad=7, omitir=None, cliente=None,
+                     acumulador=None):
     """
     Extrae estadísticas del jugador desde SofaScore.
 
+    omitir:     set de Timestamps ya guardados; esos partidos no se vuelven a pedir.
+    cliente:    ClienteSofaScore compartido (por defecto, el del proceso).
+    acumulador: AcumuladorStats donde añadir las filas (scraper). Con él se
+                retorna el número de filas añadidas; sin él, un DataFrame.
+
     Campos extraídos del mismo endpoint (sin llamadas extra):
         Base:    Puntos, Rebotes, Asistencias, Minutos, Tiros, Eficiencia, Localia
         Nuevos:  FG_Pct, 3P_Pct, Triples, Robos, Tapones, Perdidas,
@@ -209,102 +360,69 @@ def scrapear_jugador(player_id, nombre_jugador, equipo_sel, cantidad=7):
     """
     from config_nba import JUGADORES_DB
 
-    lista_stats = []
-    scraper = requests.Session()
+    propio = acumulador is None
+    if propio:
+        acumulador = AcumuladorStats()
+    filas = 0
+    cliente = cliente or obtener_cliente()
 
     info_jugador = JUGADORES_DB.get(equipo_sel, {}).get(nombre_jugador, {})
     altura   = info_jugador.get("alt", 0)
     posicion = info_jugador.get("pos", "N/A")
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': '*/*',
-        'Referer': 'https://www.sofascore.com/',
-    }
-
     try:
-        url_lista = f"https://api.sofascore.com/api/v1/player/{player_id}/events/last/0"
-        response = scraper.get(url_lista, headers=headers, impersonate="chrome120", timeout=CONFIG['TIMEOUT_SCRAPING'])
-        data = response.json()
-
-        eventos_todos = data.get('events', [])[::-1]
-        eventos = [ev for ev in eventos_todos if ev.get('tournament', {}).get('name') == 'NBA'][:cantidad]
+        url_lista = f"{SOFASCORE_API}/player/{player_id}/events/last/0"
+        data = cliente.get_json(url_lista, HEADERS_SCRAPING, CONFIG['TIMEOUT_SCRAPING'])
+        eventos = _filtrar_eventos_nba(data, cantidad)
+        if omitir:
+            eventos = [ev for ev in eventos if ev.get('startTimestamp') not in omitir]
 
         for ev in eventos:
-            ev_id     = ev.get('id')
-            fecha_utc = pd.to_datetime(ev.get('startTimestamp'), unit='s')
-            fecha_local = fecha_utc - pd.Timedelta(hours=CONFIG['HORAS_OFFSET_PANAMA'])
+            ev_id = ev.get('id')
+            url_stats = f"{SOFASCORE_API}/event/{ev_id}/player/{player_id}/statistics"
+            stat_data = cliente.get_json(url_stats, HEADERS_SCRAPING, CONFIG['TIMEOUT_SCRAPING'],
+                                         pausa=(CONFIG['DELAY_MIN'], CONFIG['DELAY_MAX']))
 
-            es_local = equipo_sel in ev.get('homeTeam', {}).get('name', '')
-            localia  = "Local" if es_local else "Visitante"
-
-            url_stats = f"https://api.sofascore.com/api/v1/event/{ev_id}/player/{player_id}/statistics"
-            time.sleep(random.uniform(CONFIG['DELAY_MIN'], CONFIG['DELAY_MAX']))
-
-            response_stats = scraper.get(url_stats, headers=headers, impersonate="chrome120", timeout=CONFIG['TIMEOUT_SCRAPING'])
-            stat_data = response_stats.json()
-
-            s = stat_data.get('statistics', {})
-            if not s or s.get('secondsPlayed', 0) <= 0:
-                continue
-
-            # ── Campos base ───────────────────────────────────────────────
-            puntos      = s.get('points', 0)
-            tiros       = s.get('fieldGoalsAttempted', 0)
-            tiros_e     = s.get('fieldGoalsMade', 0)
-            triples_int = s.get('threePointersAttempted', 0)
-            triples_e   = s.get('threePointersMade', 0)
-            tl_int      = s.get('freeThrowsAttempted', 0)
-            tl_e        = s.get('freeThrowsMade', 0)
-
-            eficiencia  = round(puntos / tiros, 2) if tiros > 0 else 0.0
-
-            # ── Porcentajes (mismo JSON, cero coste extra) ─────────────────
-            fg_pct = round(tiros_e   / tiros,       3) if tiros       > 0 else 0.0
-            tp_pct = round(triples_e / triples_int, 3) if triples_int > 0 else 0.0
-            ft_pct = round(tl_e      / tl_int,      3) if tl_int      > 0 else 0.0
-
-            lista_stats.append({
-                # Identificación
-                "Jugador":    nombre_jugador,
-                "Equipo":     equipo_sel,
-                "Posicion":   posicion,
-                "Altura":     altura,
-                "Fecha":      fecha_local,
-                "Localia":    localia,
-                "Timestamp":  ev.get('startTimestamp'),
-                # Stats base
-                "Puntos":     puntos,
-                "Rebotes":    s.get('rebounds', 0),
-                "Asistencias":s.get('assists', 0),
-                "Minutos":    round(s.get('secondsPlayed', 0) / 60, 1),
-                "Tiros":      tiros,
-                "Eficiencia": round(eficiencia, 2),
-                # Stats nuevas — del mismo JSON
-                "FG_Pct":     fg_pct,
-                "3P_Pct":     tp_pct,
-                "Triples":    triples_e,
-                "Robos":      s.get('steals', 0),
-                "Tapones":    s.get('blocks', 0),
-                "Perdidas":   s.get('turnovers', 0),
-                "PlusMinus":  s.get('plusMinus', 0),
-                "Reb_Off":    s.get('offensiveRebounds', 0),
-                "Reb_Def":    s.get('defensiveRebounds', 0),
-                "FT_Pct":     ft_pct,
-            })
+            if acumulador.agregar(ev, stat_data.get('statistics', {}),
+                                  nombre_jugador, equipo_sel, posicion, altura):
+                filas += 1
 
     except Exception as e:
         print(f"❌ Error en {nombre_jugador}: {str(e)}")
 
-    return pd.DataFrame(lista_stats)
+    return acumulador.to_pandas() if propio else filas
 
 
 # ============================================================================
 # LESIONADOS
 # ============================================================================
 
-def obtener_jugadores_lesionados(team_name):
-    """Obtiene jugadores lesionados desde SofaScore."""
+def _evento_y_lado(data_next: dict, team_id: int) -> tuple:
+    """(event_id, 'home'|'away') del primer evento de events/next para el equipo."""
+    ev = data_next['events'][0]
+    is_home = ev['homeTeam']['id'] == team_id
+    return ev['id'], 'home' if is_home else 'away'
+
+
+def _filas_lesionados(lineup_data: dict, team_key: str, team_name: str) -> list:
+    """Filas de lesionados a partir del JSON de lineups."""
+    filas = []
+    for player in lineup_data.get(team_key, {}).get('missingPlayers', []):
+        p_info = player.get('player', {})
+        filas.append({
+            'Jugador': p_info.get('name', 'N/A'),
+            'Razon':   player.get('reason', 'Unknown'),
+            'Equipo':  team_name
+        })
+    return filas
+
+
+def obtener_jugadores_lesionados(team_name, cliente=None, proximo=None):
+    """
+    Obtiene jugadores lesionados desde SofaScore.
+    proximo: dict de calendario_nba.proximo_partido(); si se pasa, se usa su
+             event_id/localía en lugar de pedir events/next.
+    """
     from config_nba import TEAM_IDS
 
     headers = {
@@ -318,27 +436,24 @@ def obtener_jugadores_lesionados(team_name):
 
     lesionados = []
     try:
-        session = requests.Session()
-        url_next = f"https://api.sofascore.com/api/v1/team/{team_id}/events/next/0"
-        data = session.get(url_next, headers=headers, impersonate="chrome120", timeout=10).json()
-
-        if data.get('events'):
-            event_id = data['events'][0]['id']
-            home_id  = data['events'][0]['homeTeam']['id']
-            is_home  = home_id == team_id
-            team_key = 'home' if is_home else 'away'
-
-            lineup_url  = f"https://api.sofascore.com/api/v1/event/{event_id}/lineups"
-            lineup_data = session.get(lineup_url, headers=headers, impersonate="chrome120", timeout=10).json()
-
-            missing = lineup_data.get(team_key, {}).get('missingPlayers', [])
-            for player in missing:
-                p_info = player.get('player', {})
-                lesionados.append({
-                    'Jugador': p_info.get('name', 'N/A'),
-                    'Razon':   player.get('reason', 'Unknown'),
-                    'Equipo':  team_name
-                })
+        cliente = cliente or obtener_cliente()
+
+        if proximo is not None:
+            if not proximo.get('hay_juego'):
+                return pd.DataFrame()
+            event_id = proximo['event_id']
+            team_key = 'home' if proximo['localia'] == 'Local' else 'away'
+        else:
+            url_next = f"{SOFASCORE_API}/team/{team_id}/events/next/0"
+            data = cliente.get_json(url_next, headers, timeout=10)
+            if not data.get('events'):
+                return pd.DataFrame()
+            event_id, team_key = _evento_y_lado(data, team_id)
+
+        lineup_url  = f"{SOFASCORE_API}/event/{event_id}/lineups"
+        lineup_data = cliente.get_json(lineup_url, headers, timeout=10)
+
+        lesionados = _filas_lesionados(lineup_data, team_key, team_name)
     except Exception as e:
         print(f"⚠️ Error lesionados {team_name}: {e}")
 
@@ -10,6 +10,18 @@ from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 import xgboost as xgb
 
+from indice_stats import IndiceStats
+
+
+def _filas_jugador(datos, jugador_nombre):
+    """
+    Partidos del jugador ordenados por Fecha. `datos` puede ser el DataFrame
+    del equipo (filtro completo) o un IndiceStats (slice, sin escanear).
+    """
+    if isinstance(datos, IndiceStats):
+        return datos.jugador(jugador_nombre)
+    return datos[datos['Jugador'] == jugador_nombre].sort_values('Fecha')
+
 # ============================================================================
 # NIVEL 2 — ENSEMBLE HÍBRIDO 
 # ============================================================================
@@ -252,9 +264,13 @@ def entrenar_xgboost(df_equipo, jugador_nombre, target_col='Puntos'):
     """
     Entrena XGBoost con 25 features.
     Requiere mínimo 5 partidos.
+    `df_equipo`: DataFrame del equipo o IndiceStats.
     Retorna (modelo, scaler, metricas) o (None, None, None) si no hay datos.
     """
-    df_jug = df_equipo[df_equipo['Jugador'] == jugador_nombre].copy()
+    return _entrenar_xgboost(_filas_jugador(df_equipo, jugador_nombre), target_col)
+
+
+def _entrenar_xgboost(df_jug, target_col='Puntos'):
     if len(df_jug) < 5:
         return None, None, None
 
@@ -377,16 +393,18 @@ def predecir(df_equipo, jugador_nombre, target_col='Puntos',
     Nivel 1: XGBoost con 25 features (requiere ≥5 partidos)
     Nivel 2: Ensemble RF+Regresión+WMA (requiere ≥3 partidos)
 
+    `df_equipo`: DataFrame del equipo o IndiceStats (el jugador se busca una sola vez)
+
     Retorna:
         dict con prediccion, intervalo, confianza, nivel, metricas_modelo
     """
-    df_jug = df_equipo[df_equipo['Jugador'] == jugador_nombre].copy().sort_values('Fecha')
+    df_jug = _filas_jugador(df_equipo, jugador_nombre)
 
     if df_jug.empty:
         return None
 
     # ── Intentar Nivel 1: XGBoost 
-    modelo, scaler, metricas = entrenar_xgboost(df_equipo, jugador_nombre, target_col)
+    modelo, scaler, metricas = _entrenar_xgboost(df_jug, target_col)
 
     if modelo is not None:
         prediccion, intervalo = predecir_xgboost(
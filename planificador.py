@@ -0,0 +1,226 @@
+# planificador.py
+# Orden de scraping por prioridad
+#
+# Antes los equipos se scrapeaban en el orden de JUGADORES_DB y, si saltaba el
+# timeout, siempre quedaban sin actualizar los últimos del fichero. Ahora:
+#
+#   franja 0 → juega en las próximas HORIZONTE_HOY horas (o está en curso):
+#              por hora de salto, el que juega antes va primero
+#   franja 1 → juega en las próximas HORIZONTE_PROXIMOS horas
+#   franja 2 → resto (sin partido cercano o sin calendario)
+#
+# Dentro de las franjas 1 y 2 (y en empates de la 0) va primero el equipo con
+# los datos más viejos y después el de plantilla más grande. Las franjas bajas
+# solo se scrapean con el tiempo que sobre.
+
+import math
+import time
+
+import pandas as pd
+
+from calendario_nba import MARGEN_EN_CURSO
+
+HORIZONTE_HOY = 24 * 3600
+HORIZONTE_PROXIMOS = 72 * 3600
+
+# Equipo nunca actualizado → más viejo que cualquiera
+NUNCA = float('inf')
+
+
+def _epoch(fecha: pd.Timestamp) -> float:
+    """
+    Epoch de `fecha`. Sin zona es hora local (el scraper guarda Run con
+    datetime.now().isoformat()): Timestamp.timestamp() la tomaría como UTC
+    """
+    if fecha.tzinfo is None:
+        return time.mktime(fecha.timetuple()) + fecha.microsecond / 1e6
+    return fecha.timestamp()
+
+
+def ultima_actualizacion(df_metricas: pd.DataFrame = None, df_stats: pd.DataFrame = None) -> dict:
+    """
+    {equipo: epoch} de la última vez que el equipo se actualizó.
+    Fuente: filas Tipo='equipo' de scraper_metrics (equipos completados por
+    run); si un equipo no aparece, el último partido guardado en stats.
+    """
+    ultima = {}
+    if df_stats is not None and not df_stats.empty and 'Timestamp' in df_stats.columns:
+        ultima.update(df_stats.groupby('Equipo')['Timestamp'].max().astype(float).to_dict())
+
+    if df_metricas is not None and not df_metricas.empty and 'Tipo' in df_metricas.columns:
+        df_eq = df_metricas[df_metricas['Tipo'] == 'equipo']
+        if not df_eq.empty:
+            runs = df_eq['Run'].map(lambda r: _epoch(pd.Timestamp(r)))
+            ultima.update(runs.groupby(df_eq['Nombre']).max().to_dict())
+    return ultima
+
+
+def proximos_partidos(calendario: pd.DataFrame, ahora: float = None) -> dict:
+    """{equipo: epoch} del próximo partido de cada equipo, o del que está en curso"""
+    if calendario is None or calendario.empty:
+        return {}
+    ahora = ahora or time.time()
+    vigentes = calendario[calendario['Timestamp'] >= ahora - MARGEN_EN_CURSO]
+    return {equipo: int(ts) for equipo, ts in vigentes.groupby('Equipo')['Timestamp'].min().items()}
+
+
+def prioridades(equipos: list, calendario: pd.DataFrame, ultima: dict,
+                plantillas: dict, ahora: float = None) -> list:
+    """
+    Una entrada por equipo, ordenadas de mayor a menor prioridad:
+    {'equipo', 'franja', 'proximo' (epoch o None), 'horas_sin_actualizar', 'jugadores'}
+    """
+    ahora = ahora or time.time()
+    proximos = proximos_partidos(calendario, ahora)
+
+    entradas = []
+    for equipo in equipos:
+        proximo = proximos.get(equipo)
+        if proximo is not None and proximo - ahora <= HORIZONTE_HOY:
+            franja = 0
+        elif proximo is not None and proximo - ahora <= HORIZONTE_PROXIMOS:
+            franja = 1
+        else:
+            franja = 2
+
+        desde = ultima.get(equipo)
+        entradas.append({
+            'equipo': equipo,
+            'franja': franja,
+            'proximo': int(proximo) if proximo is not None else None,
+            'horas_sin_actualizar': round((ahora - desde) / 3600, 1) if desde is not None else NUNCA,
+            'jugadores': len(plantillas.get(equipo, {})),
+        })
+
+    entradas.sort(key=lambda e: (
+        e['franja'],
+        e['proximo'] if e['franja'] == 0 else 0,
+        -e['horas_sin_actualizar'],
+        -e['jugadores'],
+    ))
+    return entradas
+
+
+# ============================================================================
+# PRESUPUESTO DEL RUN
+# ============================================================================
+# Coste estimado = peticiones estimadas × factor de corrección × segundos por
+# petición del último run del mismo modo (telemetria de metadata.json). Los
+# segundos por petición se vuelven a medir cada run; el factor corrige el
+# recuento de peticiones con real/estimado del run anterior, así el modelo se
+# autocorrige. Se elige el mayor partidos_por_jugador que cabe en el
+# presupuesto; si ni con PARTIDOS_MIN caben todos, se recortan equipos por
+# prioridad.
+
+PARTIDOS_MIN = 3
+HORAS_ENTRE_PARTIDOS = 48        # un equipo NBA juega más o menos cada dos días
+PETICIONES_FIJAS = 30            # calendario (events/next de los 30 equipos)
+FACTOR_MIN, FACTOR_MAX = 0.25, 4.0
+
+# Sin historial del modo: segundos de pared por petición a la configuración por defecto
+SEGUNDOS_POR_PETICION_DEFECTO = {'async': 0.15, 'hilos': 0.3, 'secuencial': 1.2}
+
+
+def segundos_por_peticion(metadata: dict, modo: str) -> float:
+    """Segundos de pared por petición del último run del mismo modo"""
+    metadata = metadata or {}
+    telemetria = metadata.get('telemetria') or {}
+    if metadata.get('modo') == modo and telemetria.get('peticiones', 0) >= 50:
+        return telemetria['segundos'] / telemetria['peticiones']
+    return SEGUNDOS_POR_PETICION_DEFECTO.get(modo, SEGUNDOS_POR_PETICION_DEFECTO['secuencial'])
+
+
+def factor_correccion(metadata: dict) -> float:
+    """Factor del run anterior ajustado con sus peticiones reales/estimadas (media geométrica)"""
+    plan = (metadata or {}).get('plan') or {}
+    factor = plan.get('factor', 1.0)
+    if plan.get('peticiones_estimadas') and plan.get('peticiones_reales'):
+        factor *= (plan['peticiones_reales'] / plan['peticiones_estimadas']) ** 0.5
+    return min(FACTOR_MAX, max(FACTOR_MIN, factor))
+
+
+def peticiones_equipo(entrada: dict, partidos: int, modo: str, por_evento: bool,
+                      incremental: bool) -> float:
+    """Peticiones estimadas para un equipo (entrada de prioridades())"""
+    jugadores = entrada['jugadores']
+    nuevos = partidos
+    if incremental and entrada['horas_sin_actualizar'] != NUNCA:
+        nuevos = min(partidos, max(1, math.ceil(entrada['horas_sin_actualizar'] / HORAS_ENTRE_PARTIDOS)))
+
+    if modo == 'async' and por_evento:
+        # events/last por jugador + un box score por partido (lo comparten los dos equipos)
+        return jugadores + nuevos / 2 + 1
+    # events/last + statistics por jugador y partido + lineups de lesionados
+    return jugadores * (1 + nuevos) + 1
+
+
+def planificar(entradas: list, presupuesto_s: float, seg_por_peticion: float,
+               partidos_max: int, modo: str, por_evento: bool = True,
+               incremental: bool = True, factor: float = 1.0) -> dict:
+    """
+    Partidos por jugador y equipos que caben en `presupuesto_s`.
+    `entradas` ya ordenadas por prioridad (ver prioridades()).
+    """
+    def peticiones(partidos: int, equipos: list) -> float:
+        return factor * sum(peticiones_equipo(e, partidos, modo, por_evento, incremental) for e in equipos)
+
+    presupuesto_peticiones = presupuesto_s / seg_por_peticion
+    fijas = factor * PETICIONES_FIJAS
+    partidos = max(PARTIDOS_MIN, partidos_max)
+    while partidos > PARTIDOS_MIN and fijas + peticiones(partidos, entradas) > presupuesto_peticiones:
+        partidos -= 1
+    partidos = min(partidos, partidos_max)
+
+    elegidos, estimadas = [], fijas
+    for entrada in entradas:
+        p = peticiones(partidos, [entrada])
+        if elegidos and estimadas + p > presupuesto_peticiones:
+            break
+        elegidos.append(entrada['equipo'])
+        estimadas += p
+
+    return {
+        'partidos_por_jugador': partidos,
+        'equipos': elegidos,
+        'omitidos': [e['equipo'] for e in entradas[len(elegidos):]],
+        'peticiones_estimadas': round(estimadas / factor),   # sin corregir: el factor se recalcula con esto
+        'estimado_s': estimadas * seg_por_peticion,
+        'presupuesto_s': presupuesto_s,
+        'segundos_por_peticion': seg_por_peticion,
+        'factor': factor,
+    }
+
+
+# ============================================================================
+# SHARDS
+# ============================================================================
+# `--shard i/n`: cada worker (proceso o job de la matrix de Actions) scrapea
+# un subconjunto disjunto de equipos. El reparto es determinista, así cada
+# shard reanuda su propio checkpoint y compara su plan con el de su último
+# run, y se equilibra por tamaño de plantilla, que es lo que manda en el
+# número de peticiones.
+
+def parsear_shard(texto: str) -> tuple:
+    """'2/4' → (2, 4). Índices desde 1"""
+    try:
+        indice, total = (int(x) for x in texto.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard inválido '{texto}': se espera i/n, p.ej. 2/4")
+    if total < 1 or not 1 <= indice <= total:
+        raise ValueError(f"Shard inválido '{texto}': i debe estar entre 1 y n")
+    return indice, total
+
+
+def equipos_del_shard(equipos: list, indice: int, total: int, plantillas: dict) -> list:
+    """
+    Equipos de `equipos` que tocan al shard `indice` de `total` (en el orden
+    recibido). Reparto voraz: de la plantilla más grande a la más pequeña,
+    cada equipo al shard con menos jugadores hasta el momento.
+    """
+    cargas = [0] * total
+    asignado = {}
+    for equipo in sorted(equipos, key=lambda e: (-len(plantillas.get(e, {})), e)):
+        destino = min(range(total), key=lambda k: (cargas[k], k))
+        cargas[destino] += len(plantillas.get(equipo, {}))
+        asignado[equipo] = destino
+    return [e for e in equipos if asignado[e] == indice - 1]
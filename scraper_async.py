@@ -0,0 +1,455 @@
+# scraper_async.py
+# Motor de scraping concurrente (asyncio + curl_cffi AsyncSession)
+# Concurrencia global acotada + token bucket adaptativo por host en lugar de sleeps fijos
+
+import asyncio
+import logging
+import time
+from urllib.parse import urlparse
+
+import pandas as pd
+from curl_cffi.requests import AsyncSession
+from curl_cffi.requests.exceptions import RequestException
+
+from cache_http import obtener_cache, PARA_SIEMPRE
+from calendario_nba import proximo_partido
+from cliente_sofascore import SOFASCORE_API, HEADERS_SCRAPING
+from config_nba import TEAM_IDS
+from limitador import LimitadorAdaptativo, ErrorReintentable, STATUS_REINTENTABLES, retry_after
+from logic_nba import (
+    CONFIG, AcumuladorStats, _filtrar_eventos_nba, _evento_y_lado, _filas_lesionados
+)
+
+
+class TiempoAgotado(Exception):
+    """Se alcanzó el deadline del run: la petición no se llega a enviar."""
+
+
+# ============================================================================
+# RATE LIMITER
+# ============================================================================
+
+class TokenBucket:
+    """
+    Token bucket clásico: se recargan `tasa` tokens por segundo hasta `capacidad`.
+    Cada petición consume 1 token; si no hay, espera lo justo para el siguiente.
+    Con `deadline` (epoch) no se espera más allá: lanza TiempoAgotado, así las
+    peticiones en cola no se drenan de una en una a 1/tasa tras el timeout.
+    """
+
+    def __init__(self, tasa: float, capacidad: int):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self, deadline: float = None):
+        async with self._lock:
+            while True:
+                if deadline is not None and time.time() > deadline:
+                    raise TiempoAgotado()
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.tasa
+                if deadline is not None and time.time() + espera > deadline:
+                    raise TiempoAgotado()
+                await asyncio.sleep(espera)
+
+
+# ============================================================================
+# MOTOR ASYNC
+# ============================================================================
+
+class MotorAsync:
+    """
+    Scrapea todos los equipos en paralelo con:
+        - `concurrencia` peticiones en vuelo como máximo (semáforo global)
+        - `requests_por_segundo` inicial por host (token bucket), con ráfagas de `rafaga`;
+          la tasa se adapta entre `rps_min` y `rps_max` (ver limitador.py)
+        - `deadline` (epoch) tras el cual no se inician jugadores nuevos
+        - `calendario` (calendario_nba) para resolver el próximo partido sin events/next
+        - `al_terminar_equipo(res)` se llama con cada equipo completo (checkpoint)
+        - `equipos_simultaneos` equipos en curso a la vez (en los dos modos), en el
+          orden recibido (prioridad): los equipos terminan en orden y un timeout
+          deja sin actualizar los últimos, no todos a medias
+        - `telemetria` (telemetria.Telemetria) registra cada petición y equipo
+    """
+
+    def __init__(self, concurrencia: int = 8, requests_por_segundo: float = 8.0,
+                 rafaga: int = 10, deadline: float = None, calendario: pd.DataFrame = None,
+                 al_terminar_equipo=None, equipos_simultaneos: int = 4,
+                 rps_min: float = 0.5, rps_max: float = 20.0, telemetria=None):
+        self.concurrencia = concurrencia
+        self.telemetria = telemetria
+        self.equipos_simultaneos = equipos_simultaneos
+        self.calendario = calendario
+        self.al_terminar_equipo = al_terminar_equipo
+        self.requests_por_segundo = requests_por_segundo
+        self.rps_min = rps_min
+        self.rps_max = rps_max
+        self.rafaga = rafaga
+        self.deadline = deadline
+        self.peticiones = 0
+        self.reintentos = 0
+        self.timeout_alcanzado = False
+        self._hosts = {}
+        self._semaforo = None
+
+    def _limites(self, url: str) -> tuple:
+        """(TokenBucket, LimitadorAdaptativo) del host de `url`"""
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = (
+                TokenBucket(self.requests_por_segundo, self.rafaga),
+                LimitadorAdaptativo(tasa_inicial=self.requests_por_segundo,
+                                    tasa_min=self.rps_min, tasa_max=self.rps_max)
+            )
+        return self._hosts[host]
+
+    def tasas(self) -> dict:
+        """Tasa actual (req/s) por host tras la adaptación"""
+        return {host: round(limitador.tasa, 2) for host, (_, limitador) in self._hosts.items()}
+
+    def _sin_tiempo(self) -> bool:
+        if self.deadline is not None and time.time() > self.deadline:
+            self.timeout_alcanzado = True
+        return self.timeout_alcanzado
+
+    async def _get_json(self, session, url: str, timeout: int = CONFIG['TIMEOUT_SCRAPING'],
+                        ttl: float = None) -> dict:
+        cache = obtener_cache()
+        data = cache.leer(url, ttl)
+        if data is not None:
+            if self.telemetria:
+                self.telemetria.acierto_cache(url)
+            return data
+
+        bucket, limitador = self._limites(url)
+        for intento in range(limitador.reintentos + 1):
+            if self._sin_tiempo():
+                raise TiempoAgotado(url)
+            try:
+                await bucket.adquirir(self.deadline)
+            except TiempoAgotado:
+                self.timeout_alcanzado = True
+                raise TiempoAgotado(url)
+            async with self._semaforo:
+                if self._sin_tiempo():
+                    raise TiempoAgotado(url)
+                t0 = time.perf_counter()
+                error = None
+                response = None
+                try:
+                    response = await session.get(url, headers=HEADERS_SCRAPING,
+                                                 impersonate="chrome120", timeout=timeout)
+                    if response.status_code in STATUS_REINTENTABLES:
+                        raise ErrorReintentable(response.status_code, url, retry_after(response.headers))
+                except (ErrorReintentable, RequestException) as e:
+                    error = e
+                finally:
+                    self.peticiones += 1
+                latencia = time.perf_counter() - t0
+            if self.telemetria:
+                self.telemetria.peticion(
+                    url, latencia,
+                    len(response.content) if response is not None else 0,
+                    response.status_code if response is not None else None
+                )
+
+            if error is None:
+                limitador.exito(latencia)
+                bucket.tasa = limitador.tasa
+                break
+
+            # Frenar el host entero y reencolar la petición tras el backoff
+            limitador.fallo()
+            bucket.tasa = limitador.tasa
+            bucket.tokens = min(bucket.tokens, 0.0)
+            if intento == limitador.reintentos:
+                raise error
+            self.reintentos += 1
+            if self.telemetria:
+                self.telemetria.reintento(url)
+            espera = limitador.backoff(intento, getattr(error, 'retry_after', None))
+            if self.deadline is not None and time.time() + espera > self.deadline:
+                self.timeout_alcanzado = True
+                raise TiempoAgotado(url)
+            logging.warning(f"  ↻ {error} — reintento {intento + 1} en {espera:.1f}s "
+                            f"({limitador.tasa:.1f} req/s)")
+            await asyncio.sleep(espera)
+
+        data = response.json()
+        if response.status_code == 200:
+            cache.escribir(url, data)
+        return data
+
+    @staticmethod
+    def _resultado_equipo(equipo: str) -> dict:
+        return {
+            'equipo': equipo, 'stats': AcumuladorStats(), 'lesionados': None,
+            'total_jugadores': 0, 'jugadores_con_datos': 0,
+            'jugadores_omitidos': 0, 'errores': 0, 'completo': True,
+            'inicio': time.perf_counter()
+        }
+
+    def _notificar(self, res: dict):
+        if self.al_terminar_equipo is not None:
+            self.al_terminar_equipo(res)
+
+    # ── Unidades de trabajo ──────────────────────────────────────────────────
+
+    async def _jugador(self, session, player_id, nombre: str, equipo: str,
+                       info: dict, cantidad: int, acumulador: AcumuladorStats,
+                       omitir: set = None) -> int:
+        """Partidos del jugador → `acumulador`; retorna las filas añadidas"""
+        data = await self._get_json(session, f"{SOFASCORE_API}/player/{player_id}/events/last/0")
+        eventos = _filtrar_eventos_nba(data, cantidad)
+        if omitir:
+            eventos = [ev for ev in eventos if ev.get('startTimestamp') not in omitir]
+
+        respuestas = await asyncio.gather(*[
+            self._get_json(session, f"{SOFASCORE_API}/event/{ev.get('id')}/player/{player_id}/statistics")
+            for ev in eventos
+        ])
+
+        filas = 0
+        for ev, stat_data in zip(eventos, respuestas):
+            if acumulador.agregar(ev, stat_data.get('statistics', {}), nombre, equipo,
+                                  info.get('pos', 'N/A'), info.get('alt', 0)):
+                filas += 1
+        return filas
+
+    async def _lesionados(self, session, equipo: str) -> pd.DataFrame:
+        team_id = TEAM_IDS.get(equipo)
+        if not team_id:
+            return pd.DataFrame()
+
+        proximo = proximo_partido(self.calendario, equipo)
+        if proximo is not None:
+            if not proximo['hay_juego']:
+                return pd.DataFrame()
+            event_id = proximo['event_id']
+            team_key = 'home' if proximo['localia'] == 'Local' else 'away'
+        else:
+            data = await self._get_json(session, f"{SOFASCORE_API}/team/{team_id}/events/next/0", timeout=10)
+            if not data.get('events'):
+                return pd.DataFrame()
+            event_id, team_key = _evento_y_lado(data, team_id)
+        lineup_data = await self._get_json(session, f"{SOFASCORE_API}/event/{event_id}/lineups", timeout=10)
+        return pd.DataFrame(_filas_lesionados(lineup_data, team_key, equipo))
+
+    async def _equipo(self, session, equipo: str, jugadores: dict, cantidad: int,
+                      conocidos: dict) -> dict:
+        res = self._resultado_equipo(equipo)
+
+        async def uno(nombre, info):
+            player_id = info.get('id')
+            if not player_id:
+                logging.warning(f"  ⚠️ {nombre} - Sin ID, omitiendo")
+                res['jugadores_omitidos'] += 1
+                return
+            if self._sin_tiempo():
+                res['completo'] = False
+                return
+            try:
+                omitir = conocidos.get(nombre)
+                filas = await self._jugador(session, player_id, nombre, equipo, info, cantidad,
+                                            res['stats'], omitir)
+                res['total_jugadores'] += 1
+                if filas or omitir:
+                    res['jugadores_con_datos'] += 1
+            except TiempoAgotado:
+                res['completo'] = False
+            except Exception as e:
+                logging.error(f"  ✗ {nombre}: {e}")
+                res['errores'] += 1
+
+        await asyncio.gather(*[uno(n, i) for n, i in jugadores.items()])
+        await self._cerrar_equipo(session, res, len(jugadores))
+        return res
+
+    async def _cerrar_equipo(self, session, res: dict, n_jugadores: int):
+        """Lesionados + checkpoint de un equipo cuyas stats están completas"""
+        if not res['completo']:
+            return
+        try:
+            df_les = await self._lesionados(session, res['equipo'])
+            if not df_les.empty:
+                res['lesionados'] = df_les
+        except TiempoAgotado:
+            # Las stats ya están completas: sin lesionados, pero el equipo se cierra
+            logging.warning(f"  ⚠️ Lesionados {res['equipo']}: sin tiempo, se omiten")
+        except Exception as e:
+            logging.warning(f"  ⚠️ Lesionados {res['equipo']}: {e}")
+
+        logging.info(f"  ✅ {res['equipo']}: {res['jugadores_con_datos']}/{n_jugadores} jugadores con datos")
+        res['segundos'] = time.perf_counter() - res['inicio']
+        self._notificar(res)
+
+    # ── Ingesta por evento ───────────────────────────────────────────────────
+
+    async def _equipo_ventanas(self, session, equipo: str, jugadores: dict, cantidad: int,
+                               conocidos: dict) -> tuple:
+        """
+        Fase 1 por evento: solo events/last de cada jugador.
+        Retorna (resultado del equipo, {nombre: [eventos pendientes]}).
+        """
+        res = self._resultado_equipo(equipo)
+        ventanas = {}
+
+        async def uno(nombre, info):
+            player_id = info.get('id')
+            if not player_id:
+                logging.warning(f"  ⚠️ {nombre} - Sin ID, omitiendo")
+                res['jugadores_omitidos'] += 1
+                return
+            if self._sin_tiempo():
+                res['completo'] = False
+                return
+            try:
+                data = await self._get_json(session, f"{SOFASCORE_API}/player/{player_id}/events/last/0")
+                eventos = _filtrar_eventos_nba(data, cantidad)
+                omitir = conocidos.get(nombre)
+                if omitir:
+                    eventos = [ev for ev in eventos if ev.get('startTimestamp') not in omitir]
+                ventanas[nombre] = eventos
+                res['total_jugadores'] += 1
+            except TiempoAgotado:
+                res['completo'] = False
+            except Exception as e:
+                logging.error(f"  ✗ {nombre}: {e}")
+                res['errores'] += 1
+
+        await asyncio.gather(*[uno(n, i) for n, i in jugadores.items()])
+        return res, ventanas
+
+    async def _box_score(self, session, ev_id) -> dict:
+        """{player_id: statistics} de un partido (event/{id}/lineups, los dos lados)"""
+        try:
+            # Con statistics (partido terminado) la entrada es definitiva; la
+            # alineación previa que cacheó _lesionados caduca a los 30 min
+            data = await self._get_json(session, f"{SOFASCORE_API}/event/{ev_id}/lineups",
+                                        ttl=PARA_SIEMPRE)
+        except TiempoAgotado:
+            raise
+        except Exception as e:
+            logging.error(f"  ✗ Evento {ev_id}: {e}")
+            raise
+        return {
+            p.get('player', {}).get('id'): p.get('statistics', {})
+            for lado in ('home', 'away')
+            for p in data.get(lado, {}).get('players', [])
+        }
+
+    async def _equipo_por_evento(self, session, equipo: str, jugadores: dict, cantidad: int,
+                                 conocidos: dict, box_score) -> dict:
+        """
+        events/last de los jugadores del equipo y después los box scores de su
+        ventana. `box_score(ev_id)` devuelve la tarea compartida del partido:
+        el rival que lo tenga en su ventana no lo vuelve a pedir. El equipo se
+        cierra (lesionados + checkpoint) en cuanto llegan sus box scores, sin
+        esperar a los del resto de la liga.
+        """
+        res, ventanas = await self._equipo_ventanas(session, equipo, jugadores, cantidad, conocidos)
+        ids = list({ev.get('id') for eventos in ventanas.values() for ev in eventos})
+        lineups = dict(zip(ids, await asyncio.gather(*[box_score(ev_id) for ev_id in ids],
+                                                     return_exceptions=True)))
+
+        for nombre, eventos in ventanas.items():
+            info = jugadores[nombre]
+            filas = 0
+            fallido = cortado = False
+            for ev in eventos:
+                lineup = lineups[ev.get('id')]
+                if isinstance(lineup, TiempoAgotado):
+                    cortado = True
+                elif isinstance(lineup, BaseException):
+                    fallido = True
+                elif info['id'] in lineup and res['stats'].agregar(
+                        ev, lineup[info['id']], nombre, equipo, info.get('pos', 'N/A'), info.get('alt', 0)):
+                    filas += 1
+            if filas or conocidos.get(nombre):
+                res['jugadores_con_datos'] += 1
+            if fallido:
+                res['errores'] += 1
+            if cortado:
+                res['completo'] = False
+
+        await self._cerrar_equipo(session, res, len(jugadores))
+        return res
+
+    async def _ejecutar_por_evento(self, session, equipos: dict, cantidad: int,
+                                   conocidos: dict) -> list:
+        """
+        Un box score (event/{id}/lineups) por partido único, repartido a todos
+        los jugadores de `equipos` que lo tienen en su ventana de últimos partidos.
+        Pasa de O(jugadores × partidos) peticiones a O(partidos únicos).
+        Los equipos entran de `equipos_simultaneos` en `equipos_simultaneos` en
+        el orden de `equipos`; un box score ya pedido por un equipo anterior se
+        reutiliza.
+        """
+        tareas = {}
+        sem_equipos = asyncio.Semaphore(self.equipos_simultaneos)
+
+        def box_score(ev_id):
+            if ev_id not in tareas:
+                tareas[ev_id] = asyncio.ensure_future(self._box_score(session, ev_id))
+            return tareas[ev_id]
+
+        async def equipo_acotado(equipo, jugadores):
+            async with sem_equipos:
+                return await self._equipo_por_evento(session, equipo, jugadores, cantidad,
+                                                     conocidos, box_score)
+
+        resultados = await asyncio.gather(*[
+            equipo_acotado(equipo, jugadores) for equipo, jugadores in equipos.items()
+        ])
+        logging.info(f"🎯 {len(tareas)} partidos únicos descargados")
+        return resultados
+
+    async def _ejecutar(self, equipos: dict, cantidad: int, conocidos: dict,
+                        por_evento: bool) -> list:
+        self._semaforo = asyncio.Semaphore(self.concurrencia)
+        async with AsyncSession(max_clients=self.concurrencia) as session:
+            if por_evento:
+                return await self._ejecutar_por_evento(session, equipos, cantidad, conocidos)
+            sem_equipos = asyncio.Semaphore(self.equipos_simultaneos)
+
+            async def equipo_acotado(equipo, jugadores):
+                async with sem_equipos:
+                    return await self._equipo(session, equipo, jugadores, cantidad, conocidos)
+
+            return await asyncio.gather(*[
+                equipo_acotado(equipo, jugadores) for equipo, jugadores in equipos.items()
+            ])
+
+    async def _descargar(self, urls: list, timeout: int) -> list:
+        self._semaforo = asyncio.Semaphore(self.concurrencia)
+        async with AsyncSession(max_clients=self.concurrencia) as session:
+            async def una(url):
+                try:
+                    return await self._get_json(session, url, timeout=timeout)
+                except Exception as e:
+                    logging.warning(f"  ⚠️ {url}: {e}")
+                    return None
+            return await asyncio.gather(*[una(url) for url in urls])
+
+    def descargar(self, urls: list, timeout: int = 10) -> list:
+        """GET JSON de `urls` en paralelo (mismo orden); None en las que fallen."""
+        return asyncio.run(self._descargar(urls, timeout))
+
+    def scrapear(self, equipos: dict, cantidad: int, conocidos: dict = None,
+                 por_evento: bool = True) -> list:
+        """
+        Ejecuta el scraping de `equipos` ({equipo: {jugador: info}}).
+        `conocidos` ({jugador: set(Timestamp)}) evita pedir partidos ya guardados.
+        `por_evento` descarga cada box score una sola vez (lineups) en lugar de
+        una petición de statistics por jugador y partido.
+        Retorna una lista de resultados por equipo, en el mismo orden.
+        """
+        return asyncio.run(self._ejecutar(equipos, cantidad, conocidos or {}, por_evento))
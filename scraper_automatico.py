@@ -1,11 +1,15 @@
 # scraper_automatico.py 
 import pandas as pd
+import os
 import time
 import logging
 from datetime import datetime
 from data_manager import DataManager
 from tqdm import tqdm
 import sys
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Configurar logging
 logging.basicConfig(
@@ -20,22 +24,65 @@ logging.basicConfig(
 # Importar funciones
 try:
     from config_nba import JUGADORES_DB, TEAM_IDS
-    from logic_nba import scrapear_jugador, obtener_jugadores_lesionados
+    from logic_nba import AcumuladorStats, scrapear_jugador, obtener_jugadores_lesionados
+    from scraper_async import MotorAsync
+    from cache_http import configurar_cache, obtener_cache, MODOS as MODOS_CACHE
+    from cliente_sofascore import ClienteSofaScore
+    from limitador import LimitadorAdaptativo
+    from telemetria import Telemetria
+    from planificador import (
+        ultima_actualizacion, prioridades, planificar, segundos_por_peticion, factor_correccion,
+        parsear_shard, equipos_del_shard, proximos_partidos
+    )
+    from calendario_nba import descargar_calendario, proximo_partido
 except ImportError as e:
     logging.error(f"Error de importación: {e}")
     sys.exit(1)
 
 class ScraperOptimizado:
-    def __init__(self):
-        self.dm = DataManager()
+    MODOS = ('async', 'hilos', 'secuencial')
+
+    def __init__(self, modo: str = 'async', incremental: bool = True, por_evento: bool = True,
+                 priorizar: bool = True, shard: tuple = None):
+        # shard (i, n): solo los equipos de ese shard y salidas en data/shards/ (ver --shard)
+        self.shard = shard
+        self.dm = DataManager(shard=shard, nube=False)
         # ⚡ CONFIGURACIÓN OPTIMIZADA
         self.config = {
-            'partidos_por_jugador': 10,     
+            'modo': modo,
+            'partidos_por_jugador': 10,    # máximo; el plan puede bajarlo
             'delay_jugadores': 0.10,         
             'delay_equipos': 0.50,            
-            'timeout_minutos': 120           
+            # El job de Actions muere a los 90 min (setup incluido): corte duro
+            # en timeout_minutos y plan para terminar en presupuesto_minutos
+            'timeout_minutos': 80,
+            'presupuesto_minutos': 70,
+            'planificar': True,
+            'incremental': incremental,
+            'checkpoint_horas': 24,        # checkpoint más viejo que esto se descarta
+            'priorizar': priorizar,        # equipos que juegan antes primero (planificador.py)
+            # Rate limiting adaptativo (req/s): arranca en la tasa de cada modo
+            # y se mueve entre estos límites según responda SofaScore
+            'rps_secuencial': 1.0,
+            'rps_min': 0.5,
+            'rps_max': 20.0,
+            # Modos async e hilos (en hilos se reparte entre los hilos)
+            'requests_por_segundo': 8.0,
+            # Solo modo hilos
+            'hilos': 4,
+            # Solo modo async
+            'concurrencia': 8,
+            'por_evento': por_evento
         }
         self.tiempo_inicio = None
+        self.partidos = self.config['partidos_por_jugador']
+        self.plan = None
+        self.conocidos = {}
+        self.calendario = pd.DataFrame()
+        self.proximos = {}
+        self.cliente = None
+        self.stream = None
+        self.telemetria = Telemetria()
     
     def _check_timeout(self):
         """Verifica si se excedió el timeout"""
@@ -46,121 +93,433 @@ class ScraperOptimizado:
                 return True
         return False
     
-    def scrapear_todo(self):
+    def _resultado_vacio(self) -> dict:
+        return {
+            'lesionados': [],
+            'total_jugadores': 0,
+            'jugadores_con_datos': 0,
+            'jugadores_omitidos': 0,
+            'errores': 0,
+            'equipos_procesados': 0,
+            'timeout': False
+        }
+
+    CONTADORES_EQUIPO = ('total_jugadores', 'jugadores_con_datos', 'jugadores_omitidos', 'errores')
+
+    def _guardar_progreso(self, equipo: str, contadores: dict, stats: AcumuladorStats, df_les):
+        """Checkpoint de un equipo terminado (ver DataManager.guardar_checkpoint_equipo)"""
+        try:
+            self.dm.guardar_checkpoint_equipo(equipo, contadores, stats.tabla(), df_les,
+                                              proximo=self.proximos.get(equipo))
+        except Exception as e:
+            logging.warning(f"  ⚠️ Checkpoint {equipo}: {e}")
+
+    def _volcar_stats(self, equipo: str, stats: AcumuladorStats):
+        """Stats de un equipo → su parte del stream del run (en disco, no se acumulan en memoria)"""
+        if len(stats):
+            self.stream.escribir(stats.tabla(), clave=equipo)
+
+    def _reanudar(self, r: dict, ckpt: dict):
+        """Suma al resultado los equipos ya terminados en un run anterior"""
+        for equipo, contadores in ckpt['equipos'].items():
+            for clave in self.CONTADORES_EQUIPO:
+                r[clave] += contadores.get(clave, 0)
+            r['equipos_procesados'] += 1
+            if equipo in ckpt['stats']:
+                self.stream.escribir(ckpt['stats'].pop(equipo), clave=equipo)
+            if equipo in ckpt['lesionados']:
+                r['lesionados'].append(ckpt['lesionados'][equipo])
+
+    def _sumar_equipo(self, r: dict, res: dict):
+        """Acumula en el resultado global el resultado de un equipo"""
+        self._volcar_stats(res['equipo'], res['stats'])
+        if 'segundos' in res:
+            self.telemetria.equipo(res['equipo'], res['segundos'])
+        if res['lesionados'] is not None and not res['lesionados'].empty:
+            r['lesionados'].append(res['lesionados'])
+        for clave in self.CONTADORES_EQUIPO:
+            r[clave] += res[clave]
+        if res['completo']:
+            r['equipos_procesados'] += 1
+
+    def _scrapear_equipo(self, equipo: str, cliente: ClienteSofaScore, progreso: bool = True) -> dict:
         """
-        Scraping completo optimizado para GitHub Actions
+        Jugadores + lesionados de un equipo con un cliente síncrono (modos
+        secuencial e hilos). Mismo formato que MotorAsync._resultado_equipo.
         """
-        self.tiempo_inicio = time.time()
-        inicio = datetime.now()
-        
-        logging.info("="*60)
-        logging.info(f"⚡ SCRAPING OPTIMIZADO INICIADO: {inicio}")
-        logging.info(f"📊 Configuración:")
-        logging.info(f"  - Partidos por jugador: {self.config['partidos_por_jugador']}")
-        logging.info(f"  - Timeout máximo: {self.config['timeout_minutos']} min")
-        logging.info("="*60)
-        
-        all_stats = []
-        all_lesionados = []
-        
-        total_jugadores = 0
-        jugadores_con_datos = 0
-        jugadores_omitidos = 0
-        errores = 0
-        equipos_procesados = 0
-        timeout_alcanzado = False
-        
-        equipos = list(JUGADORES_DB.keys())
-        
+        res = {clave: 0 for clave in self.CONTADORES_EQUIPO}
+        res.update(equipo=equipo, stats=AcumuladorStats(), lesionados=None, completo=False)
+        inicio = time.perf_counter()
+
+        # 1. SCRAPEAR STATS
+        jugadores = JUGADORES_DB[equipo]
+        items = jugadores.items()
+        if progreso:
+            items = tqdm(items, desc=f"  {equipo}", leave=False)
+
+        for nombre, info in items:
+            # ⏱️ CHECK TIMEOUT cada 10 jugadores
+            if res['total_jugadores'] % 10 == 0 and self._check_timeout():
+                return res
+
+            try:
+                player_id = info.get('id')
+                if not player_id:
+                    logging.warning(f"  ⚠️ {nombre} - Sin ID, omitiendo")
+                    res['jugadores_omitidos'] += 1
+                    continue
+
+                omitir = self.conocidos.get(nombre)
+                filas = scrapear_jugador(
+                    player_id,
+                    nombre,
+                    equipo,
+                    cantidad=self.partidos,
+                    omitir=omitir,
+                    cliente=cliente,
+                    acumulador=res['stats']
+                )
+
+                if filas or omitir:
+                    res['jugadores_con_datos'] += 1
+
+                res['total_jugadores'] += 1
+
+                # ⚡ Delay optimizado
+                time.sleep(self.config['delay_jugadores'])
+
+            except Exception as e:
+                logging.error(f"  ✗ {nombre}: {e}")
+                res['errores'] += 1
+
+        logging.info(f"  ✅ {equipo}: {res['jugadores_con_datos']}/{len(jugadores)} jugadores con datos")
+
+        # 2. SCRAPEAR LESIONADOS
+        try:
+            df_les = obtener_jugadores_lesionados(
+                equipo, cliente=cliente,
+                proximo=proximo_partido(self.calendario, equipo)
+            )
+
+            if not df_les.empty:
+                df_les['Equipo'] = equipo
+                logging.info(f"  🏥 {equipo}: {len(df_les)} lesionado(s)")
+            res['lesionados'] = df_les
+
+        except Exception as e:
+            logging.warning(f"  ⚠️ Lesionados {equipo}: {e}")
+
+        res['completo'] = True
+        res['segundos'] = time.perf_counter() - inicio
+        self._guardar_progreso(
+            equipo,
+            {clave: res[clave] for clave in self.CONTADORES_EQUIPO},
+            res['stats'], res['lesionados']
+        )
+        return res
+
+    def _scrapear_secuencial(self, equipos: list) -> dict:
+        """Modo original: un equipo y un jugador detrás de otro, con delays fijos"""
+        r = self._resultado_vacio()
+        # Una sola sesión HTTP (keep-alive) para todo el run secuencial
+        self.cliente = ClienteSofaScore(limitador=LimitadorAdaptativo(
+            tasa_inicial=self.config['rps_secuencial'],
+            tasa_min=self.config['rps_min'],
+            tasa_max=self.config['rps_max']
+        ), telemetria=self.telemetria)
+
         for idx_equipo, equipo in enumerate(equipos, 1):
             # ⏱️ CHECK TIMEOUT
             if self._check_timeout():
                 logging.warning(f"⏱️ Deteniendo scraping por timeout en equipo {idx_equipo}/{len(equipos)}")
-                timeout_alcanzado = True
+                r['timeout'] = True
                 break
             
             tiempo_transcurrido = (time.time() - self.tiempo_inicio) / 60
             logging.info(f"\n[{idx_equipo}/{len(equipos)}] {equipo} | Tiempo: {tiempo_transcurrido:.1f}min")
             
             try:
-                # 1. SCRAPEAR STATS
-                jugadores = JUGADORES_DB[equipo]
-                jugadores_equipo_exitosos = 0
-                
-                for nombre, info in tqdm(jugadores.items(), 
-                                        desc=f"  {equipo}", 
-                                        leave=False):
-                    # ⏱️ CHECK TIMEOUT cada 10 jugadores
-                    if total_jugadores % 10 == 0 and self._check_timeout():
-                        timeout_alcanzado = True
-                        break
-                    
-                    try:
-                        player_id = info.get('id')
-                        if not player_id:
-                            logging.warning(f"  ⚠️ {nombre} - Sin ID, omitiendo")
-                            jugadores_omitidos += 1
-                            continue
-                        
-                        # ⚡ SCRAPING OPTIMIZADO (5 partidos en vez de 10)
-                        df_jug = scrapear_jugador(
-                            player_id,
-                            nombre,
-                            equipo,
-                            cantidad=self.config['partidos_por_jugador']
-                        )
-                        
-                        if not df_jug.empty:
-                            all_stats.append(df_jug)
-                            jugadores_con_datos += 1
-                            jugadores_equipo_exitosos += 1
-                        
-                        total_jugadores += 1
-                        
-                        # ⚡ Delay optimizado
-                        time.sleep(self.config['delay_jugadores'])
-                        
-                    except Exception as e:
-                        logging.error(f"  ✗ {nombre}: {e}")
-                        errores += 1
-                
-                if timeout_alcanzado:
+                res = self._scrapear_equipo(equipo, self.cliente)
+                self._sumar_equipo(r, res)
+                if not res['completo']:
+                    r['timeout'] = True
                     break
                 
-                logging.info(f"  ✅ {jugadores_equipo_exitosos}/{len(jugadores)} jugadores con datos")
-                
-                # 2. SCRAPEAR LESIONADOS
-                try:
-                    df_les = obtener_jugadores_lesionados(equipo)
-                    
-                    if not df_les.empty:
-                        df_les['Equipo'] = equipo
-                        all_lesionados.append(df_les)
-                        logging.info(f"  🏥 {len(df_les)} lesionado(s)")
-                
-                except Exception as e:
-                    logging.warning(f"  ⚠️ Lesionados: {e}")
-                
-                equipos_procesados += 1
-                
                 # ⚡ Delay optimizado entre equipos
                 if idx_equipo < len(equipos):
                     time.sleep(self.config['delay_equipos'])
                 
             except Exception as e:
                 logging.error(f"❌ ERROR CRÍTICO en {equipo}: {e}")
-                errores += 1
+                r['errores'] += 1
+
+        pool = self.cliente.estadisticas()
+        logging.info(f"⚡ {pool['peticiones']} peticiones HTTP | {pool['sesiones_creadas']} sesión(es) | "
+                     f"latencia media {pool['latencia_media_ms']} ms")
+        logging.info(f"🚦 Tasa final {self.cliente.limitador.tasa:.2f} req/s | "
+                     f"{pool['reintentos']} reintentos")
+        self.cliente.cerrar()
+        return r
+
+    def _scrapear_hilos(self, equipos: list) -> dict:
+        """
+        Modo hilos: varios equipos a la vez en un ThreadPoolExecutor. Cada hilo
+        tiene su propia sesión HTTP y su limitador con una parte de
+        requests_por_segundo.
+        """
+        hilos = self.config['hilos']
+        r = self._resultado_vacio()
+        locales = threading.local()
+        clientes = []
+        fallidos = set()
+        lock = threading.Lock()
+
+        def cliente_del_hilo() -> ClienteSofaScore:
+            if not hasattr(locales, 'cliente'):
+                locales.cliente = ClienteSofaScore(limitador=LimitadorAdaptativo(
+                    tasa_inicial=self.config['requests_por_segundo'] / hilos,
+                    tasa_min=self.config['rps_min'],
+                    tasa_max=self.config['rps_max']
+                ), telemetria=self.telemetria)
+                with lock:
+                    clientes.append(locales.cliente)
+            return locales.cliente
+
+        def tarea(equipo: str):
+            if self._check_timeout():
+                return None
+            try:
+                return self._scrapear_equipo(equipo, cliente_del_hilo(), progreso=False)
+            except Exception as e:
+                logging.error(f"❌ ERROR CRÍTICO en {equipo}: {e}")
+                with lock:
+                    fallidos.add(equipo)
+                return None
+
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            for equipo, res in zip(equipos, executor.map(tarea, equipos)):
+                if equipo in fallidos:
+                    r['errores'] += 1
+                elif res is None or not res['completo']:
+                    r['timeout'] = True
+                if res is not None:
+                    self._sumar_equipo(r, res)
+
+        pools = [cliente.estadisticas() for cliente in clientes]
+        peticiones = sum(pool['peticiones'] for pool in pools)
+        reintentos = sum(pool['reintentos'] for pool in pools)
+        logging.info(f"⚡ {peticiones} peticiones HTTP | {len(clientes)} sesión(es) en {hilos} hilos | "
+                     f"{reintentos} reintentos")
+        for cliente in clientes:
+            cliente.cerrar()
+        return r
+
+    def _equipo_async_terminado(self, res: dict):
+        """Checkpoint + stream en cuanto MotorAsync cierra un equipo"""
+        self._guardar_progreso(
+            res['equipo'],
+            {clave: res[clave] for clave in self.CONTADORES_EQUIPO},
+            res['stats'], res['lesionados']
+        )
+        self._volcar_stats(res['equipo'], res['stats'])
+        res['stats'] = AcumuladorStats()   # ya están en disco; _sumar_equipo no las vuelve a escribir
+
+    def _scrapear_async(self, equipos: list) -> dict:
+        """Modo async: equipos_simultaneos equipos a la vez en orden de prioridad, con concurrencia acotada y token bucket"""
+        motor = MotorAsync(
+            concurrencia=self.config['concurrencia'],
+            requests_por_segundo=self.config['requests_por_segundo'],
+            rps_min=self.config['rps_min'],
+            rps_max=self.config['rps_max'],
+            telemetria=self.telemetria,
+            deadline=self.tiempo_inicio + self.config['timeout_minutos'] * 60,
+            calendario=self.calendario,
+            al_terminar_equipo=self._equipo_async_terminado
+        )
+        r = self._resultado_vacio()
+
+        por_equipo = motor.scrapear(
+            {equipo: JUGADORES_DB[equipo] for equipo in equipos},
+            self.partidos,
+            self.conocidos,
+            por_evento=self.config['por_evento']
+        )
+
+        for res in por_equipo:
+            self._sumar_equipo(r, res)
+
+        r['timeout'] = motor.timeout_alcanzado
+        tasas = ', '.join(f"{host} {tasa:.2f}" for host, tasa in motor.tasas().items())
+        logging.info(f"🚦 Tasa final (req/s): {tasas or '-'} | {motor.reintentos} reintentos")
+        logging.info(f"⚡ {motor.peticiones} peticiones HTTP")
+        return r
+
+    def _priorizar(self, equipos: list) -> list:
+        """
+        Entradas de planificador.prioridades() para `equipos`: ordenadas por
+        prioridad (próximo partido, antigüedad de los datos y plantilla), o en
+        el orden recibido si config['priorizar'] es False.
+        """
+        try:
+            df_stats = None
+            if os.path.exists(self.dm.STATS_FILE):
+                df_stats = pd.read_parquet(self.dm.STATS_FILE, columns=['Equipo', 'Timestamp'])
+            ultima = ultima_actualizacion(self.dm.cargar_metricas(), df_stats)
+        except Exception as e:
+            logging.warning(f"⚠️ Antigüedad de los datos: {e}")
+            ultima = {}
+
+        orden = prioridades(equipos, self.calendario, ultima, JUGADORES_DB)
+        if not self.config['priorizar']:
+            orden.sort(key=lambda e: equipos.index(e['equipo']))
+            return orden
+
+        por_franja = [sum(1 for e in orden if e['franja'] == franja) for franja in (0, 1, 2)]
+        logging.info(f"🎯 Prioridad: {por_franja[0]} juegan en <24h, {por_franja[1]} en <72h, "
+                     f"{por_franja[2]} resto | primeros: {', '.join(e['equipo'] for e in orden[:3])}")
+        return orden
+
+    def _planificar(self, entradas: list) -> dict:
+        """Partidos por jugador y equipos que caben en lo que queda de presupuesto_minutos"""
+        metadata = self.dm.cargar_metadata(local=True)
+        if self.shard:
+            # Latencia y plan del último run de este mismo shard, si lo hubo
+            metadata = metadata.get('shards', {}).get(f"{self.shard[0]}/{self.shard[1]}", metadata)
+        restante = self.config['presupuesto_minutos'] * 60 - (time.time() - self.tiempo_inicio)
+        plan = planificar(
+            entradas,
+            presupuesto_s=max(0.0, restante),
+            seg_por_peticion=segundos_por_peticion(metadata, self.config['modo']),
+            partidos_max=self.config['partidos_por_jugador'],
+            modo=self.config['modo'],
+            por_evento=self.config['por_evento'],
+            incremental=self.config['incremental'],
+            factor=factor_correccion(metadata)
+        )
+        logging.info(f"🧮 Plan: {plan['partidos_por_jugador']} partidos/jugador, "
+                     f"{len(plan['equipos'])}/{len(entradas)} equipos, "
+                     f"~{plan['peticiones_estimadas']} peticiones ≈ {plan['estimado_s'] / 60:.1f} min "
+                     f"(presupuesto {restante / 60:.1f} min, {plan['segundos_por_peticion']:.3f} s/petición, "
+                     f"factor {plan['factor']:.2f})")
+        if plan['omitidos']:
+            logging.warning(f"⚠️ Fuera de presupuesto: {', '.join(plan['omitidos'])}")
+        return plan
+
+    def _actualizar_calendario(self, equipos: list = None):
+        """events/next de los 30 equipos (o de `equipos`) en paralelo, una sola vez por run"""
+        try:
+            df_cal = descargar_calendario(
+                concurrencia=self.config['concurrencia'],
+                requests_por_segundo=self.config['requests_por_segundo'],
+                telemetria=self.telemetria,
+                equipos=equipos
+            )
+        except Exception as e:
+            logging.warning(f"⚠️ Calendario: {e}")
+            df_cal = pd.DataFrame()
+
+        if df_cal.empty:
+            logging.warning("⚠️ Calendario no disponible, se usa el último guardado")
+            self.calendario = self.dm.cargar_calendario()
+        else:
+            self.dm.guardar_calendario(df_cal)
+            self.calendario = df_cal
+            logging.info(f"📅 Calendario: {df_cal['Equipo'].nunique()}/{len(equipos or TEAM_IDS)} equipos")
+
+    def scrapear_todo(self, equipos: list = None):
+        """
+        Scraping completo optimizado para GitHub Actions.
+        El modo ('async', 'hilos' o 'secuencial') se toma de self.config['modo'].
+        `equipos` limita el run a esos equipos (por defecto, todos).
+        """
+        self.tiempo_inicio = time.time()
+        inicio = datetime.now()
+        self.telemetria = Telemetria()
+        
+        logging.info("="*60)
+        logging.info(f"⚡ SCRAPING OPTIMIZADO INICIADO: {inicio}")
+        logging.info(f"📊 Configuración:")
+        logging.info(f"  - Modo: {self.config['modo']}"
+                     + (" (por evento)" if self.config['modo'] == 'async' and self.config['por_evento'] else ""))
+        logging.info(f"  - Partidos por jugador (máx.): {self.config['partidos_por_jugador']}")
+        logging.info(f"  - Timeout máximo: {self.config['timeout_minutos']} min")
+        logging.info(f"  - Incremental: {self.config['incremental']}")
+        logging.info("="*60)
+        
+        equipos = list(equipos or JUGADORES_DB.keys())
+        if self.shard:
+            equipos = equipos_del_shard(equipos, *self.shard, JUGADORES_DB)
+            logging.info(f"🧩 Shard {self.shard[0]}/{self.shard[1]}: {len(equipos)} equipos "
+                         f"({', '.join(equipos)})")
+        asignados = list(equipos)
+
+        # Un shard solo necesita el calendario de sus equipos
+        self._actualizar_calendario(asignados if self.shard else None)
+        self.proximos = proximos_partidos(self.calendario)
+
+        # ♻️ Reanudar run anterior interrumpido (sin los equipos que han jugado desde entonces)
+        ckpt = self.dm.cargar_checkpoint(max_horas=self.config['checkpoint_horas'])
+        if ckpt:
+            equipos = [e for e in equipos if e not in ckpt['equipos']]
+            logging.info(f"♻️ Reanudando checkpoint del {ckpt['creado']}: "
+                         f"{len(ckpt['equipos'])} equipos ya hechos, {len(equipos)} pendientes")
+
+        # Los equipos que juegan antes van primero; si salta el timeout, se
+        # quedan sin actualizar los de menor prioridad
+        self.partidos = self.config['partidos_por_jugador']
+        self.plan = None
+        if self.config['priorizar'] or self.config['planificar']:
+            entradas = self._priorizar(equipos)
+            equipos = [e['equipo'] for e in entradas]
+
+            # Volumen del run ajustado al presupuesto con la latencia de runs anteriores
+            if self.config['planificar']:
+                self.plan = self._planificar(entradas)
+                self.partidos = self.plan['partidos_por_jugador']
+                equipos = self.plan['equipos']
+
+        # Partidos ya guardados → no se vuelven a pedir
+        if self.config['incremental']:
+            self.conocidos = self.dm.indice_partidos()
+            total_conocidos = sum(len(ts) for ts in self.conocidos.values())
+            logging.info(f"📦 {total_conocidos} partidos ya guardados ({len(self.conocidos)} jugadores)")
+
+        # Stats nuevas → data/stats_nuevos/, una parte por equipo (retoma las de un run cortado)
+        self.stream = self.dm.abrir_stats_streaming()
+
+        if self.config['modo'] == 'async':
+            r = self._scrapear_async(equipos)
+        elif self.config['modo'] == 'hilos':
+            r = self._scrapear_hilos(equipos)
+        else:
+            r = self._scrapear_secuencial(equipos)
+
+        if ckpt:
+            self._reanudar(r, ckpt)
+
+        all_lesionados = r['lesionados']
+        total_jugadores = r['total_jugadores']
+        jugadores_con_datos = r['jugadores_con_datos']
+        jugadores_omitidos = r['jugadores_omitidos']
+        errores = r['errores']
+        equipos_procesados = r['equipos_procesados']
+        timeout_alcanzado = r['timeout']
         
         # 3. CONSOLIDAR Y GUARDAR
         duracion_scraping = (time.time() - self.tiempo_inicio) / 60
         
-        if all_stats:
-            df_stats_final = pd.concat(all_stats, ignore_index=True)
-            total_registros = self.dm.guardar_stats(df_stats_final)
+        filas_nuevas = self.stream.cerrar()
+        if filas_nuevas:
+            logging.info(f"🆕 {filas_nuevas} partidos nuevos")
+            total_registros = self.dm.guardar_stats_streaming(self.stream, combinar=self.config['incremental'])
             logging.info(f"✅ Stats guardadas: {total_registros} registros")
+        elif self.config['incremental'] and self.conocidos:
+            logging.info("ℹ️ Sin partidos nuevos: stats ya al día")
+            self.stream.borrar()
+            total_registros = sum(len(ts) for ts in self.conocidos.values())
         else:
             logging.warning("⚠️ No se recolectaron estadísticas")
-            df_stats_final = pd.DataFrame()
+            self.stream.borrar()
             total_registros = 0
         
         if all_lesionados:
@@ -168,10 +527,46 @@ class ScraperOptimizado:
             self.dm.guardar_lesionados(df_lesionados_final)
             logging.info(f"✅ Lesionados guardados: {len(df_lesionados_final)}")
         
-        # 4. METADATA
+        cache_stats = obtener_cache().estadisticas()
+        logging.info(f"💾 Cache HTTP ({cache_stats['modo']}): "
+                     f"{cache_stats['aciertos']} aciertos / {cache_stats['fallos']} fallos")
+
+        # Run completo → el checkpoint ya no hace falta
+        if not timeout_alcanzado:
+            self.dm.borrar_checkpoint()
+
+        # 4. METADATA + TELEMETRÍA
         fin = datetime.now()
         duracion = (fin - inicio).total_seconds() / 60
-        
+
+        telemetria = self.telemetria.resumen()
+        for nombre, ep in telemetria['endpoints'].items():
+            logging.info(f"📡 {nombre}: {ep['peticiones']} peticiones | "
+                         f"p50 {ep['latencia_ms']['p50']} ms, p95 {ep['latencia_ms']['p95']} ms | "
+                         f"{ep['bytes'] / 1024 / 1024:.1f} MB | {ep['reintentos']} reintentos")
+        try:
+            self.dm.guardar_metricas(self.telemetria.filas(inicio.isoformat(), self.config['modo']))
+        except Exception as e:
+            logging.warning(f"⚠️ Métricas: {e}")
+
+        plan = None
+        if self.plan:
+            # Plan vs real → el próximo run corrige su estimación (planificador.factor_correccion)
+            plan = {
+                'presupuesto_minutos': round(self.plan['presupuesto_s'] / 60, 2),
+                'estimado_minutos': round(self.plan['estimado_s'] / 60, 2),
+                'real_minutos': round(duracion, 2),
+                'peticiones_estimadas': self.plan['peticiones_estimadas'],
+                'peticiones_reales': telemetria['peticiones'],
+                'segundos_por_peticion': round(self.plan['segundos_por_peticion'], 4),
+                'factor': round(self.plan['factor'], 3),
+                'partidos_por_jugador': self.plan['partidos_por_jugador'],
+                'equipos_planificados': len(self.plan['equipos']),
+                'equipos_omitidos': self.plan['omitidos'],
+            }
+            logging.info(f"🧮 Plan vs real: {plan['estimado_minutos']} vs {plan['real_minutos']} min | "
+                         f"{plan['peticiones_estimadas']} vs {plan['peticiones_reales']} peticiones")
+
         self.dm.actualizar_metadata({
             'total_jugadores': jugadores_con_datos,
             'total_registros': total_registros,
@@ -179,7 +574,12 @@ class ScraperOptimizado:
             'errores': errores,
             'duracion_minutos': round(duracion, 2),
             'timeout': timeout_alcanzado,
-            'partidos_por_jugador': self.config['partidos_por_jugador']
+            'partidos_por_jugador': self.partidos,
+            'modo': self.config['modo'],
+            'telemetria': telemetria,
+            'plan': plan,
+            'equipos_asignados': asignados,
+            'incremental': self.config['incremental']
         })
         
         # 5. ESTADÍSTICAS
@@ -188,7 +588,7 @@ class ScraperOptimizado:
         logging.info("="*60)
         logging.info("📊 RESUMEN FINAL")
         logging.info("="*60)
-        logging.info(f"✅ Equipos procesados: {equipos_procesados}/{len(equipos)}")
+        logging.info(f"✅ Equipos procesados: {equipos_procesados}/{len(asignados)}")
         logging.info(f"✅ Jugadores procesados: {total_jugadores}")
         logging.info(f"✅ Jugadores con datos: {jugadores_con_datos}")
         logging.info(f"⚠️ Jugadores omitidos: {jugadores_omitidos}")
@@ -215,9 +615,77 @@ class ScraperOptimizado:
             'equipos_procesados': equipos_procesados
         }
 
+def ejecutar_shards(total: int, argv: list) -> int:
+    """
+    Lanza `total` procesos `--shard i/total` con los mismos argumentos, espera
+    a todos y une sus salidas. Retorna el exit code (1 si no hay nada que unir
+    o algún worker falló).
+    """
+    import subprocess
+
+    logging.info(f"🧩 Lanzando {total} shards en paralelo")
+    procesos = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), *argv, '--shard', f"{i}/{total}"])
+        for i in range(1, total + 1)
+    ]
+    codigos = [p.wait() for p in procesos]
+    metadata = DataManager(nube=False).unir_shards()
+    if any(codigos):
+        logging.error(f"❌ Shards con error: {[i for i, c in enumerate(codigos, 1) if c]}")
+    return 1 if metadata is None or any(codigos) else 0
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraper NBA (SofaScore)")
+    parser.add_argument('--modo', choices=ScraperOptimizado.MODOS, default='async',
+                        help="async (concurrente, por defecto), hilos (varios equipos en "
+                             "paralelo con sesiones síncronas) o secuencial (modo original)")
+    parser.add_argument('--completo', action='store_true',
+                        help="Ignora los partidos ya guardados y vuelve a descargarlo todo")
+    parser.add_argument('--por-jugador', action='store_true',
+                        help="Modo async: una petición de statistics por jugador y partido "
+                             "en lugar de un box score por partido")
+    parser.add_argument('--presupuesto', type=float, default=None,
+                        help="Minutos objetivo del run para el planificador (por defecto 70)")
+    parser.add_argument('--sin-plan', action='store_true',
+                        help="No ajusta partidos por jugador ni equipos al presupuesto")
+    parser.add_argument('--sin-prioridad', action='store_true',
+                        help="Scrapea los equipos en el orden de JUGADORES_DB en lugar de por prioridad")
+    parser.add_argument('--cache', choices=MODOS_CACHE, default=None,
+                        help="Cache HTTP en disco: normal, replay (sin red, solo respuestas grabadas) u off")
+    # Escalado horizontal: cada worker scrapea un subconjunto disjunto de equipos
+    parser.add_argument('--shard', type=parsear_shard, default=None, metavar='i/n',
+                        help="Worker i de n: solo sus equipos, salida en data/shards/ (unir con --unir-shards)")
+    parser.add_argument('--unir-shards', action='store_true',
+                        help="Une las salidas de data/shards/ en stats_latest, lesionados y metadata y sale")
+    parser.add_argument('--shards', type=int, default=None, metavar='N',
+                        help="Lanza N procesos --shard en paralelo y une sus salidas al terminar")
+    parser.add_argument('--compactar', action='store_true',
+                        help="Funde los segmentos pendientes de data/segmentos/ en stats y lesionados y sale")
+    args = parser.parse_args()
+
+    if args.cache:
+        configurar_cache(args.cache)
+
+    if args.compactar:
+        DataManager(nube=False).compactar()
+        sys.exit(0)
+    if args.unir_shards:
+        sys.exit(0 if DataManager(nube=False).unir_shards() else 1)
+    if args.shards:
+        argv = sys.argv[1:]
+        i = next(i for i, a in enumerate(argv) if a.startswith('--shards'))
+        del argv[i:i + (1 if '=' in argv[i] else 2)]
+        sys.exit(ejecutar_shards(args.shards, argv))
+
     try:
-        scraper = ScraperOptimizado()
+        scraper = ScraperOptimizado(modo=args.modo, incremental=not args.completo,
+                                    por_evento=not args.por_jugador,
+                                    priorizar=not args.sin_prioridad,
+                                    shard=args.shard)
+        scraper.config['planificar'] = not args.sin_plan
+        if args.presupuesto:
+            scraper.config['presupuesto_minutos'] = args.presupuesto
         resultado = scraper.scrapear_todo()
         
         print("\n" + "="*60)
@@ -0,0 +1,301 @@
+# servidor_stub.py
+# Servidor HTTP local que imita los endpoints de SofaScore que usa el scraper
+# (events/last, statistics, events/next y lineups) para los 30 equipos.
+#
+#   - Calendario round-robin: cada equipo juega más o menos un día sí y otro
+#     no (DIAS_PASADOS hacia atrás y DIAS_FUTUROS hacia adelante) y cada
+#     evento lo comparten dos equipos igual que en la liga real.
+#   - Payloads deterministas por `semilla`: dos runs contra el mismo servidor
+#     ven los mismos partidos y los mismos números.
+#   - Latencia, errores 5xx y 429 (con Retry-After) configurables.
+#
+# Uso:
+#   python servidor_stub.py --puerto 8765 --latencia 0.05 --errores 0.01 --429 0.02
+#   HOOPS_SOFASCORE_API=http://127.0.0.1:8765/api/v1 python scraper_automatico.py
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config_nba import JUGADORES_DB, TEAM_IDS
+
+DIAS_PASADOS = 30
+DIAS_FUTUROS = 4
+HORA_PARTIDO = 30 * 60    # 00:30 UTC (19:30 hora del este)
+
+RUTAS = [
+    ('events_last', re.compile(r'^/api/v1/player/(\d+)/events/last/(\d+)$')),
+    ('statistics',  re.compile(r'^/api/v1/event/(\d+)/player/(\d+)/statistics$')),
+    ('events_next', re.compile(r'^/api/v1/team/(\d+)/events/next/(\d+)$')),
+    ('lineups',     re.compile(r'^/api/v1/event/(\d+)/lineups$')),
+]
+
+
+def _rng(*claves) -> random.Random:
+    return random.Random('-'.join(str(c) for c in claves))
+
+
+class LigaStub:
+    """Calendario, plantillas y estadísticas generadas de forma determinista"""
+
+    def __init__(self, semilla: int = 0, ahora: float = None):
+        self.semilla = semilla
+        self.equipos = {team_id: nombre for nombre, team_id in TEAM_IDS.items()}
+
+        # Plantillas por team_id (config_nba repite algún id → gana el primero)
+        self.plantillas = {}
+        self.equipo_de_jugador = {}
+        for nombre, jugadores in JUGADORES_DB.items():
+            team_id = TEAM_IDS[nombre]
+            for jugador, info in jugadores.items():
+                pid = info.get('id')
+                if pid and pid not in self.equipo_de_jugador:
+                    self.equipo_de_jugador[pid] = team_id
+                    self.plantillas.setdefault(team_id, []).append((pid, jugador))
+
+        # Día de referencia truncado → timestamps estables durante el día
+        hoy = int((ahora or time.time()) // 86400) * 86400
+        self.eventos = {}
+        self.eventos_de_equipo = {team_id: [] for team_id in self.equipos}
+        ids = list(self.equipos)
+        for dia in range(-DIAS_PASADOS, DIAS_FUTUROS + 1):
+            ronda = dia + DIAS_PASADOS
+            for idx, (local, visitante) in enumerate(self._emparejar(ids, ronda)):
+                if (ronda + idx) % 2:
+                    continue    # media ronda por día
+                if ronda % 2:
+                    local, visitante = visitante, local
+                ev = {
+                    'id': 10_000_000 + ronda * 100 + idx,
+                    'startTimestamp': hoy + dia * 86400 + HORA_PARTIDO,
+                    'tournament': {'name': 'NBA'},
+                    'homeTeam': {'id': local, 'name': self.equipos[local]},
+                    'awayTeam': {'id': visitante, 'name': self.equipos[visitante]},
+                }
+                self.eventos[ev['id']] = ev
+                self.eventos_de_equipo[local].append(ev)
+                self.eventos_de_equipo[visitante].append(ev)
+
+    @staticmethod
+    def _emparejar(ids: list, ronda: int) -> list:
+        """Una ronda del método del círculo (round-robin)"""
+        n = len(ids)
+        rotados = [ids[0]] + ids[1:][ronda % (n - 1):] + ids[1:][:ronda % (n - 1)]
+        return [(rotados[i], rotados[n - 1 - i]) for i in range(n // 2)]
+
+    def lesionados(self, event_id: int, team_id: int) -> list:
+        plantilla = self.plantillas.get(team_id, [])
+        rng = _rng(self.semilla, 'les', team_id, event_id // 100 // 7)   # cambia cada semana
+        return rng.sample(plantilla, min(len(plantilla), rng.randint(0, 2)))
+
+    def estadisticas(self, event_id: int, player_id: int) -> dict:
+        ev = self.eventos.get(event_id)
+        team_id = self.equipo_de_jugador.get(player_id)
+        if ev is None or team_id not in (ev['homeTeam']['id'], ev['awayTeam']['id']):
+            return {}
+        if any(pid == player_id for pid, _ in self.lesionados(event_id, team_id)):
+            return {'secondsPlayed': 0}
+
+        rng = _rng(self.semilla, 'stats', event_id, player_id)
+        if rng.random() < 0.1:    # DNP
+            return {'secondsPlayed': 0}
+
+        minutos = rng.uniform(8, 40)
+        tiros = int(minutos * rng.uniform(0.2, 0.55))
+        triples = int(tiros * rng.uniform(0.2, 0.5))
+        libres = rng.randint(0, int(minutos / 6))
+        tiros_e = sum(rng.random() < 0.47 for _ in range(tiros))
+        triples_e = min(tiros_e, sum(rng.random() < 0.36 for _ in range(triples)))
+        libres_e = sum(rng.random() < 0.78 for _ in range(libres))
+        reb_off = rng.randint(0, int(minutos / 12))
+        reb_def = rng.randint(0, int(minutos / 5))
+        return {
+            'secondsPlayed': int(minutos * 60),
+            'points': 2 * tiros_e + triples_e + libres_e,
+            'fieldGoalsAttempted': tiros,
+            'fieldGoalsMade': tiros_e,
+            'threePointersAttempted': triples,
+            'threePointersMade': triples_e,
+            'freeThrowsAttempted': libres,
+            'freeThrowsMade': libres_e,
+            'rebounds': reb_off + reb_def,
+            'offensiveRebounds': reb_off,
+            'defensiveRebounds': reb_def,
+            'assists': rng.randint(0, int(minutos / 4)),
+            'steals': rng.randint(0, 3),
+            'blocks': rng.randint(0, 2),
+            'turnovers': rng.randint(0, 4),
+            'plusMinus': rng.randint(-20, 20),
+        }
+
+    # ========================================================================
+    # ENDPOINTS
+    # ========================================================================
+
+    def events_last(self, player_id: int, pagina: int, ahora: float):
+        team_id = self.equipo_de_jugador.get(player_id)
+        if team_id is None or pagina > 0:
+            return 404, {'error': {'code': 404}}
+        # SofaScore devuelve del más antiguo al más reciente
+        pasados = [ev for ev in self.eventos_de_equipo[team_id] if ev['startTimestamp'] < ahora]
+        return 200, {'events': pasados[-30:], 'hasNextPage': False}
+
+    def statistics(self, event_id: int, player_id: int, ahora: float):
+        stats = self.estadisticas(event_id, player_id)
+        if not stats:
+            return 404, {'error': {'code': 404}}
+        return 200, {'statistics': stats}
+
+    def events_next(self, team_id: int, pagina: int, ahora: float):
+        if team_id not in self.equipos or pagina > 0:
+            return 404, {'error': {'code': 404}}
+        futuros = [ev for ev in self.eventos_de_equipo[team_id] if ev['startTimestamp'] >= ahora]
+        return 200, {'events': futuros, 'hasNextPage': False}
+
+    def lineups(self, event_id: int, ahora: float):
+        ev = self.eventos.get(event_id)
+        if ev is None:
+            return 404, {'error': {'code': 404}}
+        jugado = ev['startTimestamp'] < ahora
+        data = {'confirmed': jugado}
+        for lado in ('home', 'away'):
+            team_id = ev[f'{lado}Team']['id']
+            jugadores = []
+            if jugado:
+                for pid, nombre in self.plantillas.get(team_id, []):
+                    jugadores.append({
+                        'player': {'id': pid, 'name': nombre},
+                        'statistics': self.estadisticas(event_id, pid),
+                    })
+            data[lado] = {
+                'players': jugadores,
+                'missingPlayers': [
+                    {'player': {'id': pid, 'name': nombre}, 'type': 'missing', 'reason': 1}
+                    for pid, nombre in self.lesionados(event_id, team_id)
+                ],
+            }
+        return 200, data
+
+    def responder(self, ruta: str, ahora: float = None):
+        """(status, JSON) de `ruta` vista en el instante `ahora` (por defecto, ya)"""
+        ahora = ahora or time.time()
+        for endpoint, patron in RUTAS:
+            m = patron.match(ruta)
+            if m:
+                return getattr(self, endpoint)(*map(int, m.groups()), ahora)
+        return 404, {'error': {'code': 404}}
+
+
+class ServidorStub:
+    """
+    Servidor en un hilo de fondo. `puerto=0` elige uno libre.
+
+        with ServidorStub(latencia=0.05, tasa_429=0.02) as srv:
+            os.environ['HOOPS_SOFASCORE_API'] = srv.url_base
+    """
+
+    def __init__(self, puerto: int = 0, latencia: float = 0.05, tasa_error: float = 0.0,
+                 tasa_429: float = 0.0, retry_after: float = 1.0, semilla: int = 0):
+        self.liga = LigaStub(semilla)
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        self.tasa_429 = tasa_429
+        self.retry_after = retry_after
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        # Contadores
+        self.peticiones = 0
+        self.errores_inyectados = 0
+        self.limitadas = 0
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', puerto), self._handler())
+        self._httpd.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url_base(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/api/v1"
+
+    def _sortear(self) -> str:
+        """'429', '500' o None para la próxima petición"""
+        with self._lock:
+            self.peticiones += 1
+            dado = self._rng.random()
+            if dado < self.tasa_429:
+                self.limitadas += 1
+                return '429'
+            if dado < self.tasa_429 + self.tasa_error:
+                self.errores_inyectados += 1
+                return '500'
+            return None
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _enviar(self, status: int, data: dict, cabeceras: dict = None):
+                cuerpo = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                for clave, valor in (cabeceras or {}).items():
+                    self.send_header(clave, valor)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def do_GET(self):
+                if servidor.latencia:
+                    time.sleep(servidor.latencia * random.uniform(0.5, 1.5))
+
+                fallo = servidor._sortear()
+                if fallo == '429':
+                    self._enviar(429, {'error': {'code': 429}},
+                                 {'Retry-After': f"{servidor.retry_after:g}"})
+                elif fallo == '500':
+                    self._enviar(500, {'error': {'code': 500}})
+                else:
+                    self._enviar(*servidor.liga.responder(self.path.split('?')[0]))
+
+        return Handler
+
+    def iniciar(self) -> 'ServidorStub':
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de SofaScore")
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--latencia', type=float, default=0.05, help="Segundos por respuesta (±50%%)")
+    parser.add_argument('--errores', type=float, default=0.0, help="Fracción de respuestas 500")
+    parser.add_argument('--429', dest='tasa_429', type=float, default=0.0, help="Fracción de respuestas 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After (s) de los 429")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    srv = ServidorStub(args.puerto, args.latencia, args.errores, args.tasa_429, args.retry_after, args.semilla)
+    print(f"🏀 Stub SofaScore en {srv.url_base}  (Ctrl+C para salir)")
+    try:
+        srv._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv._httpd.server_close()
@@ -0,0 +1,200 @@
+# telemetria.py
+# Telemetría por petición del scraper
+#
+# Por endpoint: peticiones, códigos de estado, errores, reintentos, aciertos de
+# cache, bytes descargados y latencias (p50/p95/p99 + histograma). Por equipo:
+# tiempo de pared desde que empieza hasta que se cierra.
+#
+# Una Telemetria por run: la crea ScraperOptimizado y la reciben MotorAsync y
+# ClienteSofaScore (`telemetria=`). El resumen va a metadata.json y las filas
+# a data/scraper_metrics.parquet (histórico entre runs).
+
+import math
+import re
+import threading
+import time
+
+import pandas as pd
+
+ENDPOINTS = [
+    ('events_last', re.compile(r'/player/\d+/events/last/')),
+    ('statistics',  re.compile(r'/event/\d+/player/\d+/statistics$')),
+    ('events_next', re.compile(r'/team/\d+/events/next/')),
+    ('lineups',     re.compile(r'/event/\d+/lineups$')),
+]
+
+# Límites superiores (ms) de los buckets del histograma
+BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, math.inf]
+
+
+def endpoint_de(url: str) -> str:
+    for nombre, patron in ENDPOINTS:
+        if patron.search(url):
+            return nombre
+    return 'otro'
+
+
+def percentil(valores: list, p: float) -> float:
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores:
+        return 0.0
+    idx = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[idx]
+
+
+class Telemetria:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+        self.endpoints = {}
+        self.equipos = {}
+
+    def _endpoint(self, url: str) -> dict:
+        nombre = endpoint_de(url)
+        if nombre not in self.endpoints:
+            self.endpoints[nombre] = {
+                'peticiones': 0, 'errores': 0, 'reintentos': 0, 'aciertos_cache': 0,
+                'bytes': 0, 'estados': {}, 'latencias': []
+            }
+        return self.endpoints[nombre]
+
+    # ========================================================================
+    # REGISTRO
+    # ========================================================================
+
+    def peticion(self, url: str, latencia: float, bytes_: int = 0, status: int = None):
+        """Una petición de red. `status` None = excepción (timeout, conexión...)"""
+        with self._lock:
+            ep = self._endpoint(url)
+            ep['peticiones'] += 1
+            ep['bytes'] += bytes_
+            ep['latencias'].append(latencia * 1000)
+            clave = str(status) if status is not None else 'excepcion'
+            ep['estados'][clave] = ep['estados'].get(clave, 0) + 1
+            if status is None or status >= 400:
+                ep['errores'] += 1
+
+    def reintento(self, url: str):
+        with self._lock:
+            self._endpoint(url)['reintentos'] += 1
+
+    def acierto_cache(self, url: str):
+        with self._lock:
+            self._endpoint(url)['aciertos_cache'] += 1
+
+    def equipo(self, equipo: str, segundos: float):
+        with self._lock:
+            self.equipos[equipo] = round(segundos, 2)
+
+    # ========================================================================
+    # PUBLICACIÓN
+    # ========================================================================
+
+    @staticmethod
+    def _resumen_endpoint(ep: dict) -> dict:
+        latencias = sorted(ep['latencias'])
+        histograma = {}
+        restantes = iter(latencias)
+        valor = next(restantes, None)
+        for limite in BUCKETS_MS:
+            n = 0
+            while valor is not None and valor <= limite:
+                n += 1
+                valor = next(restantes, None)
+            histograma[f"<={limite:g}" if limite != math.inf else 'inf'] = n
+        return {
+            'peticiones': ep['peticiones'],
+            'errores': ep['errores'],
+            'reintentos': ep['reintentos'],
+            'aciertos_cache': ep['aciertos_cache'],
+            'bytes': ep['bytes'],
+            'estados': dict(ep['estados']),
+            'latencia_ms': {
+                'p50': round(percentil(latencias, 50), 1),
+                'p95': round(percentil(latencias, 95), 1),
+                'p99': round(percentil(latencias, 99), 1),
+                'max': round(latencias[-1], 1) if latencias else 0.0,
+            },
+            'histograma_ms': histograma,
+        }
+
+    def resumen(self) -> dict:
+        """Bloque 'telemetria' de metadata.json"""
+        with self._lock:
+            endpoints = {nombre: self._resumen_endpoint(ep) for nombre, ep in sorted(self.endpoints.items())}
+            equipos = dict(sorted(self.equipos.items(), key=lambda kv: -kv[1]))
+        segundos = time.time() - self.inicio
+        peticiones = sum(ep['peticiones'] for ep in endpoints.values())
+        return {
+            'segundos': round(segundos, 1),
+            'peticiones': peticiones,
+            'peticiones_por_segundo': round(peticiones / segundos, 2) if segundos else 0.0,
+            'bytes': sum(ep['bytes'] for ep in endpoints.values()),
+            'reintentos': sum(ep['reintentos'] for ep in endpoints.values()),
+            'errores': sum(ep['errores'] for ep in endpoints.values()),
+            'endpoints': endpoints,
+            'segundos_por_equipo': equipos,
+        }
+
+    def filas(self, run: str, modo: str) -> pd.DataFrame:
+        """
+        Filas para data/scraper_metrics.parquet: una por endpoint (Tipo='endpoint')
+        y una por equipo (Tipo='equipo', solo Segundos).
+        """
+        resumen = self.resumen()
+        filas = []
+        for nombre, ep in resumen['endpoints'].items():
+            filas.append({
+                'Run': run, 'Modo': modo, 'Tipo': 'endpoint', 'Nombre': nombre,
+                'Peticiones': ep['peticiones'], 'Errores': ep['errores'],
+                'Reintentos': ep['reintentos'], 'AciertosCache': ep['aciertos_cache'],
+                'Bytes': ep['bytes'],
+                'P50_ms': ep['latencia_ms']['p50'], 'P95_ms': ep['latencia_ms']['p95'],
+                'P99_ms': ep['latencia_ms']['p99'], 'Segundos': None,
+            })
+        for equipo, segundos in resumen['segundos_por_equipo'].items():
+            filas.append({'Run': run, 'Modo': modo, 'Tipo': 'equipo', 'Nombre': equipo, 'Segundos': segundos})
+        return pd.DataFrame(filas, columns=[
+            'Run', 'Modo', 'Tipo', 'Nombre', 'Peticiones', 'Errores', 'Reintentos',
+            'AciertosCache', 'Bytes', 'P50_ms', 'P95_ms', 'P99_ms', 'Segundos'
+        ])
+
+
+def unir_resumenes(resumenes: list) -> dict:
+    """
+    Un solo bloque 'telemetria' a partir de los resumen() de varios shards
+    (procesos en paralelo). Contadores, estados e histogramas se suman; los
+    segundos son los del shard más lento. Los percentiles no se pueden
+    recombinar sin las latencias crudas: se toma el peor de los shards.
+    """
+    endpoints = {}
+    for resumen in resumenes:
+        for nombre, ep in resumen.get('endpoints', {}).items():
+            total = endpoints.setdefault(nombre, {
+                'peticiones': 0, 'errores': 0, 'reintentos': 0, 'aciertos_cache': 0, 'bytes': 0,
+                'estados': {}, 'latencia_ms': {}, 'histograma_ms': {}
+            })
+            for clave in ('peticiones', 'errores', 'reintentos', 'aciertos_cache', 'bytes'):
+                total[clave] += ep.get(clave, 0)
+            for clave in ('estados', 'histograma_ms'):
+                for k, n in ep.get(clave, {}).items():
+                    total[clave][k] = total[clave].get(k, 0) + n
+            for k, ms in ep.get('latencia_ms', {}).items():
+                total['latencia_ms'][k] = max(total['latencia_ms'].get(k, 0.0), ms)
+
+    equipos = {}
+    for resumen in resumenes:
+        equipos.update(resumen.get('segundos_por_equipo', {}))
+
+    segundos = max((r.get('segundos', 0) for r in resumenes), default=0)
+    peticiones = sum(r.get('peticiones', 0) for r in resumenes)
+    return {
+        'segundos': segundos,
+        'peticiones': peticiones,
+        'peticiones_por_segundo': round(peticiones / segundos, 2) if segundos else 0.0,
+        'bytes': sum(r.get('bytes', 0) for r in resumenes),
+        'reintentos': sum(r.get('reintentos', 0) for r in resumenes),
+        'errores': sum(r.get('errores', 0) for r in resumenes),
+        'endpoints': dict(sorted(endpoints.items())),
+        'segundos_por_equipo': dict(sorted(equipos.items(), key=lambda kv: -kv[1])),
+    }
@@ -0,0 +1,103 @@
+# tests/conftest.py
+# Los módulos del proyecto viven en la raíz del repo (sin paquete)
+
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_http  # noqa: E402
+from servidor_stub import LigaStub  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Cache de respuestas del proceso apuntando a un directorio temporal"""
+    monkeypatch.setattr(cache_http, '_cache', None)
+    return cache_http.configurar_cache('normal', str(tmp_path / 'sofascore'))
+
+
+class _Respuesta:
+    def __init__(self, status: int, data: dict):
+        self.status_code = status
+        self._data = data
+        self.content = json.dumps(data).encode('utf-8')
+        self.headers = {}
+
+    def json(self):
+        return self._data
+
+
+class _SesionStub:
+    """AsyncSession mínima sobre LigaStub con el reloj en `ahora`"""
+
+    def __init__(self, liga: LigaStub, ahora: float):
+        self.liga = liga
+        self.ahora = ahora
+        self.urls = []
+
+    async def get(self, url, **kwargs):
+        self.urls.append(url)
+        return _Respuesta(*self.liga.responder(urlsplit(url).path, self.ahora))
+
+
+@pytest.fixture
+def sesion_stub():
+    """Fábrica de sesiones async sobre LigaStub: sesion_stub(liga, ahora)"""
+    return _SesionStub
+
+
+def filas_stats(equipos: dict, partidos: int = 5, desde_dias: int = 1, semilla: int = 0) -> pd.DataFrame:
+    """
+    Stats sintéticas con el esquema de stats_latest: `equipos` es
+    {equipo: [jugadores]}, `partidos` por jugador en días consecutivos hacia
+    atrás empezando hace `desde_dias` días.
+    """
+    rng = random.Random(semilla)
+    hoy = datetime.now().replace(hour=19, minute=30, second=0, microsecond=0)
+    filas = []
+    for equipo, jugadores in equipos.items():
+        for jugador in jugadores:
+            for n in range(partidos):
+                fecha = hoy - timedelta(days=desde_dias + n)
+                filas.append({
+                    'Jugador': jugador, 'Equipo': equipo, 'Posicion': 'G', 'Altura': 198,
+                    'Fecha': fecha, 'Localia': 'Local', 'Timestamp': int(fecha.timestamp()),
+                    'Puntos': rng.randint(0, 30), 'Rebotes': rng.randint(0, 12),
+                    'Asistencias': rng.randint(0, 10), 'Minutos': round(rng.uniform(5, 38), 1),
+                })
+    return pd.DataFrame(filas)
+
+
+@pytest.fixture
+def dm(tmp_path, monkeypatch):
+    """DataManager local sobre un data/ vacío en un directorio temporal"""
+    monkeypatch.chdir(tmp_path)
+    from data_manager import DataManager
+    return DataManager(nube=False)
+
+
+@pytest.fixture
+def servidor_github(tmp_path):
+    """Sirve `tmp_path` por HTTP como si fuera raw.githubusercontent.com: URL base de data/"""
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+    import threading
+
+    class Silencioso(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), partial(Silencioso, directory=str(tmp_path)))
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}/data"
+    servidor.shutdown()
+    servidor.server_close()
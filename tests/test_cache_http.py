@@ -0,0 +1,155 @@
+# tests/test_cache_http.py
+
+import asyncio
+import json
+import time
+
+import pytest
+
+import cache_http
+from cache_http import PARA_SIEMPRE, CacheRespuestas, RespuestaNoGrabada
+from cliente_sofascore import SOFASCORE_API
+from config_nba import TEAM_IDS
+from scraper_async import MotorAsync
+from servidor_stub import LigaStub
+
+TRES_DIAS = 3 * 86400
+
+
+def _envejecer(cache: CacheRespuestas, url: str, segundos: float):
+    """Retrasa `segundos` el timestamp de la entrada de `url`"""
+    ruta = cache._ruta(url)
+    with open(ruta, 'r', encoding='utf-8') as f:
+        entrada = json.load(f)
+    entrada['ts'] -= segundos
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(entrada, f)
+
+
+# ============================================================================
+# LINEUPS: LESIONADOS Y BOX SCORE COMPARTEN URL
+# ============================================================================
+
+def test_lineups_previo_de_lesionados_no_tapa_el_box_score(cache, sesion_stub):
+    liga = LigaStub(semilla=1)
+    equipo = next(iter(TEAM_IDS))
+    team_id = TEAM_IDS[equipo]
+    ahora = time.time()
+    ev = next(e for e in liga.eventos_de_equipo[team_id] if e['startTimestamp'] > ahora)
+    url = f"{SOFASCORE_API}/event/{ev['id']}/lineups"
+    motor = MotorAsync()
+
+    async def lesionados_y_box_score():
+        motor._semaforo = asyncio.Semaphore(1)
+        # Antes del partido: _lesionados cachea la alineación previa (sin statistics)
+        sesion = sesion_stub(liga, ev['startTimestamp'] - 3600)
+        await motor._lesionados(sesion, equipo)
+        assert url in sesion.urls
+        assert cache.leer(url) is not None
+
+        # Tres días después el box score no puede servirse de esa entrada
+        _envejecer(cache, url, TRES_DIAS)
+        sesion.ahora = ev['startTimestamp'] + 4 * 3600
+        sesion.urls.clear()
+        box = await motor._box_score(sesion, ev['id'])
+        assert sesion.urls == [url]
+        return box
+
+    box = asyncio.run(lesionados_y_box_score())
+    jugadores = [pid for pid, _ in liga.plantillas[team_id]]
+    assert jugadores and all(box.get(pid) for pid in jugadores)
+
+    # El box score sí es definitivo: se sirve del disco por vieja que sea la entrada
+    _envejecer(cache, url, TRES_DIAS)
+    assert cache.leer(url, ttl=PARA_SIEMPRE)['home']['players']
+
+
+def test_lineups_previo_caduca_con_ttl_del_endpoint(cache):
+    url = f"{SOFASCORE_API}/event/1/lineups"
+    previo = {'home': {'players': [], 'missingPlayers': []}, 'away': {'players': []}}
+    cache.escribir(url, previo)
+
+    assert cache.leer(url, ttl=PARA_SIEMPRE) == previo
+    _envejecer(cache, url, cache_http.ttl_para(url) + 1)
+    assert cache.leer(url, ttl=PARA_SIEMPRE) is None
+
+
+def test_entrada_sin_flag_se_decide_por_el_contenido(cache):
+    """Entradas grabadas antes del flag (p.ej. restauradas por actions/cache)"""
+    url = f"{SOFASCORE_API}/event/2/lineups"
+    ruta = cache._ruta(url)
+    cache.escribir(url, {'home': {'players': []}})
+    with open(ruta, 'r', encoding='utf-8') as f:
+        entrada = json.load(f)
+    del entrada['definitiva']
+    entrada['ts'] -= TRES_DIAS
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(entrada, f)
+
+    assert cache.leer(url, ttl=PARA_SIEMPRE) is None
+
+
+# ============================================================================
+# TTL POR ENDPOINT Y MODOS
+# ============================================================================
+
+def test_ttl_por_endpoint():
+    assert cache_http.ttl_para(f"{SOFASCORE_API}/event/1/player/2/statistics") == PARA_SIEMPRE
+    assert cache_http.ttl_para(f"{SOFASCORE_API}/team/1/events/next/0") == 10 * 60
+    assert cache_http.ttl_para(f"{SOFASCORE_API}/player/1/events/last/0") == 30 * 60
+    assert cache_http.ttl_para(f"{SOFASCORE_API}/event/1/lineups") == 30 * 60
+    assert cache_http.ttl_para(f"{SOFASCORE_API}/otra/cosa") == cache_http.TTL_DEFECTO
+
+
+def test_entrada_caduca_con_su_ttl(cache):
+    url = f"{SOFASCORE_API}/team/1/events/next/0"
+    cache.escribir(url, {'events': []})
+    assert cache.leer(url) == {'events': []}
+
+    _envejecer(cache, url, 10 * 60 + 1)
+    assert cache.leer(url) is None
+    # Un ttl explícito sobreescribe el del endpoint
+    assert cache.leer(url, ttl=3600) == {'events': []}
+    assert (cache.aciertos, cache.fallos) == (2, 1)
+
+
+def test_statistics_terminadas_no_caducan(cache):
+    url = f"{SOFASCORE_API}/event/1/player/2/statistics"
+    cache.escribir(url, {'statistics': {'points': 10}})
+    _envejecer(cache, url, 365 * 86400)
+    assert cache.leer(url) == {'statistics': {'points': 10}}
+
+
+def test_replay_sirve_lo_grabado_sin_ttl(tmp_path):
+    directorio = str(tmp_path / 'sofascore')
+    url = f"{SOFASCORE_API}/team/1/events/next/0"
+    grabado = CacheRespuestas(directorio, modo='normal')
+    grabado.escribir(url, {'events': [1]})
+    _envejecer(grabado, url, TRES_DIAS)
+
+    replay = CacheRespuestas(directorio, modo='replay')
+    assert replay.leer(url) == {'events': [1]}
+    with pytest.raises(RespuestaNoGrabada):
+        replay.leer(f"{SOFASCORE_API}/team/2/events/next/0")
+
+    # replay no graba nada nuevo
+    replay.escribir(f"{SOFASCORE_API}/team/3/events/next/0", {'events': []})
+    with pytest.raises(RespuestaNoGrabada):
+        replay.leer(f"{SOFASCORE_API}/team/3/events/next/0")
+
+
+def test_off_ni_lee_ni_escribe(tmp_path):
+    directorio = str(tmp_path / 'sofascore')
+    url = f"{SOFASCORE_API}/team/1/events/next/0"
+    off = CacheRespuestas(directorio, modo='off')
+    off.escribir(url, {'events': []})
+    assert off.leer(url) is None
+    assert not (tmp_path / 'sofascore').exists()
+
+    CacheRespuestas(directorio).escribir(url, {'events': []})
+    assert off.leer(url) is None
+
+
+def test_modo_desconocido():
+    with pytest.raises(ValueError):
+        CacheRespuestas(modo='grabar')
@@ -0,0 +1,81 @@
+# tests/test_checkpoint.py
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+
+from conftest import filas_stats
+
+EQUIPOS = {
+    'Miami Heat': ['Bam Adebayo', 'Tyler Herro'],
+    'Utah Jazz': ['Lauri Markkanen', 'Walker Kessler'],
+    'Denver Nuggets': ['Nikola Jokic'],
+}
+CONTADORES = {'total_jugadores': 2, 'jugadores_con_datos': 2, 'jugadores_omitidos': 0, 'errores': 0}
+
+
+def _tabla(equipo: str, partidos: int = 5) -> pa.Table:
+    return pa.Table.from_pandas(filas_stats({equipo: EQUIPOS[equipo]}, partidos=partidos), preserve_index=False)
+
+
+def _guardar(dm, proximos: dict):
+    for equipo, proximo in proximos.items():
+        dm.guardar_checkpoint_equipo(equipo, dict(CONTADORES), _tabla(equipo), proximo=proximo)
+
+
+def test_caducan_los_equipos_que_han_jugado(dm):
+    # Heat juega a las 1000, Jazz a las 5000 y Nuggets sin partido en el calendario
+    _guardar(dm, {'Miami Heat': 1000, 'Utah Jazz': 5000, 'Denver Nuggets': None})
+
+    ckpt = dm.cargar_checkpoint(ahora=2000)
+    assert sorted(ckpt['equipos']) == ['Denver Nuggets', 'Utah Jazz']
+    assert sorted(ckpt['stats']) == ['Denver Nuggets', 'Utah Jazz']
+    assert not os.path.exists(dm._ruta_checkpoint('stats', 'Miami Heat'))
+
+    # El descarte queda en disco: un run posterior no lo vuelve a ver
+    ckpt = dm.cargar_checkpoint(ahora=6000)
+    assert list(ckpt['equipos']) == ['Denver Nuggets']
+
+
+def test_checkpoint_sin_equipos_vigentes_se_borra(dm):
+    _guardar(dm, {'Miami Heat': 1000})
+    assert dm.cargar_checkpoint(ahora=2000) is None
+    assert not os.path.exists(dm.CHECKPOINT_DIR)
+
+
+def test_checkpoint_viejo_se_descarta(dm):
+    _guardar(dm, {'Utah Jazz': None})
+    with open(dm.CHECKPOINT_ESTADO) as f:
+        estado = json.load(f)
+    estado['creado'] = (datetime.now() - timedelta(hours=30)).isoformat()
+    with open(dm.CHECKPOINT_ESTADO, 'w') as f:
+        json.dump(estado, f)
+
+    assert dm.cargar_checkpoint(max_horas=24) is None
+    assert not os.path.exists(dm.CHECKPOINT_DIR)
+
+
+def test_reanudar_sustituye_la_parte_del_run_cortado(dm):
+    from scraper_automatico import ScraperOptimizado
+
+    # Run cortado: Heat llegó al checkpoint y al stream, Jazz solo al stream a medias
+    _guardar(dm, {'Miami Heat': None})
+    cortado = dm.abrir_stats_streaming()
+    cortado.escribir(_tabla('Miami Heat'), clave='Miami Heat')
+    cortado.escribir(_tabla('Utah Jazz', partidos=2), clave='Utah Jazz')
+
+    scraper = ScraperOptimizado()
+    scraper.dm = dm
+    scraper.stream = dm.abrir_stats_streaming()
+    r = scraper._resultado_vacio()
+    scraper.stream.escribir(_tabla('Utah Jazz'), clave='Utah Jazz')   # Jazz se repite entero
+    scraper._reanudar(r, dm.cargar_checkpoint())
+
+    assert r['equipos_procesados'] == 1
+    assert r['jugadores_con_datos'] == CONTADORES['jugadores_con_datos']
+    # Una parte por equipo: ni Heat duplicado ni el Jazz a medias
+    assert sorted(os.path.basename(p)[7:] for p in scraper.stream.partes()) == \
+        ['miami_heat.parquet', 'utah_jazz.parquet']
+    assert scraper.stream.cerrar() == 4 * 5
@@ -0,0 +1,152 @@
+# tests/test_deltas.py
+
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import filas_stats
+
+EQUIPOS = {
+    'Boston Celtics': ['Jaylen Brown', 'Derrick White', 'Xavier Tillman'],
+    'Charlotte Hornets': ['LaMelo Ball', 'Miles Bridges', 'Collin Sexton', 'Xavier Tillman'],
+    'Chicago Bulls': ['Coby White', 'Nikola Vucevic', 'Collin Sexton'],
+}
+
+
+def _ordenadas(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.assign(Fecha=pd.to_datetime(df['Fecha']).astype('datetime64[ns]'))
+    return df.sort_values(['Jugador', 'Equipo', 'Timestamp']).reset_index(drop=True)
+
+
+def _publicadas(dm) -> pd.DataFrame:
+    """Lo que reconstruye un cliente: snapshot + deltas (sin segmentos pendientes)"""
+    return _ordenadas(dm._stats_publicadas())
+
+
+def test_diferencia_con_claves_repetidas(dm):
+    anterior = filas_stats(EQUIPOS)
+    # guardar_stats deja una fila por Jugador+Timestamp
+    df = anterior.drop_duplicates(subset=['Jugador', 'Timestamp'], keep='last').reset_index(drop=True)
+
+    nuevas, borrados = dm._diferencia(anterior, df)
+    assert borrados.empty
+    repetidos = anterior[anterior.duplicated(['Jugador', 'Timestamp'], keep=False)]
+    assert set(nuevas['Jugador']) == set(repetidos['Jugador'])
+    assert len(nuevas) == len(repetidos) // 2
+
+    replay = dm._aplicar_deltas(anterior, [{'archivo': 'n', 'seq': 1, 'borrados': 'b'}],
+                                lambda archivo, seq: nuevas if archivo == 'n' else borrados)
+    assert _ordenadas(replay).equals(_ordenadas(df))
+
+
+def test_diferencia_sin_cambios_vacia(dm):
+    df = filas_stats(EQUIPOS).drop_duplicates(subset=['Jugador', 'Timestamp'])
+    nuevas, borrados = dm._diferencia(df, df.copy())
+    assert nuevas.empty and borrados.empty
+
+
+def test_resave_con_duplicados_publica_lo_guardado(dm):
+    """stats_latest con un jugador en dos plantillas → re-guardado combinando"""
+    inicial = filas_stats(EQUIPOS)
+    dm._publicar_stats(inicial)
+    assert len(_publicadas(dm)) == len(inicial)
+
+    registros = dm.guardar_stats(inicial.iloc[:1].copy(), combinar=True)
+    assert len(_publicadas(dm)) == registros
+    assert len(dm.cargar_stats()) == registros
+
+    nueva = filas_stats({'Chicago Bulls': ['Coby White']}, partidos=1, desde_dias=0, semilla=9)
+    registros = dm.guardar_stats(nueva, combinar=True)
+    assert len(dm.cargar_stats()) == registros
+
+
+def test_deltas_reproducen_el_snapshot(dm, monkeypatch):
+    """Varios runs por deltas: snapshot + deltas == lo que guardar_stats escribió"""
+    escritas = []
+    publicar = dm._publicar_stats
+    monkeypatch.setattr(dm, '_publicar_stats', lambda df: (escritas.append(df.copy()), publicar(df)))
+
+    # Liga de juguete: los deltas pesan mucho frente al snapshot
+    dm.FRACCION_SNAPSHOT = 1.0
+    dm.guardar_stats(filas_stats(EQUIPOS, partidos=9, desde_dias=3))
+    assert dm._leer_manifiesto_deltas()['snapshot']['filas'] == len(escritas[-1])
+
+    for dia in (2, 1, 0):
+        dm.guardar_stats(filas_stats(EQUIPOS, partidos=1, desde_dias=dia, semilla=dia), combinar=True)
+        assert dm._leer_manifiesto_deltas()['deltas'], "un run pequeño publica un delta, no un snapshot"
+        assert _publicadas(dm).equals(_ordenadas(escritas[-1]))
+
+    manifiesto = dm._leer_manifiesto_deltas()
+    assert len(manifiesto['deltas']) == 3
+    # PARTIDOS_POR_JUGADOR: el último run empuja fuera el partido más viejo
+    assert manifiesto['deltas'][-1]['borradas'] > 0
+    assert _ordenadas(dm.cargar_stats()).equals(_ordenadas(escritas[-1]))
+
+
+# ============================================================================
+# PARTICIONES POR EQUIPO SOBRE SNAPSHOT + DELTAS
+# ============================================================================
+
+def _runs_por_deltas(dm, runs: int = 3):
+    dm.FRACCION_SNAPSHOT = 1.0
+    dm.guardar_stats(filas_stats(EQUIPOS, partidos=9, desde_dias=runs))
+    for dia in reversed(range(runs)):
+        dm.guardar_stats(filas_stats(EQUIPOS, partidos=1, desde_dias=dia, semilla=dia), combinar=True)
+    assert len(dm._leer_manifiesto_deltas()['deltas']) == runs
+
+
+def test_particiones_solo_se_reescriben_con_el_snapshot(dm):
+    dm.FRACCION_SNAPSHOT = 1.0
+    dm.guardar_stats(filas_stats(EQUIPOS, partidos=9, desde_dias=3))
+    antes = dm.cargar_manifiesto()
+    mtimes = {e: os.stat(os.path.join(dm.STATS_DIR, p['archivo'])).st_mtime_ns
+              for e, p in antes['equipos'].items()}
+
+    for dia in (2, 1, 0):
+        dm.guardar_stats(filas_stats(EQUIPOS, partidos=1, desde_dias=dia, semilla=dia), combinar=True)
+
+    despues = dm.cargar_manifiesto()
+    assert despues == antes
+    assert all(os.stat(os.path.join(dm.STATS_DIR, p['archivo'])).st_mtime_ns == mtimes[e]
+               for e, p in despues['equipos'].items())
+
+
+def test_equipo_es_particion_mas_deltas(dm):
+    _runs_por_deltas(dm)
+    liga = _publicadas(dm)
+    for equipo in EQUIPOS:
+        esperado = liga[liga['Equipo'] == equipo].reset_index(drop=True)
+        assert _ordenadas(dm.obtener_stats_equipo(equipo)).equals(esperado)
+
+
+def test_nube_equipo_y_liga(dm, servidor_github):
+    _runs_por_deltas(dm)
+    dm.actualizar_metadata({})
+    liga = _publicadas(dm)
+
+    nube = type(dm)(nube=True)
+    nube.BASE_RAW_URL = servidor_github
+    assert _ordenadas(nube.cargar_stats()).equals(liga)
+    for equipo in EQUIPOS:
+        esperado = liga[liga['Equipo'] == equipo].reset_index(drop=True)
+        assert _ordenadas(nube.obtener_stats_equipo(equipo)).equals(esperado)
+
+
+def test_nube_sin_snapshot_o_sin_delta_falla(dm, servidor_github):
+    _runs_por_deltas(dm)
+    dm.actualizar_metadata({})
+    nube = type(dm)(nube=True)
+    nube.BASE_RAW_URL = servidor_github
+
+    # Un delta que no llega: ni la liga ni un equipo se sirven a medias
+    ultimo = dm._leer_manifiesto_deltas()['deltas'][-1]
+    os.remove(os.path.join(dm.DATA_DIR, ultimo['archivo']))
+    with pytest.raises(Exception):
+        nube._stats_nube()
+    with pytest.raises(Exception):
+        nube.obtener_stats_equipo('Chicago Bulls')
+
+    os.remove(dm.STATS_FILE)
+    with pytest.raises(Exception):
+        nube._stats_nube()
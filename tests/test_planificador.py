@@ -0,0 +1,41 @@
+# tests/test_planificador.py
+
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from planificador import ultima_actualizacion
+
+
+@pytest.fixture
+def zona_local(monkeypatch):
+    """Hora local lejos de UTC (y con horario de verano) mientras dura el test"""
+    monkeypatch.setenv('TZ', 'America/Los_Angeles')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _metricas(runs: dict) -> pd.DataFrame:
+    return pd.DataFrame({'Run': list(runs.values()), 'Tipo': 'equipo', 'Nombre': list(runs)})
+
+
+def test_run_sin_zona_es_hora_local(zona_local):
+    invierno, verano = 1_736_000_000.0, 1_752_000_000.0    # enero y julio de 2025
+    ultima = ultima_actualizacion(_metricas({
+        'Miami Heat': datetime.fromtimestamp(invierno).isoformat(),
+        'Utah Jazz': datetime.fromtimestamp(verano).isoformat(),
+    }))
+    assert ultima == {'Miami Heat': invierno, 'Utah Jazz': verano}
+
+
+def test_run_con_zona_y_stats(zona_local):
+    run = 1_752_000_000.0
+    df_stats = pd.DataFrame({'Equipo': ['Miami Heat', 'Boston Celtics'], 'Timestamp': [1, 1_700_000_000]})
+    ultima = ultima_actualizacion(
+        _metricas({'Miami Heat': datetime.fromtimestamp(run, timezone.utc).isoformat()}), df_stats)
+    # Las métricas mandan sobre el último partido guardado
+    assert ultima == {'Miami Heat': run, 'Boston Celtics': 1_700_000_000.0}
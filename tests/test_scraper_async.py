@@ -0,0 +1,36 @@
+# tests/test_scraper_async.py
+
+import asyncio
+import time
+from collections import Counter
+
+from config_nba import JUGADORES_DB
+from scraper_async import MotorAsync
+from servidor_stub import LigaStub
+
+
+def test_por_evento_un_box_score_por_partido(cache, sesion_stub):
+    """Dos rivales con partidos en común: cada lineups se pide una sola vez"""
+    liga = LigaStub(semilla=2)
+    equipos = dict(list(JUGADORES_DB.items())[:6])
+    sesion = sesion_stub(liga, time.time())
+    motor = MotorAsync(requests_por_segundo=1000, rafaga=1000)
+
+    async def ejecutar():
+        motor._semaforo = asyncio.Semaphore(8)
+        return await motor._ejecutar_por_evento(sesion, equipos, 5, {})
+
+    resultados = asyncio.run(ejecutar())
+
+    lineups = Counter(url for url in sesion.urls if url.endswith('/lineups'))
+    assert lineups and max(lineups.values()) == 1
+    assert not any('/statistics' in url for url in sesion.urls)
+    assert [r['equipo'] for r in resultados] == list(equipos)
+    assert all(r['completo'] and not r['errores'] for r in resultados)
+
+    # Cada jugador con id recibe sus últimos 5 partidos
+    for res in resultados:
+        df = res['stats'].to_pandas()
+        con_id = [j for j, info in equipos[res['equipo']].items() if info.get('id')]
+        assert len(df) and set(df['Jugador']) <= set(con_id)
+        assert (df.groupby('Jugador').size() <= 5).all()
@@ -0,0 +1,82 @@
+# tests/test_shards.py
+
+import pandas as pd
+import pytest
+
+from conftest import filas_stats
+from planificador import equipos_del_shard, parsear_shard
+
+PLANTILLAS = {
+    'Denver Nuggets': {f'Nuggets {i}': i for i in range(15)},
+    'Miami Heat': {f'Heat {i}': i for i in range(14)},
+    'Utah Jazz': {f'Jazz {i}': i for i in range(12)},
+    'Boston Celtics': {f'Celtics {i}': i for i in range(13)},
+    'Chicago Bulls': {f'Bulls {i}': i for i in range(9)},
+}
+
+
+def test_parsear_shard():
+    assert parsear_shard('2/4') == (2, 4)
+    assert parsear_shard('1/1') == (1, 1)
+    for texto in ('0/4', '5/4', '1/0', '2', 'a/b', '1/2/3'):
+        with pytest.raises(ValueError):
+            parsear_shard(texto)
+
+
+def test_equipos_del_shard_reparte_todo_una_vez():
+    equipos = list(PLANTILLAS)
+    for total in (1, 2, 3, 5, 7):
+        repartos = [equipos_del_shard(equipos, i, total, PLANTILLAS) for i in range(1, total + 1)]
+        asignados = [e for reparto in repartos for e in reparto]
+        assert sorted(asignados) == sorted(equipos)
+        # Cada shard conserva el orden recibido (el de prioridad)
+        for reparto in repartos:
+            assert reparto == [e for e in equipos if e in reparto]
+
+
+def test_equipos_del_shard_determinista_y_equilibrado():
+    equipos = list(PLANTILLAS)
+    invertidos = equipos[::-1]
+    cargas = []
+    for i in (1, 2):
+        reparto = equipos_del_shard(equipos, i, 2, PLANTILLAS)
+        # El reparto no depende del orden de entrada, solo de las plantillas
+        assert set(reparto) == set(equipos_del_shard(invertidos, i, 2, PLANTILLAS))
+        cargas.append(sum(len(PLANTILLAS[e]) for e in reparto))
+    assert abs(cargas[0] - cargas[1]) <= max(len(p) for p in PLANTILLAS.values())
+
+
+def _calendario(equipos: list, ts: int) -> pd.DataFrame:
+    return pd.DataFrame({'Equipo': equipos, 'Rival': ['X'] * len(equipos), 'Timestamp': [ts] * len(equipos)})
+
+
+def test_unir_shards_calendario_y_stats(dm):
+    from data_manager import DataManager
+
+    # Calendario guardado de un run anterior con un equipo que ningún shard scrapea
+    dm.guardar_calendario(_calendario(['Chicago Bulls', 'Miami Heat'], 1))
+
+    repartos = {1: ['Miami Heat'], 2: ['Utah Jazz']}
+    for i, equipos in repartos.items():
+        shard = DataManager(shard=(i, 2), nube=False)
+        escritor = shard.abrir_stats_streaming()
+        escritor.escribir(filas_stats({e: [f'{e} 1', f'{e} 2'] for e in equipos}), clave=equipos[0])
+        escritor.cerrar()
+        # El shard guarda el calendario de la liga, pero solo manda en sus equipos
+        shard.guardar_calendario(_calendario(['Miami Heat', 'Utah Jazz', 'Chicago Bulls'], 100 + i))
+        shard.actualizar_metadata({'equipos_asignados': equipos, 'equipos': 1, 'modo': 'async'})
+
+    metadata = dm.unir_shards()
+
+    calendario = dm.cargar_calendario().set_index('Equipo')['Timestamp'].to_dict()
+    assert calendario == {'Chicago Bulls': 1, 'Miami Heat': 101, 'Utah Jazz': 102}
+    assert sorted(dm.cargar_stats()['Equipo'].unique()) == ['Miami Heat', 'Utah Jazz']
+    assert metadata['total_registros'] == 4 * 5
+    assert set(metadata['shards']) == {'1/2', '2/2'}
+
+
+def test_unir_shards_solo_en_local(dm):
+    from data_manager import DataManager
+
+    with pytest.raises(RuntimeError):
+        DataManager(nube=True).unir_shards()
@@ -0,0 +1,72 @@
+# tests/test_stream.py
+
+import os
+
+import pandas as pd
+
+from conftest import filas_stats
+from data_manager import EscritorParquet
+
+EQUIPOS = {
+    'Denver Nuggets': ['Nikola Jokic', 'Jamal Murray', 'Aaron Gordon'],
+    'Miami Heat': ['Bam Adebayo', 'Tyler Herro'],
+    'Utah Jazz': ['Lauri Markkanen', 'Walker Kessler'],
+}
+
+
+def _ordenadas(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.assign(Fecha=pd.to_datetime(df['Fecha']).astype('datetime64[ns]'))
+    return df.sort_values(['Jugador', 'Equipo', 'Timestamp']).reset_index(drop=True)
+
+
+def test_partes_sobreviven_a_un_run_cortado(tmp_path):
+    directorio = str(tmp_path / 'stats_nuevos')
+    escritor = EscritorParquet(directorio)
+    escritor.escribir(filas_stats({'Miami Heat': EQUIPOS['Miami Heat']}), clave='Miami Heat')
+    escritor.escribir(filas_stats({'Utah Jazz': EQUIPOS['Utah Jazz']}), clave='Utah Jazz')
+    del escritor    # el proceso muere sin cerrar nada
+
+    retomado = EscritorParquet(directorio)
+    assert len(retomado.partes()) == 2
+    assert retomado.cerrar() == 4 * 5
+
+
+def test_clave_sustituye_su_parte(tmp_path):
+    escritor = EscritorParquet(str(tmp_path / 'stats_nuevos'))
+    escritor.escribir(filas_stats({'Miami Heat': EQUIPOS['Miami Heat']}, partidos=2), clave='Miami Heat')
+    escritor.escribir(filas_stats({'Utah Jazz': EQUIPOS['Utah Jazz']}), clave='Utah Jazz')
+    escritor.escribir(filas_stats({'Miami Heat': EQUIPOS['Miami Heat']}, partidos=3), clave='Miami Heat')
+
+    partes = escritor.partes()
+    assert [os.path.basename(p)[7:] for p in partes] == ['utah_jazz.parquet', 'miami_heat.parquet']
+    assert escritor.cerrar() == 2 * 5 + 2 * 3
+    # Orden de escritura: la parte más reciente va la última
+    assert pd.read_parquet(partes[-1])['Equipo'].eq('Miami Heat').all()
+
+    escritor.escribir(filas_stats({'Utah Jazz': ['Keyonte George']}))
+    assert len(escritor.partes()) == 3
+
+
+def test_consolidar_por_partes_igual_que_de_una_vez(dm):
+    dm.guardar_stats(filas_stats(EQUIPOS, partidos=8, desde_dias=2))
+    existente = dm.cargar_stats()
+
+    # Run: partidos nuevos + uno repetido con otros números (gana el del stream)
+    partes = [
+        filas_stats({equipo: jugadores}, partidos=3, desde_dias=0, semilla=n)
+        for n, (equipo, jugadores) in enumerate(EQUIPOS.items())
+    ]
+    esperado = pd.concat([existente, *partes], ignore_index=True)
+    esperado = dm._retener(esperado.drop_duplicates(subset=['Jugador', 'Timestamp'], keep='last'))
+
+    escritor = dm.abrir_stats_streaming()
+    for parte, equipo in zip(partes, EQUIPOS):
+        escritor.escribir(parte, clave=equipo)
+    registros = dm.guardar_stats_streaming(escritor, combinar=True)
+
+    assert registros == len(esperado)
+    assert _ordenadas(dm.cargar_stats()).equals(_ordenadas(esperado))
+    assert not escritor.partes()
+    # Todo lo del stream también quedó en el archivo de temporada
+    historial = dm.cargar_historial()
+    assert len(historial) == len(pd.concat([existente, *partes]).drop_duplicates(['Jugador', 'Timestamp']))